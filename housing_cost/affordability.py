@@ -0,0 +1,238 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from housing_cost.config import AFFORDABILITY_CUBE
+from housing_cost.deflator import Deflator
+
+# The measures of every cost: nominal dollars, dollars of the target year, multiples of the
+# median household income of the year, and dollars per square foot of house and of lot.
+MEASURES = ["usd", "usd_adjusted", "income_multiple", "usd_per_sqft", "usd_per_lot_sqft"]
+# Where the costs of a category come from.
+SOURCES = ["cost_breakdown", "cost_history"]
+AXES = ["year", "category", "subcategory", "measure"]
+
+EDITION = "edition"
+
+
+class AffordabilityCube:
+    """The costs of a house by year, category and subcategory in several measures.
+
+    The values are one dense year x category x subcategory x measure float64 array, NaN
+    where a category has no such subcategory or the survey no such year. A category's
+    own total is its subcategory of the same name. Labels are looked up in dictionaries
+    of positions, so a query is a few lookups and an array slice.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        years: Sequence[int],
+        categories: Sequence[str],
+        subcategories: Sequence[str],
+        sources: Sequence[str],
+        measures: Sequence[str] = MEASURES,
+    ) -> None:
+        self.values = values
+        self.years = [int(year) for year in years]
+        self.categories = list(categories)
+        self.subcategories = list(subcategories)
+        self.sources = list(sources)
+        self.measures = list(measures)
+        self._positions: List[Dict[Any, int]] = [
+            {label: i for i, label in enumerate(labels)}
+            for labels in (self.years, self.categories, self.subcategories, self.measures)
+        ]
+
+    @classmethod
+    def load(cls, path: Path = AFFORDABILITY_CUBE) -> "AffordabilityCube":
+        """Load a cube written by `save`."""
+        with np.load(path) as data:
+            return cls(
+                data["values"],
+                data["years"].tolist(),
+                data["categories"].tolist(),
+                data["subcategories"].tolist(),
+                data["sources"].tolist(),
+                data["measures"].tolist(),
+            )
+
+    def save(self, path: Path = AFFORDABILITY_CUBE) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                values=self.values,
+                years=np.array(self.years, dtype=np.int64),
+                categories=np.array(self.categories, dtype=str),
+                subcategories=np.array(self.subcategories, dtype=str),
+                sources=np.array(self.sources, dtype=str),
+                measures=np.array(self.measures, dtype=str),
+            )
+
+    def query(
+        self,
+        year: Any = None,
+        category: Any = None,
+        subcategory: Any = None,
+        measure: Any = None,
+    ) -> np.ndarray:
+        """Slice the cube by label.
+
+        Every argument is a label, which drops its axis, a list of labels, or None for
+        the whole axis. The remaining axes keep their order, e.g.
+        `query(category="Site Work", measure="usd")` is a year x subcategory array.
+
+        Raises:
+            KeyError: If a label is not in the cube.
+        """
+        key: List[Any] = []
+        takes = []
+        kept = 0
+        for axis, labels in enumerate((year, category, subcategory, measure)):
+            if labels is None:
+                key.append(slice(None))
+                kept += 1
+            elif isinstance(labels, (list, tuple, np.ndarray)):
+                key.append(slice(None))
+                takes.append((kept, [self._position(axis, label) for label in labels]))
+                kept += 1
+            else:
+                key.append(self._position(axis, labels))
+        # Labels and whole axes are basic indexing, a view; lists of labels are taken one
+        # axis at a time, so they select along their own axis rather than pointwise.
+        values = self.values[tuple(key)]
+        for axis, positions in takes:
+            values = np.take(values, positions, axis=axis)
+        return values
+
+    def category_totals(self, measure: str, source: Optional[str] = None) -> pd.DataFrame:
+        """The total of every category in a measure, by year.
+
+        Args:
+            measure: One of the measures of the cube.
+            source: Only the categories from this source, one of SOURCES.
+        """
+        categories = [
+            i
+            for i, name in enumerate(self.categories)
+            if (source is None or self.sources[i] == source) and name in self._positions[2]
+        ]
+        own = [self._positions[2][self.categories[i]] for i in categories]
+        values = self.values[:, categories, own, self._position(3, measure)]
+        return pd.DataFrame(
+            values,
+            index=pd.Index(self.years, name="year"),
+            columns=pd.Index([self.categories[i] for i in categories], name="category"),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """The cube in long format, one row per year, category and subcategory it holds."""
+        shape = self.values.shape[:3]
+        held = ~np.isnan(self.values).all(axis=3)
+        year, category, subcategory = (np.indices(shape)[axis][held] for axis in range(3))
+        df = pd.DataFrame(
+            {
+                "year": np.array(self.years)[year],
+                "category": np.array(self.categories, dtype=object)[category],
+                "subcategory": np.array(self.subcategories, dtype=object)[subcategory],
+            }
+        )
+        measures = pd.DataFrame(self.values[held], columns=self.measures)
+        return pd.concat([df, measures], axis=1)
+
+    def _position(self, axis: int, label: Any) -> int:
+        try:
+            return self._positions[axis][label]
+        except KeyError:
+            raise KeyError(f"{label!r} is not a {AXES[axis]} of the affordability cube")
+
+
+def _latest_edition(df: pd.DataFrame, edition: Optional[int]) -> pd.DataFrame:
+    if EDITION not in df.columns:
+        return df
+    return df[df[EDITION] == (edition or df[EDITION].max())]
+
+
+def build_affordability_cube(
+    cost_breakdown: pd.DataFrame,
+    cost_history: pd.DataFrame,
+    median_income: pd.DataFrame,
+    deflator: Deflator,
+    target_year: int = 2024,
+    edition: Optional[int] = None,
+) -> AffordabilityCube:
+    """Materialize the affordability cube from the processed files.
+
+    The cost breakdown shares are turned into dollars of the total construction cost of
+    their year. The cost history categories are added as categories of their own, whose
+    only subcategory is their total. Every cost is divided by the median income and by
+    the house and lot size of its year, which only the cost breakdown has.
+
+    Args:
+        cost_breakdown: The processed cost breakdown, as in COST_BREAKDOWN.
+        cost_history: The processed dollar cost history, as in COST_HISTORY_USD.
+        median_income: The processed median income, as in MEDIAN_INCOME.
+        deflator: The CPI snapshot to adjust with.
+        target_year: The year to adjust the dollar values to.
+        edition: The survey edition to use. Defaults to the latest one.
+    """
+    breakdown = _latest_edition(cost_breakdown, edition)
+    history = _latest_edition(cost_history, edition)
+    costs = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "year": breakdown["year"].to_numpy(dtype=np.int64),
+                    "category": breakdown["category"].to_numpy(),
+                    "subcategory": breakdown["subcategory"].to_numpy(),
+                    "source": SOURCES[0],
+                    "usd": breakdown["percent"].to_numpy(dtype=float)
+                    / 100
+                    * breakdown["usd"].to_numpy(dtype=float),
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "year": history["year"].to_numpy(dtype=np.int64),
+                    "category": history["category"].to_numpy(),
+                    "subcategory": history["category"].to_numpy(),
+                    "source": SOURCES[1],
+                    "usd": history["usd"].to_numpy(dtype=float),
+                }
+            ),
+        ],
+        ignore_index=True,
+    )
+    # The cost breakdown wins if a category is in both tables.
+    costs = costs.drop_duplicates(["year", "category", "subcategory"])
+
+    year_codes, years = pd.factorize(costs["year"], sort=True)
+    category_codes, categories = pd.factorize(costs["category"])
+    subcategory_codes, subcategories = pd.factorize(costs["subcategory"])
+    sources = costs.groupby(category_codes)["source"].first()
+
+    # The income, house size and lot size of every year of the cube.
+    income = median_income.groupby("year")["median_current"].first()
+    sizes = breakdown.groupby("year")[["sqr_feet", "lot_size"]].first()
+    income = income.reindex(years).to_numpy(dtype=float)[year_codes]
+    sqr_feet = sizes["sqr_feet"].reindex(years).to_numpy(dtype=float)[year_codes]
+    lot_size = sizes["lot_size"].reindex(years).to_numpy(dtype=float)[year_codes]
+
+    usd = costs["usd"].to_numpy()
+    measures = np.column_stack(
+        [
+            usd,
+            deflator.adjust(usd, costs["year"], target_year),
+            usd / income,
+            usd / sqr_feet,
+            usd / lot_size,
+        ]
+    )
+    values = np.full((len(years), len(categories), len(subcategories), len(MEASURES)), np.nan)
+    values[year_codes, category_codes, subcategory_codes] = measures
+    return AffordabilityCube(
+        values, years.tolist(), categories.tolist(), subcategories.tolist(), sources.tolist()
+    )
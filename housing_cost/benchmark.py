@@ -0,0 +1,638 @@
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+import json
+from pathlib import Path
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional
+import warnings
+
+from loguru import logger
+import typer
+
+from housing_cost.config import BENCHMARK_BASELINE, configure_logging
+
+if TYPE_CHECKING:
+    from mypy_boto3_textract.type_defs import (
+        BlockTypeDef,
+        GetDocumentAnalysisResponseTypeDef,
+    )
+
+app = typer.Typer()
+
+# Textract returns at most 1000 blocks per result page.
+PAGE_SIZE = 1000
+TABLE_COUNTS = [1, 10, 100, 1000, 10000]
+COLUMN_COUNTS = [10, 100, 1000]
+ROW_COUNTS = [10, 100, 1000, 10000]
+EDITION_COUNTS = [1, 10, 100]
+SCENARIO_COUNTS = [100, 10000, 100000]
+# The years every income projection scenario covers.
+PROJECTION_YEARS = 30
+# Affordability cube queries per call, on a cube of 30 years of 10 categories of 50
+# subcategories.
+QUERY_COUNTS = [100, 10000]
+QUICK_LIMIT = 100
+
+# The command line modules, imported by every command.
+CLI_MODULES = ["housing_cost.dataset", "housing_cost.benchmark"]
+# Dependencies too slow to import on every command. Only the commands using them may.
+HEAVY_MODULES = [
+    "boto3",
+    "cpi",
+    "mypy_boto3_textract",
+    "numpy",
+    "pandas",
+    "pdfplumber",
+    "requests",
+]
+IMPORT_BUDGET_MS = 100.0
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": sorted(sys.modules)}}))
+"""
+
+
+@dataclass
+class BenchmarkResult:
+    """The best time of a benchmark case and the throughput it implies."""
+
+    name: str
+    params: Dict[str, int]
+    work: int
+    unit: str
+    seconds: float
+    repeats: int
+
+    @property
+    def key(self) -> str:
+        return self.name + "".join(f"[{k}={v}]" for k, v in sorted(self.params.items()))
+
+    @property
+    def throughput(self) -> float:
+        return self.work / self.seconds if self.seconds > 0 else float("inf")
+
+
+@dataclass
+class Regression:
+    key: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return self.current / self.baseline - 1
+
+
+@dataclass
+class Case:
+    """A benchmark: `setup` runs once untimed and returns the callable to time.
+
+    Attributes:
+        name: The function benchmarked.
+        params: The size of the synthetic input.
+        work: The amount of work of one call, in `unit`.
+        unit: What the throughput counts, e.g. "cells".
+        setup: Builds the inputs and returns the timed callable.
+    """
+
+    name: str
+    params: Dict[str, int]
+    work: int
+    unit: str
+    setup: Callable[[Path], Callable[[], Any]] = field(repr=False)
+
+
+def synthetic_blocks(tables: int, rows: int, columns: int, seed: int = 0) -> List["BlockTypeDef"]:
+    """Textract blocks of `tables` tables of rows x columns cells, one word per cell.
+
+    Every table is on its own page and lists its cells in row-major order, as Textract
+    does. Cells hold dollar amounts, percentages and labels, some with thousands
+    separators.
+    """
+    rng = random.Random(seed)
+    blocks: List["BlockTypeDef"] = []
+    for t in range(tables):
+        page = t + 1
+        cell_ids = [f"c{t}-{i}" for i in range(rows * columns)]
+        blocks.append(
+            {
+                "BlockType": "TABLE",
+                "Id": f"t{t}",
+                "Page": page,
+                "Relationships": [{"Type": "CHILD", "Ids": cell_ids}],
+            }
+        )
+        for i, cell_id in enumerate(cell_ids):
+            row, column = divmod(i, columns)
+            if column == 0:
+                text = f"Item{row}"
+            elif column % 2:
+                text = f"${rng.randrange(100, 500_000):,}"
+            else:
+                text = f"{rng.uniform(0, 100):.1f}%"
+            word_id = f"w{t}-{i}"
+            blocks.append(
+                {
+                    "BlockType": "CELL",
+                    "Id": cell_id,
+                    "Page": page,
+                    "RowIndex": row + 1,
+                    "ColumnIndex": column + 1,
+                    "Confidence": rng.uniform(50, 100),
+                    "Relationships": [{"Type": "CHILD", "Ids": [word_id]}],
+                }
+            )
+            blocks.append({"BlockType": "WORD", "Id": word_id, "Page": page, "Text": text})
+    return blocks
+
+
+class MockTextractClient:
+    """A Textract client whose jobs succeed at once with a fixed list of blocks.
+
+    Results are paginated like Textract's, so `get_document_analysis` is called once per
+    result page.
+    """
+
+    def __init__(self, blocks: List["BlockTypeDef"], page_size: int = PAGE_SIZE) -> None:
+        self.blocks = blocks
+        self.page_size = page_size
+
+    def start_document_analysis(self, **kwargs: Any) -> Dict[str, Any]:
+        return {"JobId": "benchmark"}
+
+    def get_document_analysis(
+        self, JobId: str, NextToken: Optional[str] = None, **kwargs: Any
+    ) -> Dict[str, Any]:
+        start = int(NextToken or 0)
+        end = start + self.page_size
+        response: Dict[str, Any] = {
+            "JobStatus": "SUCCEEDED",
+            "DocumentMetadata": {"Pages": 1},
+            "Blocks": self.blocks[start:end],
+        }
+        if end < len(self.blocks):
+            response["NextToken"] = str(end)
+        return response
+
+
+class ImmediateWaiter:
+    """Stands in for TextractJobWaiter; jobs of the mocked client are done on start."""
+
+    def __init__(self, client: MockTextractClient) -> None:
+        self.client = client
+
+    def notification_channel(self) -> None:
+        return None
+
+    def register(self, job_id: str) -> "Future[GetDocumentAnalysisResponseTypeDef]":
+        future: Future[GetDocumentAnalysisResponseTypeDef] = Future()
+        future.set_result(self.client.get_document_analysis(JobId=job_id))  # type: ignore
+        return future
+
+
+def synthetic_deflator(last_year: int = 2024):
+    """A deflator whose CPI grows 3% a year, so the benchmarks need no CPI snapshot."""
+    import numpy as np
+
+    from housing_cost.deflator import FIRST_YEAR, Deflator
+
+    annual = 10 * 1.03 ** np.arange(last_year - FIRST_YEAR + 1)
+    return Deflator(annual[np.newaxis], np.repeat(annual, 12)[np.newaxis], ["cpi_u"])
+
+
+def _table_blocks(tables: int, rows: int, columns: int):
+    blocks = synthetic_blocks(tables, rows, columns)
+    blocks_map = {block["Id"]: block for block in blocks}
+    table_blocks = [block for block in blocks if block["BlockType"] == "TABLE"]
+    return blocks, blocks_map, table_blocks
+
+
+def _get_table_csv_results(tables: int, rows: int, columns: int):
+    from housing_cost.pdf.textract import get_table_csv_results
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        client = MockTextractClient(synthetic_blocks(tables, rows, columns))
+        waiter = ImmediateWaiter(client)
+        return lambda: get_table_csv_results(client, "bucket", "object", waiter)  # type: ignore
+
+    return setup
+
+
+def _generate_table_csv(tables: int, rows: int, columns: int):
+    from housing_cost.pdf.textract import generate_table_csv
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        _, blocks_map, table_blocks = _table_blocks(tables, rows, columns)
+        return lambda: [generate_table_csv(table, blocks_map) for table in table_blocks]
+
+    return setup
+
+
+def _get_rows_columns_map(tables: int, rows: int, columns: int):
+    from housing_cost.pdf.textract import get_rows_columns_map
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        _, blocks_map, table_blocks = _table_blocks(tables, rows, columns)
+        return lambda: [get_rows_columns_map(table, blocks_map) for table in table_blocks]
+
+    return setup
+
+
+def _get_text(tables: int, rows: int, columns: int):
+    from housing_cost.pdf.textract import get_text
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        blocks, blocks_map, _ = _table_blocks(tables, rows, columns)
+        cells = [block for block in blocks if block["BlockType"] == "CELL"]
+        return lambda: [get_text(cell, blocks_map) for cell in cells]
+
+    return setup
+
+
+def _process_construction_cost(rows: int):
+    from housing_cost.process.process_construction_cost import process_construction_cost_2024
+    from housing_cost.synthetic import CATEGORIES, SurveyShape, write_construction_cost
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        path = tmp_dir / f"construction_cost_{rows}.csv"
+        write_construction_cost(path, SurveyShape(items=max(1, rows // len(CATEGORIES))))
+        return lambda: process_construction_cost_2024(path)
+
+    return setup
+
+
+def _process_cost_history(rows: int):
+    from housing_cost.process.process_cost_history import process_cost_history
+    from housing_cost.synthetic import SurveyShape, write_cost_history
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        path = tmp_dir / f"cost_history_{rows}.csv"
+        write_cost_history([path], SurveyShape(items=rows), 2022)
+        deflator = synthetic_deflator()
+        return lambda: process_cost_history(path, 2022, deflator)
+
+    return setup
+
+
+def _process_cost_histories(editions: int):
+    from housing_cost.process.process_cost_history import process_cost_histories
+    from housing_cost.synthetic import SurveyShape, write_cost_history
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        # Every edition is a two part table of 100 regional costs over 20 years.
+        paths: List[Path] = []
+        for edition in range(editions):
+            parts = [tmp_dir / f"cost_history_{editions}_{edition}_{part}.csv" for part in (1, 2)]
+            write_cost_history(parts, SurveyShape(regions=10, items=10, years=20), 2024)
+            paths += parts
+        deflator = synthetic_deflator()
+        labels = [2024 - edition for edition in range(editions) for _ in (1, 2)]
+        return lambda: process_cost_histories(paths, 2024, deflator, labels)
+
+    return setup
+
+
+def _process_median_income(rows: int):
+    from housing_cost.process.process_median_income import process_median_income
+    from housing_cost.synthetic import SurveyShape, write_median_income
+
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        # The processor reads the latest 46 years from a sidecar cached on the first call,
+        # so larger sheets measure hashing the file.
+        path = tmp_dir / f"median_income_{rows}.xlsx"
+        write_median_income(path, SurveyShape(years=rows), 2024)
+        cache_dir = tmp_dir / "spreadsheets"
+        return lambda: process_median_income(path, 1.029, 1.04, cache_dir)
+
+    return setup
+
+
+def _project_median_income(scenarios: int):
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        import numpy as np
+
+        from housing_cost.process.process_median_income import (
+            project_median_income,
+            rate_grid,
+        )
+
+        # A square grid of growth and inflation rates between 0% and 10%.
+        side = int(scenarios**0.5)
+        rates = np.linspace(1.0, 1.1, side)
+        growth, inflation = rate_grid(rates, rates)
+        horizons = np.arange(1, PROJECTION_YEARS + 1)
+        return lambda: project_median_income(80_000, 2023, growth, inflation, horizons)
+
+    return setup
+
+
+def _query_affordability(queries: int):
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        import numpy as np
+
+        from housing_cost.affordability import MEASURES, SOURCES, AffordabilityCube
+
+        rng = np.random.default_rng(0)
+        years = list(range(1995, 2025))
+        categories = [f"Category {i}" for i in range(10)]
+        subcategories = [f"Item {i}" for i in range(50)]
+        values = rng.uniform(0, 100_000, (len(years), 10, 50, len(MEASURES)))
+        cube = AffordabilityCube(values, years, categories, subcategories, SOURCES[:1] * 10)
+        picks = [
+            (years[rng.integers(30)], categories[rng.integers(10)], MEASURES[rng.integers(5)])
+            for _ in range(queries)
+        ]
+
+        def run() -> None:
+            for year, category, measure in picks:
+                cube.query(year=year, category=category, measure=measure)
+
+        return run
+
+    return setup
+
+
+def _parse_numbers(rows: int):
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        import pandas as pd
+
+        from housing_cost.parsing import parse_numbers
+
+        rng = random.Random(0)
+        cells = [f"${rng.randrange(100, 500_000):,}" for _ in range(rows)]
+        cells[::7] = [f"{rng.uniform(0, 100):.1f}%" for _ in cells[::7]]
+        cells[::11] = [
+            f"{rng.randrange(1913, 2025)} ({rng.randrange(1, 40)})" for _ in cells[::11]
+        ]
+        text = pd.Series(cells)
+        return lambda: parse_numbers(text)
+
+    return setup
+
+
+def _adjust(rows: int):
+    def setup(tmp_dir: Path) -> Callable[[], Any]:
+        import numpy as np
+
+        deflator = synthetic_deflator()
+        rng = np.random.default_rng(0)
+        values = rng.uniform(1_000, 500_000, rows)
+        years = rng.integers(1913, 2025, rows)
+        return lambda: deflator.adjust(values, years, 2024)
+
+    return setup
+
+
+def benchmark_cases(quick: bool = False) -> List[Case]:
+    """Every benchmark case. Quick runs stop at QUICK_LIMIT tables, columns and rows."""
+
+    def sizes(counts: List[int]) -> List[int]:
+        return [n for n in counts if not quick or n <= QUICK_LIMIT]
+
+    # Tables scale at 5 rows of 10 columns, columns at 10 tables of 5 rows.
+    table_sizes = [(tables, 5, 10) for tables in sizes(TABLE_COUNTS)]
+    table_sizes += [(10, 5, columns) for columns in sizes(COLUMN_COUNTS) if columns != 10]
+
+    cases: List[Case] = []
+    pdf_functions = {
+        "get_table_csv_results": _get_table_csv_results,
+        "generate_table_csv": _generate_table_csv,
+        "get_rows_columns_map": _get_rows_columns_map,
+        "get_text": _get_text,
+    }
+    for name, make_setup in pdf_functions.items():
+        for tables, rows, columns in table_sizes:
+            params = {"tables": tables, "rows": rows, "columns": columns}
+            cells = tables * rows * columns
+            cases.append(Case(name, params, cells, "cells", make_setup(tables, rows, columns)))
+
+    process_functions = {
+        "process_construction_cost_2024": _process_construction_cost,
+        "process_cost_history": _process_cost_history,
+        "process_median_income": _process_median_income,
+        "parse_numbers": _parse_numbers,
+        "Deflator.adjust": _adjust,
+    }
+    for name, make_setup in process_functions.items():
+        for rows in sizes(ROW_COUNTS):
+            cases.append(Case(name, {"rows": rows}, rows, "rows", make_setup(rows)))
+    for editions in sizes(EDITION_COUNTS):
+        setup = _process_cost_histories(editions)
+        rows = editions * 2000
+        cases.append(Case("process_cost_histories", {"editions": editions}, rows, "rows", setup))
+    for scenarios in sizes(SCENARIO_COUNTS):
+        setup = _project_median_income(scenarios)
+        params = {"scenarios": scenarios}
+        cases.append(Case("project_median_income", params, scenarios, "scenarios", setup))
+    for queries in sizes(QUERY_COUNTS):
+        setup = _query_affordability(queries)
+        params = {"queries": queries}
+        cases.append(Case("AffordabilityCube.query", params, queries, "queries", setup))
+    return cases
+
+
+def time_case(case: Case, tmp_dir: Path, repeats: int = 5, budget: float = 2.0) -> BenchmarkResult:
+    """Run a case up to `repeats` times, stopping early once `budget` seconds are spent.
+
+    A first untimed call warms up imports and caches. The best time is kept, as the
+    least disturbed by the rest of the machine.
+    """
+    func = case.setup(tmp_dir)
+    times: List[float] = []
+    with warnings.catch_warnings():
+        # pandas warns about fragmented frames in the wide synthetic inputs.
+        warnings.simplefilter("ignore")
+        func()
+        while len(times) < repeats and (not times or sum(times) < budget):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return BenchmarkResult(case.name, case.params, case.work, case.unit, min(times), len(times))
+
+
+def run_benchmarks(
+    cases: List[Case], repeats: int = 5, budget: float = 2.0
+) -> Iterator[BenchmarkResult]:
+    """Time every case on synthetic inputs written to a temporary directory.
+
+    The log messages of the benchmarked modules are silenced while they run.
+    """
+    logger.disable("housing_cost.pdf")
+    logger.disable("housing_cost.process")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for case in cases:
+                yield time_case(case, Path(tmp_dir), repeats, budget)
+    finally:
+        logger.enable("housing_cost.pdf")
+        logger.enable("housing_cost.process")
+
+
+def save_results(results: List[BenchmarkResult], path: Path) -> None:
+    import platform
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {
+            result.key: {**asdict(result), "throughput": result.throughput} for result in results
+        },
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_throughputs(path: Path) -> Dict[str, float]:
+    with open(path) as f:
+        return {key: entry["throughput"] for key, entry in json.load(f)["results"].items()}
+
+
+def find_regressions(
+    results: List[BenchmarkResult], baseline: Dict[str, float], tolerance: float = 0.25
+) -> List[Regression]:
+    """The cases whose throughput dropped more than `tolerance` below the baseline.
+
+    Cases missing from the baseline are not compared.
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.key)
+        if expected is not None and result.throughput < expected * (1 - tolerance):
+            regressions.append(Regression(result.key, expected, result.throughput))
+    return regressions
+
+
+@dataclass
+class ImportResult:
+    """The best time to import a module in a fresh interpreter."""
+
+    module: str
+    seconds: float
+    heavy: List[str]
+
+
+def time_import(module: str, repeats: int = 5) -> ImportResult:
+    """Import a module in `repeats` fresh interpreters and keep the best time.
+
+    Only the import itself is timed, not the start of the interpreter. The package is
+    compiled first, so stale bytecode is not recompiled on every import when Python does
+    not write it back, e.g. under PYTHONDONTWRITEBYTECODE. The result lists the
+    HEAVY_MODULES the import loaded.
+    """
+    import compileall
+
+    compileall.compile_dir(Path(__file__).parent, quiet=1)
+    times: List[float] = []
+    loaded: set = set()
+    for _ in range(repeats):
+        process = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SCRIPT.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(process.stdout.splitlines()[-1])
+        times.append(result["seconds"])
+        loaded.update(result["modules"])
+    return ImportResult(module, min(times), [m for m in HEAVY_MODULES if m in loaded])
+
+
+def _format_result(result: BenchmarkResult, baseline: Optional[float]) -> str:
+    line = (
+        f"{result.key:<70} {result.seconds * 1000:>10.2f} ms "
+        f"{result.throughput:>14,.0f} {result.unit}/s"
+    )
+    if baseline:
+        line += f" ({result.throughput / baseline - 1:+.0%})"
+    return line
+
+
+@app.callback()
+def main():
+    """Micro-benchmarks of the PDF and processing hot paths."""
+    configure_logging()
+
+
+@app.command()
+def run(
+    quick: bool = False,
+    match: Optional[str] = None,
+    repeats: int = 5,
+    output: Optional[Path] = None,
+    baseline: Path = BENCHMARK_BASELINE,
+    save_baseline: bool = False,
+    tolerance: float = 0.25,
+):
+    """Benchmark the PDF table and processing functions on synthetic inputs.
+
+    Runs offline: Textract is replaced by a mocked client that serves the synthetic
+    blocks in result pages. Each case is compared to the baseline and the command fails
+    if any throughput dropped by more than the tolerance, or if there is no baseline.
+    Cases the baseline does not hold are not compared. Pass --save-baseline to record
+    the results as the new baseline.
+    """
+    if not save_baseline and not baseline.exists():
+        logger.error(f"There is no baseline at {baseline}, record one with --save-baseline.")
+        raise typer.Exit(code=1)
+    cases = [case for case in benchmark_cases(quick) if match is None or match in case.name]
+    expected = {} if save_baseline else load_throughputs(baseline)
+    results: List[BenchmarkResult] = []
+    for result in run_benchmarks(cases, repeats):
+        logger.info(_format_result(result, expected.get(result.key)))
+        results.append(result)
+
+    if output is not None:
+        save_results(results, output)
+    if save_baseline:
+        save_results(results, baseline)
+        logger.success(f"Saved the baseline to {baseline}")
+        return
+
+    regressions = find_regressions(results, expected, tolerance)
+    for regression in regressions:
+        logger.error(
+            f"{regression.key} regressed {regression.change:.0%}: "
+            f"{regression.current:,.0f} vs {regression.baseline:,.0f} per second"
+        )
+    if regressions:
+        raise typer.Exit(code=1)
+    compared = sum(result.key in expected for result in results)
+    if compared < len(results):
+        logger.warning(f"{len(results) - compared} cases are not in the baseline {baseline}.")
+    logger.success(f"No throughput of {compared} cases regressed more than {tolerance:.0%}.")
+
+
+@app.command()
+def imports(budget_ms: float = IMPORT_BUDGET_MS, repeats: int = 5):
+    """Check that the command line modules import within the startup budget.
+
+    Every module in CLI_MODULES is imported in fresh interpreters. The command fails if
+    the best time of any is over the budget, or if it loads one of HEAVY_MODULES, which
+    only the commands that use them may import.
+    """
+    failed = False
+    for module in CLI_MODULES:
+        result = time_import(module, repeats)
+        milliseconds = result.seconds * 1000
+        logger.info(f"{module:<30} {milliseconds:>8.1f} ms")
+        if milliseconds > budget_ms:
+            logger.error(f"{module} took {milliseconds:.1f} ms to import, over {budget_ms} ms.")
+            failed = True
+        if result.heavy:
+            logger.error(f"{module} imports {', '.join(result.heavy)} on startup.")
+            failed = True
+    if failed:
+        raise typer.Exit(code=1)
+    logger.success(f"Every command line module imports within {budget_ms} ms.")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+_INT32 = np.iinfo(np.int32)
+
+
+def compact_series(series: pd.Series) -> pd.Series:
+    """A series in the narrowest of the dtypes used for processed data.
+
+    Text with repeated labels becomes a categorical, so every label is stored once and
+    rows hold small int codes; mostly unique text is kept, as codes would only add to it.
+    Integers that fit become int32, keeping nullable integers nullable, and floats
+    become float32, about 7 significant digits. Other dtypes are kept.
+    """
+    dtype = series.dtype
+    nullable = pd.api.types.is_extension_array_dtype(dtype)
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype):
+        low, high = series.min(), series.max()
+        fits = pd.isna(low) or (_INT32.min <= low and high <= _INT32.max)
+        if dtype.itemsize > 4 and fits:
+            return series.astype("Int32" if nullable else np.int32)
+        return series
+    if pd.api.types.is_float_dtype(dtype):
+        if dtype.itemsize > 4:
+            return series.astype("Float32" if nullable else np.float32)
+        return series
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if series.nunique(dropna=False) * 2 <= len(series):
+            return series.astype("category")
+    return series
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """A frame with every column and index level in its compact dtype, see `compact_series`."""
+    # Named index levels are compacted as columns; unnamed ones, e.g. positions, are kept.
+    names = list(df.index.names)
+    named = all(name is not None for name in names)
+    df = df.reset_index() if named else df.copy()
+    for column in df.columns:
+        df[column] = compact_series(df[column])
+    return df.set_index(names) if named else df
@@ -1,4 +1,5 @@
 from pathlib import Path
+import sys
 
 from dotenv import load_dotenv
 from loguru import logger
@@ -8,13 +9,20 @@ load_dotenv()
 
 # Paths
 PROJ_ROOT = Path(__file__).resolve().parents[1]
-logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
 
 DATA_DIR = PROJ_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 INTERIM_DATA_DIR = DATA_DIR / "interim"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 EXTERNAL_DATA_DIR = DATA_DIR / "external"
+CPI_SNAPSHOT_DIR = EXTERNAL_DATA_DIR / "cpi"
+SYNTHETIC_DATA_DIR = DATA_DIR / "synthetic"
+CACHE_DIR = DATA_DIR / "cache"
+TEXTRACT_CACHE_DIR = CACHE_DIR / "textract"
+SPREADSHEET_CACHE_DIR = CACHE_DIR / "spreadsheets"
+DOWNLOAD_MANIFEST = RAW_DATA_DIR / "manifest.json"
+PIPELINE_STATE = CACHE_DIR / "pipeline_state.json"
+CPI_REFRESHED = CACHE_DIR / "cpi_refreshed"
 
 COST_HISTORY_USD = PROCESSED_DATA_DIR / "construction_cost_history_usd.csv"
 COST_HISTORY_PERCENT = PROCESSED_DATA_DIR / "construction_cost_history.csv"
@@ -23,18 +31,49 @@ COST_DETAIL_TOTALS = PROCESSED_DATA_DIR / "construction_cost_totals.csv"
 COST_BREAKDOWN = PROCESSED_DATA_DIR / "cost_breakdown.csv"
 MEDIAN_INCOME = PROCESSED_DATA_DIR / "median_income.csv"
 SQUARE_FOOTAGE = PROCESSED_DATA_DIR / "square_footage.csv"
+AFFORDABILITY_CUBE = PROCESSED_DATA_DIR / "affordability_cube.npz"
+EDITIONS_DIR = PROCESSED_DATA_DIR / "editions"
+
+# The editions of the NAHB Construction Cost Survey and the numbers of the tables the
+# process command reads from each, as in `<pdf stem>__table_<N>__values.csv`. Editions
+# without table numbers are parsed but not processed; run the index command to find
+# where their tables are before adding them.
+EDITIONS = {
+    2024: {"construction_cost": [3], "cost_history": [5, 6], "cost_breakdown": [7, 8]},
+    2022: {},
+    2020: {},
+    2017: {},
+}
+# The editions whose table layout, and for the cost breakdown whose per-year totals, the
+# construction cost and cost breakdown processors are written for. Their tables in other
+# editions are not processed until the processors handle them.
+LAYOUT_EDITIONS = {"construction_cost": [2024], "cost_breakdown": [2024]}
 
 MODELS_DIR = PROJ_ROOT / "models"
 
+BENCHMARK_BASELINE = PROJ_ROOT / "benchmarks" / "baseline.json"
+
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
+PROFILES_DIR = REPORTS_DIR / "profiles"
+
+
+def _write_log(message: str) -> None:
+    # Without tqdm imported there is no progress bar to write around.
+    tqdm = sys.modules.get("tqdm")
+    if tqdm is None:
+        sys.stderr.write(message)
+    else:
+        tqdm.tqdm.write(message, end="")
+
 
-# If tqdm is installed, configure loguru with tqdm.write
-# https://github.com/Delgan/loguru/issues/135
-try:
-    from tqdm import tqdm
+def configure_logging() -> None:
+    """Set up loguru for the command line entry points.
 
-    logger.remove(0)
-    logger.add(lambda msg: tqdm.write(msg, end=""), colorize=True)
-except ModuleNotFoundError:
-    pass
+    Messages go through tqdm.write once tqdm is imported, so they do not break progress
+    bars (https://github.com/Delgan/loguru/issues/135). Importing this module has no
+    side effects beyond loading the .env file; the entry points call this instead.
+    """
+    logger.remove()
+    logger.add(_write_log, colorize=True)
+    logger.info(f"PROJ_ROOT path is: {PROJ_ROOT}")
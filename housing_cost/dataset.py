@@ -1,29 +1,100 @@
-import boto3
+from contextlib import ExitStack
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
 from loguru import logger
-import pandas as pd
-import requests
 import typer
 
 from housing_cost.config import (
+    AFFORDABILITY_CUBE,
     COST_BREAKDOWN,
     COST_DETAIL_SUBTOTALS,
     COST_DETAIL_TOTALS,
     COST_HISTORY_PERCENT,
     COST_HISTORY_USD,
+    CPI_SNAPSHOT_DIR,
+    DATA_DIR,
+    DOWNLOAD_MANIFEST,
+    EDITIONS,
+    EDITIONS_DIR,
     INTERIM_DATA_DIR,
+    LAYOUT_EDITIONS,
     MEDIAN_INCOME,
+    PIPELINE_STATE,
+    PROFILES_DIR,
     RAW_DATA_DIR,
+    SPREADSHEET_CACHE_DIR,
+    SYNTHETIC_DATA_DIR,
+    TEXTRACT_CACHE_DIR,
+    configure_logging,
 )
-from housing_cost.pdf import extract_pdf_tables
-from housing_cost.process import (
-    process_construction_cost_2024,
-    process_cost_breakdown,
-    process_cost_history,
-    process_median_income,
-)
+from housing_cost.inflation import CPI_MAX_AGE_DAYS, refresh_cpi
+from housing_cost.profiling import Profiler, set_profiler, stage
+
+if TYPE_CHECKING:
+    from housing_cost.pdf import ExtractionBackend
+    from housing_cost.pipeline import Stage
 
+# Commands import the modules that need boto3, requests, pdfplumber or pandas when they
+# run, so starting any command stays fast.
 app = typer.Typer()
 
+# The processors run for every survey edition and the combined files they write.
+EDITION_OUTPUTS: Dict[str, List[Path]] = {
+    "construction_cost": [COST_DETAIL_TOTALS, COST_DETAIL_SUBTOTALS],
+    "cost_history": [COST_HISTORY_PERCENT, COST_HISTORY_USD],
+    "cost_breakdown": [COST_BREAKDOWN],
+}
+# The editions parse extracts by default, those the processors read tables from.
+PARSE_EDITIONS = sorted({e for editions in LAYOUT_EDITIONS.values() for e in editions})
+
+
+def edition_pdf(edition: int) -> Path:
+    """The downloaded PDF of a survey edition."""
+    return RAW_DATA_DIR / f"NABH Construction Cost - {edition}.pdf"
+
+
+def select_editions(
+    editions: Optional[List[int]], default: Optional[List[int]] = None
+) -> List[int]:
+    """The given survey editions, or the default ones (every known edition) if none are."""
+    if not editions:
+        return sorted(EDITIONS if default is None else default)
+    unknown = sorted(set(editions) - EDITIONS.keys())
+    if unknown:
+        logger.error(f"Unknown survey editions {unknown}, expected some of {sorted(EDITIONS)}.")
+        raise typer.Exit(code=1)
+    return sorted(set(editions))
+
+
+@app.callback()
+def profile_command(ctx: typer.Context, profile: bool = False, cprofile: bool = False):
+    """Build the Housing Cost Dataset.
+
+    With --profile, the wall time, CPU time, peak memory and rows or bytes processed of
+    every stage and step of the command are written to reports/profiles as a JSON report
+    and a Chrome trace file (open it in chrome://tracing or https://ui.perfetto.dev).
+    Add --cprofile to also dump a cProfile of every stage.
+    """
+    configure_logging()
+    if not profile:
+        return
+    name = f"{ctx.invoked_subcommand}-{datetime.now():%Y%m%d-%H%M%S}"
+    profiler = Profiler(cprofile_dir=PROFILES_DIR / name if cprofile else None)
+    set_profiler(profiler)
+    stack = ExitStack()
+    stack.enter_context(profiler.span(ctx.invoked_subcommand or "main", "command"))
+
+    def write_profile():
+        stack.close()
+        logger.info("Profile:\n" + profiler.summary().to_string())
+        paths = profiler.write(PROFILES_DIR, name)
+        logger.success(f"Wrote profile to {', '.join(str(path) for path in paths)}")
+
+    ctx.call_on_close(write_profile)
+
 
 @app.command()
 def main():
@@ -31,8 +102,15 @@ def main():
 
 
 @app.command()
-def download():
-    """Download the NAHB Construction Cost Survey data."""
+def download(max_workers: int = 4, verify: bool = False):
+    """Download the NAHB Construction Cost Survey data.
+
+    Files are downloaded in parallel and streamed to disk. Files that did not change on
+    the server since the last run are not downloaded again, and interrupted downloads
+    are resumed.
+    """
+    from housing_cost.download import download_files
+
     logger.info("Downloading datasets...")
     urls = {
         "Table H-9 - All Households Income.xlsx": "https://www2.census.gov/programs-surveys/cps/tables/time-series/historical-income-households/h09ar.xlsx",
@@ -41,68 +119,389 @@ def download():
         "NABH Construction Cost - 2020.pdf": "https://www.nahb.org/-/media/8F04D7F6EAA34DBF8867D7C3385D2977.ashx",
         "NABH Construction Cost - 2017.pdf": "https://www.nahb.org/-/media/CC931183F12F43239FFDA9CD80A06F4D.ashx",
     }
-    for filename, url in urls.items():
-        logger.info(f"Downloading {filename}...")
-        response = requests.get(url, verify=False)
-        filepath = RAW_DATA_DIR / filename
-        with open(filepath, "wb") as f:
-            f.write(response.content)
-        logger.success(f"Downloaded {filename}.")
+    with stage("download"):
+        results = download_files(
+            urls, RAW_DATA_DIR, DOWNLOAD_MANIFEST, max_workers=max_workers, verify=verify
+        )
+    failed = [result for result in results if result.status == "failed"]
+    if failed:
+        logger.error(f"{len(failed)} of {len(results)} downloads failed.")
+        raise typer.Exit(code=1)
     logger.success("Downloading dataset complete.")
 
 
+class Backend(str, Enum):
+    textract = "textract"
+    pdfplumber = "pdfplumber"
+
+
 @app.command()
-def parse():
-    """Extract the tables from the PDF files."""
-    session = boto3.Session()
-    textract_client = session.client("textract", region_name="us-west-2")
-    s3_client = boto3.client("s3", region_name="us-west-2")
-    files = [
-        RAW_DATA_DIR / "NABH Construction Cost - 2024.pdf",
-    ]
-    extract_pdf_tables(
-        textract_client,
-        s3_client,
-        "nahb-construction-cost-survey",
-        files,
-        INTERIM_DATA_DIR,
+def parse(
+    backend: Backend = Backend.textract,
+    max_concurrent_jobs: int = 4,
+    max_workers: Optional[int] = None,
+    sqs_queue_url: Optional[str] = None,
+    sns_topic_arn: Optional[str] = None,
+    role_arn: Optional[str] = None,
+    use_cache: bool = True,
+    cache_max_mb: float = 1024,
+    tables: Optional[List[int]] = None,
+    table_pages: bool = False,
+    keep_bucket: bool = False,
+    s3_endpoint_url: Optional[str] = None,
+    confidence_threshold: float = 80.0,
+    edition: Optional[List[int]] = None,
+    parquet: bool = False,
+):
+    """Extract the tables from the PDF files.
+
+    The survey editions the processors handle, see LAYOUT_EDITIONS, are extracted unless
+    --edition is given, one or more times, so no Textract pages are paid for tables
+    nothing reads. Pass --edition to extract other editions anyway, e.g. to find their
+    tables.
+
+    The textract backend runs AWS Textract. Pass an SQS queue subscribed to an SNS topic
+    that Textract can publish to (with the role that allows it) to pick up jobs as soon as
+    they finish instead of polling. Textract results are cached by file contents, so
+    unchanged PDFs are not analyzed again.
+
+    Whole documents are sent to Textract. With --table-pages only the pages holding the
+    given tables (by default the tables the process command reads from each edition)
+    are sent, as found by a local pre-scan whose index is saved next to the extracted
+    tables. The tables keep their numbers in the whole document as long as Textract finds
+    as many tables on every page as the pre-scan; a file where it does not fails, and
+    must be parsed without --table-pages.
+
+    With --keep-bucket the S3 staging bucket is kept between runs, files it already
+    holds are not uploaded again and a lifecycle rule expires old uploads.
+
+    With --parquet a typed Parquet file of every table, with the parsed number, unit and
+    confidence of each cell, is written next to its CSVs for `read_table`.
+
+    Afterwards every extracted table is checked for cells below the confidence threshold.
+
+    The pdfplumber backend runs locally without network access, spreading pages across
+    max_workers processes.
+    """
+    from housing_cost.pdf import (
+        PdfPlumberBackend,
+        SQSCompletionChannel,
+        StagingBucket,
+        TextractBackend,
+        TextractCache,
+        TextractJobWaiter,
+        load_table_index,
     )
+
+    editions = select_editions(edition, PARSE_EDITIONS)
+    files = [edition_pdf(e) for e in editions]
+    extraction_backend: ExtractionBackend
+    if backend == Backend.pdfplumber:
+        extraction_backend = PdfPlumberBackend(max_workers=max_workers, parquet=parquet)
+    else:
+        import boto3
+
+        session = boto3.Session()
+        textract_client = session.client("textract", region_name="us-west-2")
+        s3_client = boto3.client("s3", region_name="us-west-2", endpoint_url=s3_endpoint_url)
+        channel = None
+        if sqs_queue_url and sns_topic_arn and role_arn:
+            sqs_client = session.client("sqs", region_name="us-west-2")
+            channel = SQSCompletionChannel(sqs_client, sqs_queue_url, sns_topic_arn, role_arn)
+        textract_cache = None
+        if use_cache:
+            textract_cache = TextractCache(TEXTRACT_CACHE_DIR, int(cache_max_mb * 1024**2))
+        subsets = None
+        if table_pages:
+            # Editions without known table numbers submit every page holding a table.
+            with stage("index"):
+                subsets = {
+                    file: load_table_index(file, INTERIM_DATA_DIR, max_workers).subset(
+                        tables or edition_tables(e) or None
+                    )
+                    for e, file in zip(editions, files)
+                }
+        extraction_backend = TextractBackend(
+            textract_client,
+            s3_client,
+            "nahb-construction-cost-survey",
+            max_concurrent_jobs=max_concurrent_jobs,
+            waiter=TextractJobWaiter(textract_client, channel=channel),
+            cache=textract_cache,
+            subsets=subsets,
+            parquet=parquet,
+            staging=StagingBucket(
+                s3_client, "nahb-construction-cost-survey", "us-west-2", persistent=keep_bucket
+            ),
+        )
+    with stage("extract", bytes=sum(file.stat().st_size for file in files)):
+        extraction_backend.extract(files, INTERIM_DATA_DIR)
     logger.success("Extracting tables complete.")
+    confidence(confidence_threshold)
 
 
 @app.command()
-def process():
-    """Process the data."""
-    logger.info("Processing construction cost...")
-    totals, subtotals = process_construction_cost_2024(
-        INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_3__values.csv"
-    )
-    totals.to_csv(COST_DETAIL_TOTALS)
-    subtotals.to_csv(COST_DETAIL_SUBTOTALS)
-
-    logger.info("Processing cost history...")
-    part_1_path = INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_5__values.csv"
-    part_2_path = INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_6__values.csv"
-    df_1, dfc_1 = process_cost_history(part_1_path)
-    df_2, dfc_2 = process_cost_history(part_2_path)
-    df = pd.concat([df_1, df_2])
-    dfc = pd.concat([dfc_1, dfc_2])
-    df.to_csv(COST_HISTORY_PERCENT)
-    dfc.to_csv(COST_HISTORY_USD)
-
-    logger.info("Processing median income...")
-    inflation_rate = 1.029
-    income_growth_rate = 1.04
-    df = process_median_income(
-        RAW_DATA_DIR / "Table H-9 - All Households Income.xlsx",
+def confidence(threshold: float = 80.0, cells: bool = False):
+    """Report the extracted tables, rows and cells below a confidence threshold."""
+    from housing_cost.pdf import load_confidence_matrices, scan_confidence
+
+    with stage("confidence"):
+        report = scan_confidence(load_confidence_matrices(INTERIM_DATA_DIR), threshold)
+    logger.info(report.summary())
+    if cells and len(report.cells):
+        logger.info("\n" + report.cells.to_string(index=False))
+
+
+@app.command()
+def index(max_workers: Optional[int] = None, edition: Optional[List[int]] = None):
+    """Pre-scan the PDF files locally and save which pages hold tables."""
+    from housing_cost.pdf import load_table_index
+
+    for file in [edition_pdf(e) for e in select_editions(edition)]:
+        table_index = load_table_index(file, INTERIM_DATA_DIR, max_workers)
+        for page, count in sorted(table_index.pages.items()):
+            first = table_index.first_table_number(page)
+            numbers = ", ".join(str(n) for n in range(first, first + count))
+            logger.info(f"{file.name} page {page}: tables {numbers}")
+
+
+@app.command()
+def cache(prune: bool = False, max_mb: Optional[float] = None, clear: bool = False):
+    """Inspect or prune the cache of Textract results."""
+    from housing_cost.pdf import TextractCache
+
+    textract_cache = TextractCache(TEXTRACT_CACHE_DIR)
+    if clear:
+        max_mb = 0
+    if prune or max_mb is not None:
+        max_bytes = int(max_mb * 1024**2) if max_mb is not None else None
+        evicted = textract_cache.prune(max_bytes)
+        logger.info(f"Evicted {len(evicted)} entries ({sum(e.size for e in evicted)} bytes).")
+
+    entries = textract_cache.entries()
+    for entry in reversed(entries):
+        last_used = datetime.fromtimestamp(entry.last_used).isoformat(timespec="seconds")
+        logger.info(f"{entry.key[:16]}  {entry.size / 1024:10.1f} KiB  last used {last_used}")
+    logger.info(f"{len(entries)} entries, {textract_cache.size() / 1024**2:.1f} MiB in total.")
+
+
+@app.command()
+def update_cpi(max_age_days: float = CPI_MAX_AGE_DAYS, force: bool = False):
+    """Download the latest CPI data the processors adjust dollar values with.
+
+    The data is only downloaded if it is older than --max-age-days, or with --force.
+    The process command itself runs offline on the data downloaded last.
+    """
+    if refresh_cpi(max_age_days, force):
+        logger.success("Updated the CPI data. Run snapshot-cpi to process with it.")
+
+
+@app.command()
+def snapshot_cpi(version: Optional[str] = None, last_year: Optional[int] = None):
+    """Write a versioned snapshot of the local CPI data for the processors.
+
+    The processors adjust dollar values with a snapshot rather than the cpi package,
+    so they run offline and give the same results until another snapshot is written.
+    The version defaults to today's date; process uses the latest one.
+    """
+    from housing_cost.deflator import write_cpi_snapshot
+
+    path = write_cpi_snapshot(version, last_year=last_year)
+    logger.success(f"Wrote the CPI snapshot {path}")
+
+
+def edition_tables(edition: int) -> List[int]:
+    """The numbers of every table the process command reads from a survey edition."""
+    return sorted({number for numbers in EDITIONS[edition].values() for number in numbers})
+
+
+def process_stages(
+    inflation_rate: float,
+    income_growth_rate: float,
+    editions: List[int],
+    target_year: int = 2024,
+    data_dir: Optional[Path] = None,
+    cpi_snapshot: Optional[str] = None,
+) -> List["Stage"]:
+    """The stages of the process command, with the files they read and write.
+
+    Every processor runs once per edition with table numbers in EDITIONS, writing to its
+    own directory under EDITIONS_DIR, so editions are processed in parallel. Editions
+    whose table layout a processor is not written for, see LAYOUT_EDITIONS, are skipped.
+    A combine stage per output file then stacks the editions into the processed file,
+    keyed by an edition column.
+    The affordability stage last materializes the cube of the processed costs.
+
+    With a data directory, every file is read and written there instead of DATA_DIR,
+    at the same relative path, including the spreadsheet cache.
+
+    The CPI snapshot version is a parameter of the stages that adjust for inflation,
+    so they are rebuilt when another snapshot is used.
+    """
+    from housing_cost.pipeline import Stage
+
+    def at(path: Path) -> Path:
+        return path if data_dir is None else data_dir / path.relative_to(DATA_DIR)
+
+    stages = [
+        Stage(
+            "median_income",
+            "housing_cost.process.stages:median_income",
+            inputs=[at(RAW_DATA_DIR / "Table H-9 - All Households Income.xlsx")],
+            outputs=[at(MEDIAN_INCOME)],
+            params={
+                "inflation_rate": inflation_rate,
+                "income_growth_rate": income_growth_rate,
+                "cache_dir": str(at(SPREADSHEET_CACHE_DIR)),
+            },
+        ),
+    ]
+    for processor, outputs in EDITION_OUTPUTS.items():
+        edition_outputs: List[List[Path]] = []
+        for edition in editions:
+            numbers = EDITIONS[edition].get(processor)
+            if not numbers:
+                continue
+            if edition not in LAYOUT_EDITIONS.get(processor, [edition]):
+                logger.warning(f"{processor} does not handle the {edition} tables, skipping it.")
+                continue
+            table = f"{edition_pdf(edition).stem}__table_{{}}__values.csv"
+            params: Dict[str, Any] = {"edition": edition}
+            if processor == "cost_history":
+                params["target_year"] = target_year
+            if processor in ("cost_history", "cost_breakdown"):
+                params["cpi_snapshot"] = cpi_snapshot
+            edition_outputs.append([at(EDITIONS_DIR / str(edition) / o.name) for o in outputs])
+            stages.append(
+                Stage(
+                    f"{processor}_{edition}",
+                    f"housing_cost.process.stages:{processor}",
+                    inputs=[at(INTERIM_DATA_DIR / table.format(n)) for n in numbers],
+                    outputs=edition_outputs[-1],
+                    params=params,
+                )
+            )
+        if not edition_outputs:
+            logger.warning(f"No edition has the tables of {processor}, skipping it.")
+            continue
+        for i, output in enumerate(outputs):
+            stages.append(
+                Stage(
+                    f"combine_{output.stem}",
+                    "housing_cost.process.stages:combine_editions",
+                    inputs=[paths[i] for paths in edition_outputs],
+                    outputs=[at(output)],
+                )
+            )
+
+    inputs = [at(COST_BREAKDOWN), at(COST_HISTORY_USD), at(MEDIAN_INCOME)]
+    produced = {output for s in stages for output in s.outputs}
+    if all(path in produced for path in inputs):
+        stages.append(
+            Stage(
+                "affordability",
+                "housing_cost.process.stages:affordability",
+                inputs=inputs,
+                outputs=[at(AFFORDABILITY_CUBE)],
+                params={"target_year": target_year, "cpi_snapshot": cpi_snapshot},
+            )
+        )
+    else:
+        logger.warning(
+            "The cost breakdown or cost history is not processed, skipping affordability."
+        )
+    return stages
+
+
+@app.command()
+def process(
+    max_workers: Optional[int] = None,
+    force: bool = False,
+    inflation_rate: float = 1.029,
+    income_growth_rate: float = 1.04,
+    target_year: int = 2024,
+    edition: Optional[List[int]] = None,
+    data_dir: Optional[Path] = None,
+    cpi_snapshot: Optional[str] = None,
+):
+    """Process the data.
+
+    Every survey edition with known table numbers is processed unless --edition is
+    given, one or more times. Each edition runs in its own worker process and the
+    results are combined into files with an edition column.
+
+    Only the stages whose input files, parameters or output files changed since the
+    last run are rebuilt; independent stages run in parallel. Pass --force to rebuild
+    everything.
+
+    Pass --data-dir to process another data directory, e.g. one written by the
+    synthesize command.
+
+    Dollar values are adjusted for inflation with the latest CPI snapshot, or the one
+    given with --cpi-snapshot. CPI data is not downloaded or exported here; run
+    update-cpi and then snapshot-cpi first.
+    """
+    from housing_cost.deflator import cpi_snapshot_versions
+    from housing_cost.pipeline import Pipeline
+
+    versions = cpi_snapshot_versions(CPI_SNAPSHOT_DIR)
+    if not versions:
+        logger.error(
+            f"No CPI snapshot in {CPI_SNAPSHOT_DIR}. "
+            "Run update-cpi and then snapshot-cpi to write one."
+        )
+        raise typer.Exit(code=1)
+    if cpi_snapshot is None:
+        cpi_snapshot = versions[-1]
+    elif cpi_snapshot not in versions:
+        logger.error(f"Unknown CPI snapshot {cpi_snapshot!r}, expected one of {versions}.")
+        raise typer.Exit(code=1)
+    stages = process_stages(
         inflation_rate,
         income_growth_rate,
+        select_editions(edition),
+        target_year,
+        data_dir,
+        cpi_snapshot,
     )
-    df.to_csv(MEDIAN_INCOME)
+    state_path = PIPELINE_STATE
+    if data_dir is not None:
+        state_path = data_dir / PIPELINE_STATE.relative_to(DATA_DIR)
+    pipeline = Pipeline(stages, state_path)
+    results = pipeline.run(max_workers=max_workers, force=force)
+    failed = [result for result in results.values() if result.status == "failed"]
+    if failed:
+        logger.error(f"{len(failed)} of {len(results)} stages failed.")
+        raise typer.Exit(code=1)
+    built = sum(result.status == "built" for result in results.values())
+    logger.success(f"Processing complete, {built} of {len(results)} stages rebuilt.")
+
 
-    logger.info("Processing cost breakdown...")
-    df = process_cost_breakdown()
-    df.to_csv(COST_BREAKDOWN)
+@app.command()
+def synthesize(
+    output_dir: Path = SYNTHETIC_DATA_DIR,
+    regions: int = 1,
+    items: int = 5,
+    years: int = 14,
+    edition: int = 2024,
+    seed: int = 0,
+):
+    """Write a synthetic survey to load test the process command.
+
+    The extracted tables of an edition and the H-9 spreadsheet are written with the
+    formatting of the real files ($ signs, thousands separators, percents, quoted cells)
+    at any size: every region repeats the line items of the cost tables, and years
+    extend the cost history and median income back in time. Process it with
+    `process --data-dir <output-dir>`.
+    """
+    from housing_cost.synthetic import SurveyShape, write_survey
+
+    shape = SurveyShape(regions=regions, items=items, years=years, seed=seed)
+    paths = write_survey(output_dir, shape, edition)
+    size = sum(path.stat().st_size for path in paths)
+    logger.success(
+        f"Wrote {len(paths)} synthetic files ({size / 1024**2:.1f} MiB) to {output_dir}"
+    )
 
 
 if __name__ == "__main__":
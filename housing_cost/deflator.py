@@ -0,0 +1,215 @@
+from datetime import date
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from housing_cost.config import CPI_SNAPSHOT_DIR
+
+# The CPI series of every variant, by BLS series id. They are not seasonally adjusted, so
+# they have annual averages as well as monthly values.
+VARIANTS = {
+    "cpi_u": "CUUR0000SA0",  # All urban consumers, all items; the default of the cpi package
+    "cpi_w": "CWUR0000SA0",  # Urban wage earners and clerical workers, all items
+    "core": "CUUR0000SA0L1E",  # All urban consumers, all items less food and energy
+}
+DEFAULT_VARIANT = "cpi_u"
+FIRST_YEAR = 1913
+
+_META = "meta.json"
+_ANNUAL = "annual.npy"
+_MONTHLY = "monthly.npy"
+
+
+class Deflator:
+    """Adjusts dollar values for inflation with a CPI snapshot.
+
+    The snapshot holds one row per CPI variant of annual averages, indexed by year, and
+    of monthly values, indexed by month since January of the first year. Missing periods
+    are NaN. Lookups are array indexing, so whole columns are adjusted in one operation
+    without network or database access.
+    """
+
+    def __init__(
+        self,
+        annual: np.ndarray,
+        monthly: np.ndarray,
+        variants: List[str],
+        first_year: int = FIRST_YEAR,
+        version: str = "",
+    ) -> None:
+        self.annual = annual
+        self.monthly = monthly
+        self.variants = variants
+        self.first_year = first_year
+        self.version = version
+
+    @classmethod
+    def load(cls, version: Optional[str] = None, directory: Path = CPI_SNAPSHOT_DIR) -> "Deflator":
+        """Memory-map a snapshot written by `write_cpi_snapshot`.
+
+        Args:
+            version: The snapshot to load. Defaults to the latest one.
+            directory: The directory holding a subdirectory per snapshot version.
+        """
+        if version is None:
+            versions = cpi_snapshot_versions(directory)
+            if not versions:
+                raise FileNotFoundError(
+                    f"No CPI snapshot in {directory}. "
+                    "Write one with `python housing_cost/dataset.py snapshot-cpi`."
+                )
+            version = versions[-1]
+        path = directory / version
+        if not (path / _META).exists():
+            raise FileNotFoundError(f"No CPI snapshot {version!r} in {directory}.")
+        with open(path / _META) as f:
+            meta = json.load(f)
+        return cls(
+            np.load(path / _ANNUAL, mmap_mode="r"),
+            np.load(path / _MONTHLY, mmap_mode="r"),
+            list(meta["variants"]),
+            meta["first_year"],
+            version,
+        )
+
+    def cpi(
+        self,
+        years: npt.ArrayLike,
+        months: Optional[npt.ArrayLike] = None,
+        variant: str = DEFAULT_VARIANT,
+    ) -> np.ndarray:
+        """The CPI of every period, as an array shaped like `years`.
+
+        Args:
+            years: The years, as numbers or numeric strings.
+            months: The months (1 to 12) for monthly values; annual averages if None.
+            variant: One of the variants in the snapshot.
+
+        Raises:
+            ValueError: If the snapshot has no CPI for some of the periods.
+        """
+        if variant not in self.variants:
+            raise ValueError(f"Unknown CPI variant {variant!r}, expected one of {self.variants}")
+        row = self.variants.index(variant)
+        positions = np.asarray(years).astype(np.int64) - self.first_year
+        if months is None:
+            series = self.annual[row]
+        else:
+            series = self.monthly[row]
+            positions = positions * 12 + np.asarray(months).astype(np.int64) - 1
+        inside = (positions >= 0) & (positions < len(series))
+        values = np.full(positions.shape, np.nan)
+        values[inside] = series[positions[inside]]
+        missing = np.isnan(values)
+        if missing.any():
+            periods = np.unique(np.asarray(years)[missing])[:10].tolist()
+            raise ValueError(
+                f"The CPI snapshot {self.version!r} has no {variant} values for {periods}"
+            )
+        return values
+
+    def adjust(
+        self,
+        values: npt.ArrayLike,
+        years: npt.ArrayLike,
+        target_year: int,
+        months: Optional[npt.ArrayLike] = None,
+        target_month: Optional[int] = None,
+        variant: str = DEFAULT_VARIANT,
+    ) -> np.ndarray:
+        """Express dollar values of the given periods in dollars of the target period.
+
+        Args:
+            values: Dollar values, broadcast against `years`.
+            years: The year of every value.
+            target_year: The year to adjust the values to.
+            months: The month of every value, to adjust with monthly values.
+            target_month: The month to adjust to; the annual average of the target year
+                if None.
+            variant: The CPI variant to adjust with.
+        """
+        target = self.cpi(target_year, target_month, variant)
+        return np.asarray(values, dtype=float) * (target / self.cpi(years, months, variant))
+
+
+def cpi_snapshot_versions(directory: Path = CPI_SNAPSHOT_DIR) -> List[str]:
+    """The versions of the CPI snapshots in a directory, oldest first."""
+    if not directory.exists():
+        return []
+    # Snapshots being written are in hidden directories.
+    paths = directory.glob(f"*/{_META}")
+    return sorted(path.parent.name for path in paths if not path.parent.name.startswith("."))
+
+
+def write_cpi_snapshot(
+    version: Optional[str] = None,
+    directory: Path = CPI_SNAPSHOT_DIR,
+    last_year: Optional[int] = None,
+    variants: Dict[str, str] = VARIANTS,
+) -> Path:
+    """Export the CPI data of the cpi package's local database to a snapshot.
+
+    The database is read offline, as it was last refreshed by the update-cpi command.
+    Snapshots are never overwritten, so a version gives the same results on every run.
+
+    Args:
+        version: The name of the snapshot. Defaults to today's date.
+        directory: The directory to write the snapshot to, in a subdirectory per version.
+        last_year: The last year exported. Defaults to the current year.
+        variants: The BLS series id of every variant to export.
+
+    Returns:
+        The directory of the snapshot.
+    """
+    import cpi  # type: ignore
+    from cpi.errors import CPIObjectDoesNotExist  # type: ignore
+
+    version = version or date.today().isoformat()
+    path = directory / version
+    if path.exists():
+        raise FileExistsError(f"The CPI snapshot {path} already exists.")
+    last_year = last_year or date.today().year
+    years = range(FIRST_YEAR, last_year + 1)
+
+    def value(period, series_id: str) -> float:
+        try:
+            return float(cpi.get(period, series_id=series_id))
+        except CPIObjectDoesNotExist:
+            return np.nan
+
+    annual = np.array(
+        [[value(year, series_id) for year in years] for series_id in variants.values()]
+    )
+    monthly = np.array(
+        [
+            [value(date(year, month, 1), series_id) for year in years for month in range(1, 13)]
+            for series_id in variants.values()
+        ]
+    )
+
+    # Write next to the final directory and rename, so a snapshot is never half written.
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(dir=directory, prefix=f".{version}."))
+    try:
+        np.save(tmp_path / _ANNUAL, annual)
+        np.save(tmp_path / _MONTHLY, monthly)
+        meta = {
+            "version": version,
+            "first_year": FIRST_YEAR,
+            "last_year": last_year,
+            "variants": variants,
+            "created": date.today().isoformat(),
+        }
+        with open(tmp_path / _META, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.rename(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return path
@@ -0,0 +1,265 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+from typing import Dict, List, Optional
+
+from loguru import logger
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from housing_cost.files import file_sha256
+from housing_cost.profiling import span
+
+CHUNK_SIZE = 1024 * 1024
+PART_SUFFIX = ".part"
+
+
+@dataclass
+class ManifestEntry:
+    """What was downloaded for a file and how to check it is still current."""
+
+    url: str
+    sha256: str
+    size: int
+    mtime_ns: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass
+class DownloadResult:
+    """The outcome of downloading a single file."""
+
+    filename: str
+    status: str  # "downloaded", "resumed", "unchanged" or "failed"
+    bytes_received: int = 0
+    error: Optional[str] = None
+
+
+class DownloadManifest:
+    """A JSON file recording the validators and checksum of every downloaded file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            with open(path) as f:
+                self.entries = {
+                    name: ManifestEntry(**entry) for name, entry in json.load(f).items()
+                }
+
+    def get(self, filename: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            return self.entries.get(filename)
+
+    def set(self, filename: str, entry: ManifestEntry) -> None:
+        with self._lock:
+            self.entries[filename] = entry
+
+    def save(self) -> None:
+        with self._lock:
+            data = {name: asdict(entry) for name, entry in sorted(self.entries.items())}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def create_session(max_connections: int = 4, retries: int = 3) -> requests.Session:
+    """A session with a connection pool per host and retries on transient errors."""
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=max_connections, pool_maxsize=max_connections, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download_files(
+    urls: Dict[str, str],
+    output_dir: Path,
+    manifest_path: Path,
+    max_workers: int = 4,
+    session: Optional[requests.Session] = None,
+    verify: bool = True,
+    timeout: float = 60,
+) -> List[DownloadResult]:
+    """Download files in parallel, skipping those that have not changed.
+
+    Each response is streamed to `<name>.part` in chunks and renamed into place once
+    complete. The ETag and Last-Modified of every download are kept in the manifest and
+    sent back as If-None-Match and If-Modified-Since, so an unchanged file costs a
+    single request answered with 304. The validators of a download in progress are kept
+    next to its `.part` file, so an interrupted download is resumed with a Range request
+    when the server still has the same version.
+
+    Every file is checked against the SHA-256 recorded in the manifest; a local file
+    that no longer matches is downloaded again.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = DownloadManifest(manifest_path)
+    session = session or create_session(max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _download_file, session, url, output_dir / filename, manifest, verify, timeout
+            )
+            for filename, url in urls.items()
+        ]
+        results = [future.result() for future in futures]
+    manifest.save()
+    return results
+
+
+def _download_file(
+    session: requests.Session,
+    url: str,
+    path: Path,
+    manifest: DownloadManifest,
+    verify: bool,
+    timeout: float,
+) -> DownloadResult:
+    with span("download_file") as download_span:
+        result = _fetch_file(session, url, path, manifest, verify, timeout)
+        download_span.add(bytes=result.bytes_received)
+    return result
+
+
+def _fetch_file(
+    session: requests.Session,
+    url: str,
+    path: Path,
+    manifest: DownloadManifest,
+    verify: bool,
+    timeout: float,
+) -> DownloadResult:
+    filename = path.name
+    try:
+        entry = manifest.get(filename)
+        current = entry if entry and entry.url == url and _is_intact(path, entry) else None
+        part_path = path.with_name(path.name + PART_SUFFIX)
+        part_info_path = path.with_name(path.name + PART_SUFFIX + ".json")
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        part_info = _read_part_info(part_info_path) if offset else None
+
+        headers: Dict[str, str] = {}
+        if current is not None:
+            if current.etag:
+                headers["If-None-Match"] = current.etag
+            if current.last_modified:
+                headers["If-Modified-Since"] = current.last_modified
+        elif part_info is not None and part_info.get("url") == url:
+            validator = part_info.get("etag") or part_info.get("last_modified")
+            if validator:
+                # The server only sends the rest if the part belongs to the same version.
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+
+        with session.get(
+            url, headers=headers, stream=True, verify=verify, timeout=timeout
+        ) as response:
+            if response.status_code == 304 and current is not None:
+                logger.info(f"{filename} is up to date.")
+                return DownloadResult(filename, "unchanged")
+            if response.status_code == 416:
+                # The part is no longer valid for the file on the server, start over.
+                part_path.unlink()
+                return _fetch_file(session, url, path, manifest, verify, timeout)
+            response.raise_for_status()
+
+            resumed = response.status_code == 206
+            digest = hashlib.sha256()
+            if resumed:
+                with open(part_path, "rb") as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+            else:
+                offset = 0
+                _write_part_info(part_info_path, url, response.headers)
+
+            received = 0
+            with open(part_path, "ab" if resumed else "wb") as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    received += len(chunk)
+
+            # Content-Length counts the bytes on the wire, before any Content-Encoding
+            # such as gzip is decoded, so it is checked against the raw stream.
+            expected = response.headers.get("Content-Length")
+            if expected is not None and response.raw.tell() != int(expected):
+                raise IOError(f"received {response.raw.tell()} of {expected} bytes")
+
+            os.replace(part_path, path)
+            part_info_path.unlink(missing_ok=True)
+            stat = path.stat()
+            manifest.set(
+                filename,
+                ManifestEntry(
+                    url=url,
+                    sha256=digest.hexdigest(),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                ),
+            )
+        status = "resumed" if resumed else "downloaded"
+        logger.success(f"Downloaded {filename} ({offset + received} bytes, {status}).")
+        return DownloadResult(filename, status, received)
+    except Exception as e:
+        logger.error(f"Error downloading {filename}: {e}")
+        return DownloadResult(filename, "failed", error=str(e))
+
+
+def _read_part_info(path: Path) -> Optional[Dict[str, str]]:
+    """The URL and validators of the response a `.part` file was written from."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_part_info(path: Path, url: str, headers) -> None:
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "url": url,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+            },
+            f,
+        )
+
+
+def _is_intact(path: Path, entry: ManifestEntry) -> bool:
+    """Check a downloaded file against its recorded checksum.
+
+    The file is only hashed again when its size or modification time changed.
+    """
+    if not path.exists():
+        return False
+    stat = path.stat()
+    if stat.st_size != entry.size:
+        return False
+    if stat.st_mtime_ns == entry.mtime_ns:
+        return True
+    if file_sha256(path) != entry.sha256:
+        return False
+    entry.mtime_ns = stat.st_mtime_ns
+    return True
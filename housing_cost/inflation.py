@@ -0,0 +1,42 @@
+import time
+
+from loguru import logger
+
+from housing_cost.config import CPI_REFRESHED
+
+# How long downloaded CPI data is used before the update-cpi command fetches it again.
+CPI_MAX_AGE_DAYS = 30
+
+
+def cpi_age_days() -> float | None:
+    """Days since the CPI data was last refreshed, or None if it never was."""
+    try:
+        refreshed = CPI_REFRESHED.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    return (time.time() - refreshed) / 86400
+
+
+def refresh_cpi(max_age_days: float = CPI_MAX_AGE_DAYS, force: bool = False) -> bool:
+    """Download the latest CPI data unless it was refreshed in the last `max_age_days`.
+
+    The cpi package keeps its data in a local database that the processors read offline,
+    so this is the only step that needs network access. The time of the last refresh is
+    recorded in CPI_REFRESHED. Returns whether the data was downloaded.
+
+    Args:
+        max_age_days: How old the data may be before it is downloaded again.
+        force: Download the data regardless of its age.
+    """
+    age = cpi_age_days()
+    if not force and age is not None and age < max_age_days:
+        logger.info(f"The CPI data was refreshed {age:.1f} days ago, skipping.")
+        return False
+
+    import cpi  # type: ignore
+
+    logger.info("Downloading the latest CPI data...")
+    cpi.update()
+    CPI_REFRESHED.parent.mkdir(parents=True, exist_ok=True)
+    CPI_REFRESHED.touch()
+    return True
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Units a parsed cell can have. Cells that are not numbers have no unit.
+UNITS = ["usd", "percent", "number"]
+
+# Spaces, line breaks, thousands separators and quotes left by the PDF parser are dropped.
+_IGNORED = [" ", "\n", "\t", ",", '"']
+# A number, possibly negative in parentheses, with a $ sign or a % sign. The signs and
+# parentheses are only at the ends, so trimming them leaves the number.
+_SIGNS = "$%()"
+_NUMBER = r"^\$?\(?\$?-?(?:\d+(?:\.\d*)?|\.\d+)%?\)?%?$"
+# A number followed by a footnote reference, e.g. "2013 (38)" once compacted to "2013(38)".
+_FOOTNOTE = r"^(?P<number>.*[\d%])\((?P<footnote>\d+)\)$"
+# How many rejected cells are listed in a warning.
+_SHOWN = 10
+
+
+@dataclass
+class ParsedNumbers:
+    """The numbers parsed from a column of survey cells.
+
+    Attributes:
+        text: The cell text.
+        values: The numbers as float64, NaN for blank and rejected cells.
+        units: "usd", "percent" or "number" for numeric cells, missing otherwise.
+        footnotes: The footnote references of cells like "2013 (38)", as Int64.
+        rejected: True for the cells that are not blank but hold no number.
+    """
+
+    text: pd.Series
+    values: pd.Series
+    units: pd.Series
+    footnotes: pd.Series
+    rejected: pd.Series
+
+    def rejected_cells(self) -> pd.Series:
+        """The text of the rejected cells, by index."""
+        return self.text[self.rejected]
+
+
+def parse_numbers(text: pd.Series) -> ParsedNumbers:
+    """Parse currency, percent and plain number cells in one vectorized pass.
+
+    Thousands separators, whitespace and quotes are ignored, numbers in parentheses are
+    negative and a parenthesized number after another is a footnote reference. Cells
+    that are neither blank nor a number are rejected rather than raising.
+
+    The cells are parsed with Arrow compute kernels, which run the string operations
+    and the conversion to numbers over the whole column at native speed.
+    """
+    try:
+        compact = pa.array(text, type=pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Columns mixing numbers and text, e.g. read from a spreadsheet.
+        compact = pa.array(text.astype("string"), type=pa.string(), from_pandas=True)
+    for ignored in _IGNORED:
+        compact = pc.replace_substring(compact, ignored, "")
+
+    # Footnotes are rare, so they are split off only the cells that have one.
+    has_footnote = pc.fill_null(pc.match_substring_regex(compact, r"[\d%]\(\d+\)$"), False)
+    footnotes = pa.nulls(len(compact), pa.int64())
+    if pc.any(has_footnote).as_py():
+        parts = pc.extract_regex(pc.filter(compact, has_footnote), _FOOTNOTE)
+        compact = pc.replace_with_mask(compact, has_footnote, parts.field("number"))
+        footnotes = pc.replace_with_mask(
+            footnotes, has_footnote, pc.cast(parts.field("footnote"), pa.int64())
+        )
+
+    is_number = pc.fill_null(pc.match_substring_regex(compact, _NUMBER), False)
+    is_blank = pc.fill_null(pc.equal(compact, ""), True)
+    digits = pc.ascii_trim(compact, _SIGNS)
+    value = pc.cast(pc.if_else(is_number, digits, None), pa.float64())
+    is_negative = pc.fill_null(pc.match_substring(compact, "("), False)
+    value = pc.if_else(is_negative, pc.negate(value), value)
+
+    is_usd = pc.fill_null(pc.match_substring(compact, "$"), False)
+    is_percent = pc.fill_null(pc.match_substring(compact, "%"), False)
+    unit = np.select(
+        [is_usd.to_numpy(zero_copy_only=False), is_percent.to_numpy(zero_copy_only=False)],
+        [0, 1],
+        default=2,
+    )
+    is_number_np = is_number.to_numpy(zero_copy_only=False)
+    units = pd.Categorical.from_codes(np.where(is_number_np, unit, -1), categories=UNITS)
+    footnotes = pc.if_else(is_number, footnotes, None)
+    footnote_values = pd.arrays.IntegerArray(
+        pc.fill_null(footnotes, 0).to_numpy(zero_copy_only=False),
+        pc.is_null(footnotes).to_numpy(zero_copy_only=False),
+    )
+    rejected = ~is_blank.to_numpy(zero_copy_only=False) & ~is_number_np
+    return ParsedNumbers(
+        text,
+        pd.Series(value.to_numpy(zero_copy_only=False), index=text.index),
+        pd.Series(units, index=text.index),
+        pd.Series(footnote_values, index=text.index),
+        pd.Series(rejected, index=text.index),
+    )
+
+
+def parse_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Parse every cell of a frame of survey text in one pass.
+
+    Returns the float64 values, shaped like `df`, and the rejected cells with the
+    columns "row", "column" and "text".
+    """
+    parsed = parse_numbers(pd.Series(df.to_numpy(dtype=object).ravel()))
+    values = pd.DataFrame(
+        parsed.values.to_numpy().reshape(df.shape), index=df.index, columns=df.columns
+    )
+    positions = np.flatnonzero(parsed.rejected.to_numpy())
+    rows, columns = np.divmod(positions, df.shape[1])
+    rejected = pd.DataFrame(
+        {
+            "row": df.index[rows],
+            "column": df.columns[columns],
+            "text": parsed.text.to_numpy()[positions],
+        }
+    )
+    return values, rejected
+
+
+def warn_rejected(rejected: pd.Series | pd.DataFrame, source: object) -> None:
+    """Log the cells that could not be parsed as numbers, if any."""
+    if not len(rejected):
+        return
+    cells = rejected.head(_SHOWN).to_string()
+    logger.warning(f"{len(rejected)} cells of {source} are not numbers:\n{cells}")
@@ -0,0 +1,136 @@
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .backends import ExtractionBackend, PdfPlumberBackend, TextractBackend
+    from .cache import TextractCache
+    from .columnar import parse_numbers, read_table, table_frame, write_table_parquet
+    from .confidence import (
+        ConfidenceCollector,
+        ConfidenceReport,
+        confidence_matrix,
+        load_confidence_matrices,
+        save_confidence_matrix,
+        scan_confidence,
+    )
+    from .index import PageSubset, TableIndex, build_table_index, load_table_index
+    from .plumber import extract_pdf_tables_local
+    from .resolver import TableResolver
+    from .staging import StagingBucket
+    from .textract import (
+        extract_pdf_tables,
+        generate_table_csv,
+        get_document_blocks,
+        get_rows_columns_map,
+        get_table_csv_results,
+        get_tables_csv,
+        get_text,
+        iter_document_blocks,
+        iter_table_rows,
+        run_document_analysis,
+        write_rows_csv,
+        write_table_csv,
+        write_tables_csv,
+    )
+    from .waiter import (
+        BackoffPolicy,
+        CompletionChannel,
+        InMemoryCompletionChannel,
+        SQSCompletionChannel,
+        TextractJobWaiter,
+    )
+
+# The submodule of every exported name, imported on first access: the backends pull in
+# boto3, pdfplumber and pandas, which a command should only load when it uses them.
+_EXPORTS = {
+    "ExtractionBackend": "backends",
+    "PdfPlumberBackend": "backends",
+    "TextractBackend": "backends",
+    "TextractCache": "cache",
+    "parse_numbers": "columnar",
+    "read_table": "columnar",
+    "table_frame": "columnar",
+    "write_table_parquet": "columnar",
+    "ConfidenceCollector": "confidence",
+    "ConfidenceReport": "confidence",
+    "confidence_matrix": "confidence",
+    "load_confidence_matrices": "confidence",
+    "save_confidence_matrix": "confidence",
+    "scan_confidence": "confidence",
+    "PageSubset": "index",
+    "TableIndex": "index",
+    "build_table_index": "index",
+    "load_table_index": "index",
+    "extract_pdf_tables_local": "plumber",
+    "TableResolver": "resolver",
+    "StagingBucket": "staging",
+    "extract_pdf_tables": "textract",
+    "generate_table_csv": "textract",
+    "get_document_blocks": "textract",
+    "get_rows_columns_map": "textract",
+    "get_table_csv_results": "textract",
+    "get_tables_csv": "textract",
+    "get_text": "textract",
+    "iter_document_blocks": "textract",
+    "iter_table_rows": "textract",
+    "run_document_analysis": "textract",
+    "write_rows_csv": "textract",
+    "write_table_csv": "textract",
+    "write_tables_csv": "textract",
+    "BackoffPolicy": "waiter",
+    "CompletionChannel": "waiter",
+    "InMemoryCompletionChannel": "waiter",
+    "SQSCompletionChannel": "waiter",
+    "TextractJobWaiter": "waiter",
+}
+
+__all__ = [
+    "BackoffPolicy",
+    "CompletionChannel",
+    "ConfidenceCollector",
+    "ConfidenceReport",
+    "ExtractionBackend",
+    "InMemoryCompletionChannel",
+    "PageSubset",
+    "PdfPlumberBackend",
+    "SQSCompletionChannel",
+    "StagingBucket",
+    "TableIndex",
+    "TableResolver",
+    "TextractBackend",
+    "TextractCache",
+    "TextractJobWaiter",
+    "build_table_index",
+    "confidence_matrix",
+    "extract_pdf_tables",
+    "extract_pdf_tables_local",
+    "generate_table_csv",
+    "get_document_blocks",
+    "get_rows_columns_map",
+    "get_table_csv_results",
+    "get_tables_csv",
+    "get_text",
+    "iter_document_blocks",
+    "iter_table_rows",
+    "load_confidence_matrices",
+    "load_table_index",
+    "parse_numbers",
+    "read_table",
+    "run_document_analysis",
+    "save_confidence_matrix",
+    "scan_confidence",
+    "table_frame",
+    "write_rows_csv",
+    "write_table_csv",
+    "write_table_parquet",
+    "write_tables_csv",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
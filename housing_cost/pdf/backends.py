@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol
+
+from mypy_boto3_s3.client import S3Client
+from mypy_boto3_textract.client import TextractClient
+
+from housing_cost.pdf.cache import TextractCache
+from housing_cost.pdf.index import PageSubset
+from housing_cost.pdf.plumber import extract_pdf_tables_local
+from housing_cost.pdf.staging import StagingBucket
+from housing_cost.pdf.textract import extract_pdf_tables
+from housing_cost.pdf.waiter import TextractJobWaiter
+
+
+class ExtractionBackend(Protocol):
+    """Extracts the tables of PDF files.
+
+    Every backend writes each table to `<stem>__table_<N>__values.csv` and
+    `<stem>__table_<N>__scores.csv` in the output directory, and returns a summary of the
+    errors it ran into. With `parquet` set, a typed `<stem>__table_<N>.parquet` of every
+    table is written too, for `read_table`.
+    """
+
+    def extract(self, filepaths: List[Path], output_dir: Path) -> str: ...
+
+
+@dataclass
+class TextractBackend:
+    """Extract tables with AWS Textract.
+
+    Files with an entry in `subsets` only have the pages of that subset analyzed.
+    """
+
+    textract_client: TextractClient
+    s3_client: S3Client
+    s3_bucket_name: str
+    max_concurrent_jobs: int = 1
+    waiter: Optional[TextractJobWaiter] = None
+    cache: Optional[TextractCache] = None
+    subsets: Optional[Dict[Path, PageSubset]] = None
+    staging: Optional[StagingBucket] = None
+    parquet: bool = False
+
+    def extract(self, filepaths: List[Path], output_dir: Path) -> str:
+        return extract_pdf_tables(
+            self.textract_client,
+            self.s3_client,
+            self.s3_bucket_name,
+            filepaths,
+            output_dir,
+            max_concurrent_jobs=self.max_concurrent_jobs,
+            waiter=self.waiter,
+            cache=self.cache,
+            subsets=self.subsets,
+            staging=self.staging,
+            parquet=self.parquet,
+        )
+
+
+@dataclass
+class PdfPlumberBackend:
+    """Extract tables locally with pdfplumber, without any network access."""
+
+    max_workers: Optional[int] = None
+    table_settings: Optional[Dict[str, Any]] = None
+    parquet: bool = False
+
+    def extract(self, filepaths: List[Path], output_dir: Path) -> str:
+        return extract_pdf_tables_local(
+            filepaths,
+            output_dir,
+            max_workers=self.max_workers,
+            table_settings=self.table_settings,
+            parquet=self.parquet,
+        )
@@ -0,0 +1,163 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import IO, Iterable, Iterator, List, Optional, Sequence
+
+from loguru import logger
+from mypy_boto3_textract.type_defs import BlockTypeDef
+
+from housing_cost.files import file_sha256
+
+DEFAULT_MAX_BYTES = 1024**3
+_SUFFIX = ".jsonl.gz"
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached Textract response."""
+
+    key: str
+    path: Path
+    size: int
+    last_used: float
+
+
+class TextractCache:
+    """A content-addressed cache of raw Textract block lists on disk.
+
+    Entries are keyed by the SHA-256 of the PDF bytes, the requested feature types and the
+    analyzed pages, and stored as gzipped JSON Lines, one block per line, so they can be
+    written and read back as a stream. Reading an entry marks it as recently used; once
+    the cache grows past `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(
+        file_path: Path, feature_types: Sequence[str], pages: Optional[Sequence[int]] = None
+    ) -> str:
+        """Return the cache key of a PDF analyzed with the given feature types.
+
+        If only some pages of the PDF are analyzed, they are part of the key.
+        """
+        parts = [file_sha256(file_path), ",".join(sorted(feature_types))]
+        if pages is not None:
+            parts.append(",".join(str(page) for page in pages))
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def contains(self, key: str) -> bool:
+        """Return true if the cache holds an entry for the key."""
+        return self._path(key).exists()
+
+    def get(self, key: str) -> Optional[List[BlockTypeDef]]:
+        """Return the cached blocks for a key, or None on a miss."""
+        blocks = self.iter_blocks(key)
+        if blocks is None:
+            return None
+        try:
+            return list(blocks)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            self._path(key).unlink(missing_ok=True)
+            return None
+
+    def iter_blocks(self, key: str) -> Optional[Iterator[BlockTypeDef]]:
+        """Stream the cached blocks for a key, or return None on a miss."""
+        path = self._path(key)
+        if not path.exists():
+            return None
+        os.utime(path)
+        return self._read(path)
+
+    def put(self, key: str, blocks: Iterable[BlockTypeDef]) -> None:
+        """Store the blocks for a key."""
+        with self.writer(key) as write:
+            write(blocks)
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator["_BlockWriter"]:
+        """Open an entry for streaming writes. It is only stored if the block exits cleanly.
+
+        Old entries are evicted afterwards if the cache has grown too large.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial entry.
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                yield _BlockWriter(f)
+            os.replace(tmp_name, self._path(key))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.prune()
+
+    def entries(self) -> List[CacheEntry]:
+        """List the cache entries, least recently used first."""
+        if not self.directory.exists():
+            return []
+        entries: List[CacheEntry] = []
+        for path in self.directory.glob(f"*{_SUFFIX}"):
+            stat = path.stat()
+            entries.append(
+                CacheEntry(path.name[: -len(_SUFFIX)], path, stat.st_size, stat.st_mtime)
+            )
+        return sorted(entries, key=lambda entry: entry.last_used)
+
+    def size(self) -> int:
+        """The total size of the cache in bytes."""
+        return sum(entry.size for entry in self.entries())
+
+    def prune(self, max_bytes: Optional[int] = None) -> List[CacheEntry]:
+        """Evict least recently used entries until the cache fits in `max_bytes`.
+
+        Returns the evicted entries.
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        evicted: List[CacheEntry] = []
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            entry.path.unlink(missing_ok=True)
+            total -= entry.size
+            evicted.append(entry)
+        return evicted
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_SUFFIX}"
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[BlockTypeDef]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class _BlockWriter:
+    """Appends blocks to an open cache entry."""
+
+    def __init__(self, f: IO[str]) -> None:
+        self._f = f
+
+    def __call__(self, blocks: Iterable[BlockTypeDef]) -> None:
+        for block in blocks:
+            self._f.write(json.dumps(block))
+            self._f.write("\n")
+
+    def tee(self, blocks: Iterable[BlockTypeDef]) -> Iterator[BlockTypeDef]:
+        """Write blocks to the entry while passing them on to the caller."""
+        for block in blocks:
+            self._f.write(json.dumps(block))
+            self._f.write("\n")
+            yield block
@@ -0,0 +1,84 @@
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from housing_cost import parsing
+
+# Words holding a comma are quoted by `format_word`; drop the quotes again.
+_QUOTED_WORD = r'"([^"\s]*,[^"\s]*)"'
+
+
+def table_frame(rows: Iterable[Tuple[List[str], List[str]]]) -> pd.DataFrame:
+    """Build the typed, long format frame of a table from its (texts, scores) rows.
+
+    The frame has one row per cell with the columns:
+        - row, column: 1-based position of the cell in the table.
+        - text: The cell text.
+        - value: The number the cell holds, or NaN.
+        - unit: "usd", "percent" or "number" for numeric cells, missing otherwise.
+        - confidence: The extraction confidence of the cell, or NaN if unknown.
+    """
+    row_numbers: List[int] = []
+    column_numbers: List[int] = []
+    texts: List[str] = []
+    scores: List[str] = []
+    for row_number, (row_texts, row_scores) in enumerate(rows, start=1):
+        row_numbers.extend([row_number] * len(row_texts))
+        column_numbers.extend(range(1, len(row_texts) + 1))
+        texts.extend(row_texts)
+        # Pad rows that carry fewer scores than cells, e.g. from pdfplumber.
+        scores.extend(row_scores + [""] * (len(row_texts) - len(row_scores)))
+
+    text = pd.Series(texts, dtype="string").str.replace(_QUOTED_WORD, r"\1", regex=True)
+    text = text.str.strip()
+    value, unit = parse_numbers(text)
+    confidence = pd.to_numeric(pd.Series(scores, dtype="string"), errors="coerce")
+    return pd.DataFrame(
+        {
+            "row": np.asarray(row_numbers, dtype=np.int16),
+            "column": np.asarray(column_numbers, dtype=np.int16),
+            "text": text,
+            "value": value,
+            "unit": unit,
+            "confidence": confidence.astype(np.float32),
+        }
+    )
+
+
+def parse_numbers(text: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Parse currency, percent and plain number cells in one vectorized pass.
+
+    Returns the float64 values (NaN for non-numeric cells) and their units. See
+    `housing_cost.parsing.parse_numbers`.
+    """
+    parsed = parsing.parse_numbers(text)
+    return parsed.values, parsed.units
+
+
+def write_table_parquet(rows: Iterable[Tuple[List[str], List[str]]], path: Path) -> None:
+    """Write the typed frame of a table to a Parquet file."""
+    table_frame(rows).to_parquet(path, index=False)
+
+
+def read_table(
+    path: Path, field: str = "value", text_columns: Sequence[int] = (1,)
+) -> pd.DataFrame:
+    """Read a table Parquet file back into its grid, one column per table column.
+
+    The first row of the table becomes the column labels. The cells hold `field`, e.g.
+    "value" for the parsed numbers or "confidence", except for `text_columns` (by
+    default the first, which holds the row labels) which hold the cell text.
+    """
+    frame = pd.read_parquet(path)
+    header = frame[frame["row"] == 1].set_index("column")["text"]
+    body = frame[frame["row"] > 1]
+    grid = body.pivot(index="row", columns="column", values=field)
+    for column in text_columns:
+        if column in grid.columns:
+            labels = body[body["column"] == column].set_index("row")["text"]
+            grid[column] = labels.reindex(grid.index)
+    grid.columns = pd.Index(header.reindex(grid.columns).fillna("").tolist())
+    grid.index.name = None
+    return grid.reset_index(drop=True)
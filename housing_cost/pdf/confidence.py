@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Textract confidences run from 0 to 100.
+DEFAULT_THRESHOLD = 80.0
+_SUFFIX = "__scores.npy"
+
+
+class ConfidenceCollector:
+    """Collect the confidence scores of a table's rows while they stream past.
+
+    Only the float32 scores of every row are kept, so a table can be written one row at
+    a time and its confidence matrix built afterwards.
+    """
+
+    def __init__(self) -> None:
+        self.width = 0
+        self._rows: List[np.ndarray] = []
+
+    def observe(
+        self, rows: Iterable[Tuple[List[str], List[str]]]
+    ) -> Iterator[Tuple[List[str], List[str]]]:
+        """Pass the (texts, scores) rows through, recording their scores."""
+        for texts, scores in rows:
+            values = [float(score) if score else np.nan for score in scores]
+            self._rows.append(np.asarray(values, dtype=np.float32))
+            self.width = max(self.width, len(texts))
+            yield texts, scores
+
+    def matrix(self) -> np.ndarray:
+        """The confidence matrix of the rows seen so far, see `confidence_matrix`."""
+        matrix = np.full((len(self._rows), self.width), np.nan, dtype=np.float32)
+        for i, values in enumerate(self._rows):
+            matrix[i, : len(values)] = values
+        return matrix
+
+
+def confidence_matrix(rows: Iterable[Tuple[List[str], List[str]]]) -> np.ndarray:
+    """Build the float32 confidence matrix of a table from its (texts, scores) rows.
+
+    The matrix is aligned with the cell grid: element [i, j] holds the confidence of the
+    cell in row i and column j. Missing cells of ragged rows and unknown confidences
+    (e.g. from pdfplumber) are NaN.
+    """
+    collector = ConfidenceCollector()
+    for _ in collector.observe(rows):
+        pass
+    return collector.matrix()
+
+
+def save_confidence_matrix(matrix: np.ndarray, output_dir: Path, stem: str, index: int) -> Path:
+    """Save a table's confidence matrix as `<stem>__table_<N>__scores.npy`."""
+    path = output_dir / (stem + f"__table_{index}" + _SUFFIX)
+    np.save(path, matrix)
+    return path
+
+
+def load_confidence_matrices(directory: Path) -> Dict[str, np.ndarray]:
+    """Memory map every saved confidence matrix in a directory, keyed by table name."""
+    return {
+        path.name[: -len(_SUFFIX)]: np.load(path, mmap_mode="r")
+        for path in sorted(directory.glob("*" + _SUFFIX))
+    }
+
+
+@dataclass
+class ConfidenceReport:
+    """The cells, rows and tables whose confidence fell below a threshold.
+
+    Attributes:
+        threshold: The confidence below which a cell is flagged.
+        tables: One row per table with its cell count, flagged cells and rows, and the
+            minimum and mean known confidence.
+        rows: The (table, row) pairs holding at least one flagged cell.
+        cells: The (table, row, column, confidence) of every flagged cell. Rows and
+            columns are 1-based, as in the typed table files.
+    """
+
+    threshold: float
+    tables: pd.DataFrame
+    rows: pd.DataFrame
+    cells: pd.DataFrame
+
+    @property
+    def flagged_tables(self) -> pd.DataFrame:
+        return self.tables[self.tables["low_cells"] > 0]
+
+    def summary(self) -> str:
+        """A short text report of the flagged tables."""
+        flagged = self.flagged_tables
+        lines = [
+            f"{len(self.cells)} cells in {len(self.rows)} rows of {len(flagged)} of "
+            f"{len(self.tables)} tables are below {self.threshold:g}% confidence."
+        ]
+        for table in flagged.sort_values("min_confidence").itertuples():
+            lines.append(
+                f"  {table.Index}: {table.low_cells} of {table.cells} cells, "
+                f"{table.low_rows} rows, min {table.min_confidence:.1f}%"
+            )
+        return "\n".join(lines)
+
+
+def scan_confidence(
+    matrices: Dict[str, np.ndarray], threshold: float = DEFAULT_THRESHOLD
+) -> ConfidenceReport:
+    """Flag the cells, rows and tables below a confidence threshold.
+
+    All matrices are flattened into a single array and checked in one vectorized pass;
+    per-table and per-row results are recovered from the cell offsets. Unknown (NaN)
+    confidences are never flagged.
+    """
+    names = list(matrices)
+    shapes = np.array([matrices[name].shape for name in names], dtype=np.int64).reshape(-1, 2)
+    sizes = shapes[:, 0] * shapes[:, 1]
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    flat = (
+        np.concatenate([np.asarray(matrices[name], dtype=np.float32).ravel() for name in names])
+        if names
+        else np.empty(0, dtype=np.float32)
+    )
+    table_ids = np.repeat(np.arange(len(names)), sizes)
+
+    known = ~np.isnan(flat)
+    low = known & (flat < threshold)
+
+    # Flagged cells and their position in their table
+    cell_index = np.flatnonzero(low)
+    cell_table = table_ids[cell_index]
+    local = cell_index - offsets[cell_table]
+    widths = np.maximum(shapes[cell_table, 1], 1)
+    cell_row, cell_column = local // widths, local % widths
+
+    # Flagged rows: unique (table, row) pairs
+    row_stride = int(shapes[:, 0].max(initial=0)) + 1
+    row_keys = np.unique(cell_table * row_stride + cell_row)
+    row_table, row_number = row_keys // row_stride, row_keys % row_stride
+
+    low_cells = np.bincount(cell_table, minlength=len(names))
+    low_rows = np.bincount(row_table, minlength=len(names))
+    known_cells = np.bincount(table_ids, weights=known, minlength=len(names))
+    total = np.bincount(table_ids, weights=np.where(known, flat, 0), minlength=len(names))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / known_cells
+    minimum = np.full(len(names), np.nan)
+    nonempty = sizes > 0
+    if nonempty.any():
+        minimum[nonempty] = np.minimum.reduceat(np.where(known, flat, np.inf), offsets[nonempty])
+        minimum[np.isinf(minimum)] = np.nan
+
+    index = pd.Index(names, name="table")
+    tables = pd.DataFrame(
+        {
+            "cells": sizes,
+            "low_cells": low_cells,
+            "low_rows": low_rows,
+            "min_confidence": minimum.astype(np.float32),
+            "mean_confidence": mean.astype(np.float32),
+        },
+        index=index,
+    )
+    rows = pd.DataFrame(
+        {"table": index[row_table] if len(names) else [], "row": row_number.astype(np.int32) + 1}
+    )
+    cells = pd.DataFrame(
+        {
+            "table": index[cell_table] if len(names) else [],
+            "row": cell_row.astype(np.int32) + 1,
+            "column": cell_column.astype(np.int32) + 1,
+            "confidence": flat[cell_index],
+        }
+    )
+    return ConfidenceReport(threshold, tables, rows, cells)
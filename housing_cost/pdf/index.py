@@ -0,0 +1,163 @@
+from dataclasses import asdict, dataclass, field
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+from mypy_boto3_textract.type_defs import BlockTypeDef
+import pdfplumber
+from pypdf import PdfReader, PdfWriter
+
+from housing_cost.files import file_sha256
+from housing_cost.pdf.plumber import run_page_tasks
+
+
+@dataclass
+class TableIndex:
+    """Which pages of a PDF hold tables, as found by a local pre-scan.
+
+    Tables are numbered in page order, so a table's number only depends on the table
+    counts of the pages before it.
+    """
+
+    sha256: str
+    page_count: int
+    pages: Dict[int, int] = field(default_factory=dict)  # Page number -> table count
+
+    @property
+    def table_count(self) -> int:
+        return sum(self.pages.values())
+
+    def first_table_number(self, page: int) -> int:
+        """The number of the first table on a page."""
+        return 1 + sum(count for p, count in self.pages.items() if p < page)
+
+    def pages_for_tables(self, numbers: Optional[Iterable[int]] = None) -> List[int]:
+        """The pages holding the given table numbers, or every page with a table."""
+        if numbers is None:
+            return sorted(self.pages)
+        wanted = set(numbers)
+        return sorted(
+            page
+            for page, count in self.pages.items()
+            if wanted
+            & set(range(self.first_table_number(page), self.first_table_number(page) + count))
+        )
+
+    def subset(self, numbers: Optional[Iterable[int]] = None) -> "PageSubset":
+        """The pages to submit to extract the given tables."""
+        return PageSubset(self.pages_for_tables(numbers), self)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, path: Path) -> "TableIndex":
+        with open(path) as f:
+            data = json.load(f)
+        data["pages"] = {int(page): count for page, count in data["pages"].items()}
+        return cls(**data)
+
+
+@dataclass
+class PageSubset:
+    """A selection of pages of a PDF, sent to Textract in place of the whole document."""
+
+    pages: List[int]
+    index: TableIndex
+
+    def write_pdf(self, file_path: Path, output_path: Path) -> None:
+        """Write the selected pages of a PDF to a new file."""
+        reader = PdfReader(file_path)
+        writer = PdfWriter()
+        for page in self.pages:
+            writer.add_page(reader.pages[page - 1])
+        with open(output_path, "wb") as f:
+            writer.write(f)
+
+    def numbering(self) -> "TableNumbering":
+        """Return a function mapping the TABLE blocks of the subset to their table numbers."""
+        return TableNumbering(self)
+
+
+class TableNumbering:
+    """Numbers the TABLE blocks of a page subset as in the whole document.
+
+    A table's number is the index's first table number of its page plus its position on
+    the page, so it is only right if Textract finds as many tables on every page as the
+    pre-scan did. Any disagreement raises rather than assigning numbers that may point
+    at another table: a page with more tables as soon as the extra table arrives, and a
+    page with fewer in `check`, once every block was fed.
+
+    TABLE blocks must be passed in the order Textract returns them.
+    """
+
+    def __init__(self, subset: PageSubset) -> None:
+        self.subset = subset
+        self.found: Dict[int, int] = {}
+
+    def __call__(self, table: BlockTypeDef) -> int:
+        page = self.subset.pages[table.get("Page", 1) - 1]
+        ordinal = self.found.get(page, 0)
+        self.found[page] = ordinal + 1
+        if ordinal >= self.subset.index.pages.get(page, 0):
+            self._mismatch(page)
+        return self.subset.index.first_table_number(page) + ordinal
+
+    def check(self) -> None:
+        """Raise if Textract found fewer tables on a page than the index."""
+        for page in self.subset.pages:
+            if self.found.get(page, 0) != self.subset.index.pages.get(page, 0):
+                self._mismatch(page)
+
+    def _mismatch(self, page: int) -> None:
+        raise ValueError(
+            f"Textract found {self.found.get(page, 0)} tables on page {page} where the table "
+            f"index found {self.subset.index.pages.get(page, 0)}, so the table numbers of "
+            "the page subset would not match the whole document. Parse without "
+            "--table-pages."
+        )
+
+
+def build_table_index(
+    file_path: Path,
+    max_workers: Optional[int] = None,
+    table_settings: Optional[Dict] = None,
+) -> TableIndex:
+    """Pre-scan a PDF locally and record how many tables each page holds."""
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+    counts = run_page_tasks(_count_page_tables, file_path, page_count, max_workers, table_settings)
+    pages = {page: count for page, count in enumerate(counts, start=1) if count}
+    return TableIndex(file_sha256(file_path), page_count, pages)
+
+
+def load_table_index(
+    file_path: Path, index_dir: Path, max_workers: Optional[int] = None
+) -> TableIndex:
+    """Load the saved index of a PDF, building and saving it if it is missing or stale."""
+    index_path = index_dir / (file_path.stem + "__table_index.json")
+    sha256 = file_sha256(file_path)
+    if index_path.exists():
+        index = TableIndex.load(index_path)
+        if index.sha256 == sha256:
+            return index
+    logger.info(f"Building table index for {file_path.name}")
+    index = build_table_index(file_path, max_workers)
+    index.save(index_path)
+    logger.info(f" - {index.table_count} tables on {len(index.pages)} of {index.page_count} pages")
+    return index
+
+
+def _count_page_tables(
+    file_path: str, pages: List[int], table_settings: Optional[Dict]
+) -> List[int]:
+    """Count the tables on some pages of a PDF. Runs in a worker process."""
+    counts: List[int] = []
+    with pdfplumber.open(file_path, pages=pages) as pdf:
+        for page in pdf.pages:
+            counts.append(len(page.find_tables(table_settings or {})))
+            page.close()
+    return counts
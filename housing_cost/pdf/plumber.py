@@ -0,0 +1,144 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from loguru import logger
+import pdfplumber
+
+from housing_cost.pdf.columnar import write_table_parquet
+from housing_cost.pdf.confidence import ConfidenceCollector, save_confidence_matrix
+from housing_cost.pdf.textract import format_word, write_rows_csv
+
+# A table as extracted by pdfplumber: rows of cells, where empty cells are None.
+PlumberTable = List[List[Optional[str]]]
+
+# Pages per worker task. Each task opens the PDF once, so larger chunks amortize parsing.
+PAGES_PER_TASK = 4
+
+T = TypeVar("T")
+
+
+def extract_pdf_tables_local(
+    filepaths: List[Path],
+    output_dir: Path,
+    max_workers: Optional[int] = None,
+    table_settings: Optional[Dict[str, Any]] = None,
+    parquet: bool = False,
+) -> str:
+    """Extract the tables from PDF files locally with pdfplumber.
+
+    Pages of every file are spread across a process pool. Tables are numbered in page
+    order and saved to the output_dir with the same `__table_N__values.csv`,
+    `__scores.csv`, `__scores.npy` and, with `parquet`, `.parquet` layout as the
+    Textract extraction.
+    pdfplumber reads the text layer of the PDF and reports no confidence, so the scores
+    are left empty.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    results_summary: List[str] = []
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        file_tasks: List[Tuple[Path, List[Future[List[PlumberTable]]]]] = []
+        for file_path in filepaths:
+            try:
+                with pdfplumber.open(file_path) as pdf:
+                    page_count = len(pdf.pages)
+            except Exception as e:
+                error_msg = f"  - Error opening {file_path.name}: {e}"
+                logger.error(error_msg)
+                results_summary.append(f"Processing {file_path.name}:\n{error_msg}")
+                continue
+
+            futures = [
+                executor.submit(_extract_page_tables, str(file_path), pages, table_settings)
+                for pages in page_chunks(page_count)
+            ]
+            file_tasks.append((file_path, futures))
+
+        for file_path, futures in file_tasks:
+            logger.info(f"Processing {file_path.name}:")
+            try:
+                table_count = 0
+                for future in futures:
+                    for table in future.result():
+                        table_count += 1
+                        _write_table(table, output_dir, file_path.stem, table_count, parquet)
+                if table_count == 0:
+                    logger.info(f" - No tables found in {file_path.name}")
+                else:
+                    logger.info(f" - Wrote {table_count} tables from {file_path.name}")
+            except Exception as e:
+                error_msg = f"  - Error processing {file_path.name}: {e}"
+                logger.error(error_msg)
+                results_summary.append(f"Processing {file_path.name}:\n{error_msg}")
+
+    return "\n---\n".join(results_summary)
+
+
+def run_page_tasks(
+    task: Callable[..., List[T]],
+    file_path: Path,
+    page_count: int,
+    max_workers: Optional[int] = None,
+    *args: Any,
+) -> List[T]:
+    """Run a task over every page of a PDF on a process pool.
+
+    The task is called as `task(file_path, pages, *args)` for each chunk of pages and
+    returns a list; the lists are concatenated in page order.
+    """
+    results: List[T] = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(task, str(file_path), pages, *args)
+            for pages in page_chunks(page_count)
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def page_chunks(page_count: int) -> List[List[int]]:
+    """Split the 1-based page numbers of a document into chunks of PAGES_PER_TASK."""
+    return [
+        list(range(start, min(start + PAGES_PER_TASK, page_count + 1)))
+        for start in range(1, page_count + 1, PAGES_PER_TASK)
+    ]
+
+
+def _extract_page_tables(
+    file_path: str, pages: List[int], table_settings: Optional[Dict[str, Any]]
+) -> List[PlumberTable]:
+    """Extract the tables of some pages of a PDF. Runs in a worker process."""
+    tables: List[PlumberTable] = []
+    with pdfplumber.open(file_path, pages=pages) as pdf:
+        for page in pdf.pages:
+            tables.extend(page.extract_tables(table_settings or {}))
+            # Drop the parsed page layout, it is not needed once the tables are read.
+            page.close()
+    return tables
+
+
+def _write_table(
+    table: PlumberTable, output_dir: Path, stem: str, table_index: int, parquet: bool = False
+) -> None:
+    values_csv_path = output_dir / (stem + f"__table_{table_index}__values.csv")
+    scores_csv_path = output_dir / (stem + f"__table_{table_index}__scores.csv")
+    rows: Iterable[Tuple[List[str], List[str]]] = _iter_rows(table)
+    # Only the Parquet file needs every row at once.
+    if parquet:
+        rows = list(rows)
+    scores = ConfidenceCollector()
+    with open(values_csv_path, "w") as values_sink, open(scores_csv_path, "w") as scores_sink:
+        write_rows_csv(scores.observe(rows), values_sink, scores_sink)
+    if parquet:
+        write_table_parquet(rows, output_dir / (stem + f"__table_{table_index}.parquet"))
+    save_confidence_matrix(scores.matrix(), output_dir, stem, table_index)
+
+
+def _iter_rows(table: PlumberTable) -> Iterator[Tuple[List[str], List[str]]]:
+    """Format pdfplumber rows the way Textract cells are formatted."""
+    for row in table:
+        texts = ["".join(format_word(word) for word in (cell or "").split()) for cell in row]
+        yield texts, [""] * len(texts)
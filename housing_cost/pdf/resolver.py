@@ -0,0 +1,133 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from loguru import logger
+from mypy_boto3_textract.type_defs import BlockTypeDef
+
+# Block types a table can reference. Everything else is dropped on arrival.
+TABLE_BLOCK_TYPES = {"TABLE", "CELL", "MERGED_CELL", "WORD", "SELECTION_ELEMENT"}
+
+
+class TableResolver:
+    """Resolve Textract tables from a stream of blocks as soon as they are complete.
+
+    Blocks are fed in the order Textract returns them. A table is emitted once every
+    CELL it lists, and every WORD and SELECTION_ELEMENT those cells list, has arrived.
+    The blocks of an emitted table are evicted, as are blocks of earlier pages that no
+    pending table needs, so memory stays bounded by the tables of the current page.
+
+    Tables are numbered in the order their TABLE blocks arrive, which matches the
+    numbering of resolving the whole document at once. A `numbering` function can assign
+    the numbers instead, e.g. when only some pages of a document were analyzed.
+    """
+
+    def __init__(self, numbering: Optional[Callable[[BlockTypeDef], int]] = None) -> None:
+        self.numbering = numbering
+        self.blocks_map: Dict[str, BlockTypeDef] = {}
+        self.table_count = 0
+        self._tables: Dict[str, Tuple[int, BlockTypeDef]] = {}
+        self._missing: Dict[str, Set[str]] = {}
+        self._waiting_on: Dict[str, str] = {}
+        self._page_ids: Dict[int, List[str]] = {}
+        self._current_page = 0
+
+    def feed(
+        self, blocks: Iterable[BlockTypeDef]
+    ) -> Iterator[Tuple[int, BlockTypeDef, Dict[str, BlockTypeDef]]]:
+        """Consume blocks and yield (index, table, blocks_map) for every completed table.
+
+        The yielded blocks map holds only the blocks the table references.
+        """
+        for block in blocks:
+            block_id = block["Id"]
+            table_id = self._waiting_on.pop(block_id, None)
+            if table_id is None and block["BlockType"] not in TABLE_BLOCK_TYPES:
+                continue
+
+            page = block.get("Page", 1)
+            if page > self._current_page:
+                self._evict_pages_before(page)
+                self._current_page = page
+            self.blocks_map[block_id] = block
+            self._page_ids.setdefault(page, []).append(block_id)
+
+            if block["BlockType"] == "TABLE":
+                table_id = self._add_table(block)
+            elif table_id is not None:
+                missing = self._missing[table_id]
+                missing.discard(block_id)
+                if block["BlockType"] == "CELL":
+                    self._require(table_id, _child_ids(block))
+
+            if table_id is not None and not self._missing[table_id]:
+                yield self._emit(table_id)
+
+    def finish(self) -> None:
+        """Report the tables that never received all of their blocks."""
+        for table_id, missing in self._missing.items():
+            index, _ = self._tables[table_id]
+            logger.warning(f"Table {index} is missing {len(missing)} blocks and was skipped.")
+
+    def _add_table(self, table: BlockTypeDef) -> str:
+        self.table_count += 1
+        index = self.numbering(table) if self.numbering else self.table_count
+        table_id = table["Id"]
+        self._tables[table_id] = (index, table)
+        self._missing[table_id] = set()
+        self._require(table_id, _child_ids(table))
+        return table_id
+
+    def _require(self, table_id: str, block_ids: List[str]) -> None:
+        """Record that a table needs the given blocks and, for cells, their children."""
+        for block_id in block_ids:
+            block = self.blocks_map.get(block_id)
+            if block is None:
+                self._missing[table_id].add(block_id)
+                self._waiting_on[block_id] = table_id
+            elif block["BlockType"] == "CELL":
+                self._require(table_id, _child_ids(block))
+
+    def _emit(self, table_id: str) -> Tuple[int, BlockTypeDef, Dict[str, BlockTypeDef]]:
+        index, table = self._tables.pop(table_id)
+        del self._missing[table_id]
+        # Move the table's blocks out of the shared map so they are freed once written.
+        table_map: Dict[str, BlockTypeDef] = {}
+        for cell_id in _child_ids(table):
+            cell = self.blocks_map.pop(cell_id, None)
+            if cell is None:
+                continue
+            table_map[cell_id] = cell
+            if cell["BlockType"] == "CELL":
+                for child_id in _child_ids(cell):
+                    child = self.blocks_map.pop(child_id, None)
+                    if child is not None:
+                        table_map[child_id] = child
+        self.blocks_map.pop(table_id, None)
+        return index, table, table_map
+
+    def _evict_pages_before(self, page: int) -> None:
+        """Drop blocks of finished pages that no pending table references."""
+        needed: Set[str] = set()
+        for _, table in self._tables.values():
+            needed.add(table["Id"])
+            for cell_id in _child_ids(table):
+                needed.add(cell_id)
+                cell = self.blocks_map.get(cell_id)
+                if cell is not None:
+                    needed.update(_child_ids(cell))
+        for finished_page in [p for p in self._page_ids if p < page]:
+            kept = []
+            for block_id in self._page_ids.pop(finished_page):
+                if block_id in needed:
+                    kept.append(block_id)
+                else:
+                    self.blocks_map.pop(block_id, None)
+            if kept:
+                self._page_ids[finished_page] = kept
+
+
+def _child_ids(block: BlockTypeDef) -> List[str]:
+    ids: List[str] = []
+    for relationship in block.get("Relationships", []):
+        if relationship["Type"] == "CHILD":
+            ids.extend(relationship["Ids"])
+    return ids
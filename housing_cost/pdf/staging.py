@@ -0,0 +1,144 @@
+from dataclasses import dataclass, field
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from loguru import logger
+from mypy_boto3_s3.client import S3Client
+
+from housing_cost.files import file_sha256
+
+# Multipart settings for PDF uploads. Survey PDFs run to tens of MB, so parts are sent
+# in parallel above 16 MB instead of over a single stream.
+DEFAULT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024**2,
+    multipart_chunksize=8 * 1024**2,
+    max_concurrency=8,
+    use_threads=True,
+)
+
+# Metadata key holding the SHA-256 of an uploaded file.
+SHA256_METADATA_KEY = "sha256"
+
+
+@dataclass
+class StagingBucket:
+    """The S3 bucket PDFs are uploaded to for Textract to read.
+
+    By default the bucket only lives for a single run: it is created up front, every
+    object is deleted as soon as its job finishes and the bucket is deleted at the end,
+    as before.
+
+    A persistent bucket is kept across runs. Objects are not deleted after each job;
+    instead a lifecycle rule expires everything under `prefix` after `expiration_days`.
+    Before uploading, the remote object is compared with the local file and the upload
+    is skipped when they match.
+
+    `s3_client` may point at any S3 compatible endpoint (e.g. a local stand-in created
+    with `endpoint_url`), although Textract itself can only read from AWS.
+    """
+
+    s3_client: S3Client
+    bucket_name: str
+    region_name: Optional[str] = None
+    persistent: bool = False
+    prefix: str = ""
+    expiration_days: int = 1
+    transfer_config: TransferConfig = field(default_factory=lambda: DEFAULT_TRANSFER_CONFIG)
+
+    def prepare(self) -> None:
+        """Create the bucket if it does not exist yet."""
+        if self.persistent and self._bucket_exists():
+            return
+        kwargs = {}
+        if self.region_name and self.region_name != "us-east-1":
+            kwargs["CreateBucketConfiguration"] = {"LocationConstraint": self.region_name}
+        try:
+            self.s3_client.create_bucket(Bucket=self.bucket_name, **kwargs)  # type: ignore
+        except self.s3_client.exceptions.BucketAlreadyExists:
+            logger.info(f"Bucket {self.bucket_name} already exists")
+        except self.s3_client.exceptions.BucketAlreadyOwnedByYou:
+            logger.info(f"Bucket {self.bucket_name} already owned by you")
+        if self.persistent:
+            self._put_lifecycle_rule()
+
+    def object_name(self, file_path: Path) -> str:
+        return self.prefix + file_path.name
+
+    def upload(self, file_path: Path, object_name: str) -> bool:
+        """Upload a file unless the bucket already holds an identical object.
+
+        Returns whether the file was uploaded.
+        """
+        sha256 = file_sha256(file_path)
+        if self.persistent and self._matches(file_path, object_name, sha256):
+            return False
+        self.s3_client.upload_file(
+            str(file_path),
+            self.bucket_name,
+            object_name,
+            ExtraArgs={"Metadata": {SHA256_METADATA_KEY: sha256}},
+            Config=self.transfer_config,
+        )
+        return True
+
+    def release(self, object_name: str) -> None:
+        """Drop an object once its job finished. Persistent buckets leave it to expire."""
+        if self.persistent:
+            return
+        self.s3_client.delete_object(Bucket=self.bucket_name, Key=object_name)
+
+    def close(self) -> None:
+        """Delete the bucket at the end of a run, unless it is persistent."""
+        if not self.persistent:
+            self.s3_client.delete_bucket(Bucket=self.bucket_name)
+
+    def _matches(self, file_path: Path, object_name: str, sha256: str) -> bool:
+        """Compare a remote object with a local file by checksum metadata, or ETag."""
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=object_name)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        if head.get("ContentLength") != file_path.stat().st_size:
+            return False
+        remote_sha256 = head.get("Metadata", {}).get(SHA256_METADATA_KEY)
+        if remote_sha256 is not None:
+            return remote_sha256 == sha256
+        # Objects uploaded in a single part have the MD5 of their contents as ETag.
+        etag = head.get("ETag", "").strip('"')
+        return "-" not in etag and etag == _md5(file_path)
+
+    def _bucket_exists(self) -> bool:
+        try:
+            self.s3_client.head_bucket(Bucket=self.bucket_name)
+        except ClientError:
+            return False
+        return True
+
+    def _put_lifecycle_rule(self) -> None:
+        self.s3_client.put_bucket_lifecycle_configuration(
+            Bucket=self.bucket_name,
+            LifecycleConfiguration={
+                "Rules": [
+                    {
+                        "ID": "expire-staged-pdfs",
+                        "Filter": {"Prefix": self.prefix},
+                        "Status": "Enabled",
+                        "Expiration": {"Days": self.expiration_days},
+                        "AbortIncompleteMultipartUpload": {"DaysAfterInitiation": 1},
+                    }
+                ]
+            },
+        )
+
+
+def _md5(file_path: Path) -> str:
+    digest = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,562 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+import csv
+import io
+from pathlib import Path
+import tempfile
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from loguru import logger
+from mypy_boto3_s3.client import S3Client
+from mypy_boto3_textract.client import TextractClient
+from mypy_boto3_textract.literals import FeatureTypeType
+from mypy_boto3_textract.type_defs import (
+    BlockTypeDef,
+    GetDocumentAnalysisRequestTypeDef,
+    GetDocumentAnalysisResponseTypeDef,
+    StartDocumentAnalysisRequestTypeDef,
+    StartDocumentAnalysisResponseTypeDef,
+)
+
+from housing_cost.pdf.cache import TextractCache
+from housing_cost.pdf.columnar import write_table_parquet
+from housing_cost.pdf.confidence import ConfidenceCollector, save_confidence_matrix
+from housing_cost.pdf.resolver import TableResolver
+from housing_cost.pdf.staging import StagingBucket
+from housing_cost.pdf.waiter import TextractJobWaiter
+from housing_cost.profiling import span
+
+if TYPE_CHECKING:
+    from housing_cost.pdf.index import PageSubset
+
+FEATURE_TYPES: List[FeatureTypeType] = ["TABLES"]
+
+
+def extract_pdf_tables(
+    textract_client: TextractClient,
+    s3_client: S3Client,
+    s3_bucket_name: str,
+    filepaths: List[Path],
+    output_dir: Path,
+    max_concurrent_jobs: int = 1,
+    waiter: Optional[TextractJobWaiter] = None,
+    cache: Optional[TextractCache] = None,
+    subsets: Optional[Dict[Path, "PageSubset"]] = None,
+    staging: Optional[StagingBucket] = None,
+    parquet: bool = False,
+) -> str:
+    """Extract the tables from PDF files using asynchronous processing.
+    Manages uploading local files to S3 and removing them after processing.
+    Saves CSV results to the output_dir.
+
+    Up to `max_concurrent_jobs` files are uploaded and analyzed at the same time. A single
+    waiter drives all open Textract jobs, so the total wall time approaches that of the
+    slowest job instead of the sum of all jobs.
+
+    If a cache is given, files whose contents were analyzed before are served from it
+    without touching S3 or Textract.
+
+    If `subsets` holds a page subset for a file, only those pages are submitted to
+    Textract and the tables keep the numbers they have in the whole document. A file
+    fails if Textract finds a different number of tables on a page than the subset's
+    index, as its tables could not be numbered reliably.
+
+    Files are uploaded to `staging`, by default a bucket named `s3_bucket_name` that is
+    created for this run and deleted afterwards. Pass a persistent StagingBucket to keep
+    the bucket and skip uploading files it already holds.
+
+    With `parquet`, a typed Parquet file of every table is written alongside its CSVs.
+    """
+    if max_concurrent_jobs < 1:
+        raise ValueError("max_concurrent_jobs must be at least 1.")
+
+    subsets = subsets or {}
+    cache_keys: Dict[Path, str] = {}
+    if cache is not None:
+        cache_keys = {
+            file_path: cache.key(
+                file_path,
+                FEATURE_TYPES,
+                subsets[file_path].pages if file_path in subsets else None,
+            )
+            for file_path in filepaths
+        }
+    cached_files = {
+        file_path for file_path, key in cache_keys.items() if cache and cache.contains(key)
+    }
+    use_bucket = len(cached_files) < len(filepaths)
+
+    if staging is None:
+        # Use the region of the Textract client
+        staging = StagingBucket(s3_client, s3_bucket_name, textract_client.meta.region_name)
+    if use_bucket:
+        staging.prepare()
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if waiter is None:
+        waiter = TextractJobWaiter(textract_client)
+    with ThreadPoolExecutor(max_workers=max_concurrent_jobs) as executor:
+        futures = [
+            executor.submit(
+                _extract_file_tables,
+                textract_client,
+                staging,
+                file_path,
+                output_dir,
+                waiter,
+                cache,
+                cache_keys.get(file_path),
+                subsets.get(file_path),
+                parquet,
+            )
+            for file_path in filepaths
+        ]
+        waiter.run_until_complete(futures)
+
+    results_summary: List[str] = [
+        summary for summary in (future.result() for future in futures) if summary
+    ]
+
+    if use_bucket:
+        staging.close()
+    return "\n---\n".join(results_summary)
+
+
+def _extract_file_tables(
+    textract_client: TextractClient,
+    staging: StagingBucket,
+    file_path: Path,
+    output_dir: Path,
+    waiter: TextractJobWaiter,
+    cache: Optional[TextractCache],
+    cache_key: Optional[str],
+    subset: Optional["PageSubset"] = None,
+    parquet: bool = False,
+) -> Optional[str]:
+    """Upload, analyze and save the tables of a single file.
+
+    Blocks are streamed page by page from Textract (or the cache) and every table is
+    written as soon as all of its blocks have arrived.
+
+    Returns a summary of the errors raised while processing the file, if any.
+    """
+    errors: List[str] = []
+
+    current_file_summary_prefix = f"Processing {file_path.name}:"
+    logger.info(current_file_summary_prefix)
+
+    try:
+        with ExitStack() as stack:
+            blocks: Optional[Iterable[BlockTypeDef]] = None
+            if cache is not None and cache_key is not None:
+                blocks = cache.iter_blocks(cache_key)
+                if blocks is not None:
+                    logger.info(f"  Using cached Textract results for {file_path.name}")
+
+            if blocks is None:
+                blocks = _analyze_file(textract_client, staging, file_path, waiter, errors, subset)
+                if blocks is not None and cache is not None and cache_key is not None:
+                    blocks = stack.enter_context(cache.writer(cache_key)).tee(blocks)
+
+            # Stream the CSV data to the output directory
+            if subset is None:
+                tables_written = (
+                    write_tables_csv(blocks, output_dir, file_path.stem, parquet=parquet)
+                    if blocks
+                    else 0
+                )
+            else:
+                tables_written = _write_subset_tables(
+                    blocks, output_dir, file_path.stem, subset, parquet
+                )
+        if tables_written == 0:
+            logger.info(f" - No tables found in {file_path.name}")
+
+    except Exception as e:
+        error_msg = f"  - Error processing {file_path.name}: {e}"
+        logger.error(error_msg)
+        errors.append(error_msg)
+
+    if not errors:
+        return None
+    return "\n".join([current_file_summary_prefix, *errors])
+
+
+def _write_subset_tables(
+    blocks: Optional[Iterable[BlockTypeDef]],
+    output_dir: Path,
+    stem: str,
+    subset: "PageSubset",
+    parquet: bool = False,
+) -> int:
+    """Write the tables of a page subset, numbered as in the whole document.
+
+    The tables are written to a temporary directory and only moved to the output
+    directory once Textract's table counts are checked against the index, so a
+    mismatch leaves no misnumbered files behind.
+    """
+    if not blocks:
+        return 0
+    numbering = subset.numbering()
+    with tempfile.TemporaryDirectory(dir=output_dir, prefix=f".{stem}.") as tmp_dir:
+        tables_written = write_tables_csv(blocks, Path(tmp_dir), stem, numbering, parquet)
+        numbering.check()
+        for path in Path(tmp_dir).iterdir():
+            path.replace(output_dir / path.name)
+    return tables_written
+
+
+def _analyze_file(
+    textract_client: TextractClient,
+    staging: StagingBucket,
+    file_path: Path,
+    waiter: TextractJobWaiter,
+    errors: List[str],
+    subset: Optional["PageSubset"] = None,
+) -> Optional[Iterator[BlockTypeDef]]:
+    """Upload a file to S3 and run Textract on it.
+
+    If a page subset is given, a PDF of only those pages is uploaded in place of the file.
+    The file is released from the staging bucket as soon as the job finishes. Returns a
+    stream of the resulting blocks, or None if the job did not succeed.
+    """
+    s3_bucket_name = staging.bucket_name
+    s3_object_name = staging.object_name(file_path)
+    try:
+        # Upload the file to S3
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            upload_path = file_path
+            if subset is not None:
+                upload_path = Path(tmp_dir) / file_path.name
+                subset.write_pdf(file_path, upload_path)
+                logger.info(
+                    f"  Submitting {len(subset.pages)} of {subset.index.page_count} pages "
+                    f"of {file_path.name}"
+                )
+            logger.info(f"  Uploading {file_path} to s3://{s3_bucket_name}/{s3_object_name}")
+            with span("upload") as upload_span:
+                uploaded = staging.upload(upload_path, s3_object_name)
+                if uploaded:
+                    upload_span.add(bytes=upload_path.stat().st_size)
+            if uploaded:
+                logger.info(f"  Upload of {s3_object_name} complete.")
+            else:
+                logger.info(
+                    f"  s3://{s3_bucket_name}/{s3_object_name} is up to date, skipped upload."
+                )
+
+        # Process the file using Textract
+        job = run_document_analysis(textract_client, s3_bucket_name, s3_object_name, waiter)
+    finally:
+        # Ensure the file is deleted from S3 after processing
+        try:
+            if not staging.persistent:
+                logger.info(f"  Deleting s3://{s3_bucket_name}/{s3_object_name} from S3.")
+            staging.release(s3_object_name)
+            if not staging.persistent:
+                logger.info(f"  Deletion of {s3_object_name} from S3 complete.")
+        except Exception as e_del:
+            delete_error_msg = f"  - Error deleting {s3_object_name} from S3: {e_del}"
+            logger.error(delete_error_msg)
+            errors.append(delete_error_msg)
+
+    if job is None:
+        return None
+    return iter_document_blocks(textract_client, *job)
+
+
+def get_table_csv_results(
+    client: TextractClient,
+    s3_bucket_name: str,
+    s3_object_name: str,
+    waiter: Optional[TextractJobWaiter] = None,
+) -> Union[dict[int, Tuple[str, str]], None]:
+    """Get the table csv results from the PDF file using asynchronous processing.
+
+    If a waiter is given, the job is handed to it and this call blocks until the waiter
+    reports that the job finished. Otherwise the job is waited on here.
+    """
+    job = run_document_analysis(client, s3_bucket_name, s3_object_name, waiter)
+    if job is None:
+        return None
+    return get_tables_csv(iter_document_blocks(client, *job))
+
+
+def get_document_blocks(
+    client: TextractClient,
+    s3_bucket_name: str,
+    s3_object_name: str,
+    waiter: Optional[TextractJobWaiter] = None,
+) -> Optional[List[BlockTypeDef]]:
+    """Run a Textract document analysis job and return every block it produced.
+
+    Returns None if the job did not succeed.
+    """
+    job = run_document_analysis(client, s3_bucket_name, s3_object_name, waiter)
+    if job is None:
+        return None
+    blocks = list(iter_document_blocks(client, *job))
+    logger.info(f"Total blocks received: {len(blocks)}")
+    return blocks
+
+
+def run_document_analysis(
+    client: TextractClient,
+    s3_bucket_name: str,
+    s3_object_name: str,
+    waiter: Optional[TextractJobWaiter] = None,
+) -> Optional[Tuple[str, GetDocumentAnalysisResponseTypeDef]]:
+    """Run a Textract document analysis job and return its id and final status response.
+
+    Returns None if the job did not succeed.
+    """
+    logger.info(f"Starting Textract job for s3://{s3_bucket_name}/{s3_object_name}")
+
+    # Start the document analysis job
+    start_job_request: StartDocumentAnalysisRequestTypeDef = {
+        "DocumentLocation": {"S3Object": {"Bucket": s3_bucket_name, "Name": s3_object_name}},
+        "FeatureTypes": FEATURE_TYPES,
+    }
+    notification_channel = waiter.notification_channel() if waiter is not None else None
+    if notification_channel is not None:
+        start_job_request["NotificationChannel"] = notification_channel
+    start_job_response: StartDocumentAnalysisResponseTypeDef = client.start_document_analysis(
+        **start_job_request
+    )
+    job_id: str = start_job_response["JobId"]
+    logger.info(f"Job started with ID: {job_id}")
+
+    # Wait for job completion
+    get_job_response: GetDocumentAnalysisResponseTypeDef
+    with span("textract_wait"):
+        if waiter is None:
+            get_job_response = TextractJobWaiter(client).wait(job_id)
+        else:
+            get_job_response = waiter.register(job_id).result()
+    job_status: str = get_job_response["JobStatus"]
+
+    if job_status != "SUCCEEDED":
+        error_message = f"Textract job failed with status: {job_status}."
+        if "StatusMessage" in get_job_response:
+            error_message += f" Message: {get_job_response['StatusMessage']}"
+        if "Warnings" in get_job_response:
+            error_message += f" Warnings: {get_job_response['Warnings']}"
+        logger.error(error_message)
+        return None
+
+    return job_id, get_job_response
+
+
+def iter_document_blocks(
+    client: TextractClient, job_id: str, get_job_response: GetDocumentAnalysisResponseTypeDef
+) -> Iterator[BlockTypeDef]:
+    """Stream the blocks of a finished job, fetching each result page only when needed.
+
+    The final status response already holds the first page of blocks.
+    """
+    yield from get_job_response["Blocks"]
+    next_token: Optional[str] = get_job_response.get("NextToken")
+
+    # Paginate through results if necessary
+    while next_token:
+        get_job_request_final: GetDocumentAnalysisRequestTypeDef = {
+            "JobId": job_id,
+            "NextToken": next_token,
+        }
+        with span("get_document_analysis") as page_span:
+            final_response = client.get_document_analysis(**get_job_request_final)
+            page_span.add(rows=len(final_response["Blocks"]))
+
+        yield from final_response["Blocks"]
+
+        next_token = final_response.get("NextToken")
+
+
+def get_tables_csv(
+    blocks: Iterable[BlockTypeDef],
+) -> Union[dict[int, Tuple[str, str]], None]:
+    """Generate the values and scores csv of every table in a list of blocks."""
+    results: dict[int, Tuple[str, str]] = {}
+    resolver = TableResolver()
+    for index, table, blocks_map in resolver.feed(blocks):
+        results[index] = generate_table_csv(table, blocks_map)
+    resolver.finish()
+
+    if len(results) <= 0:
+        logger.warning("No tables found in the document.")
+        return None
+
+    return dict(sorted(results.items()))
+
+
+def write_tables_csv(
+    blocks: Iterable[BlockTypeDef],
+    output_dir: Path,
+    stem: str,
+    numbering: Optional[Callable[[BlockTypeDef], int]] = None,
+    parquet: bool = False,
+) -> int:
+    """Stream the values and scores csv of every table in a stream of blocks to files.
+
+    Each table is written to `<stem>__table_<N>__values.csv` and `__scores.csv` in the
+    output directory as soon as all of its blocks have arrived, and its blocks are
+    released right after. The float32 confidence matrix of the table,
+    `<stem>__table_<N>__scores.npy`, is written alongside, and with `parquet` a typed
+    `<stem>__table_<N>.parquet` with the parsed numbers, text and confidence of every
+    cell. Tables are numbered in order unless a `numbering` function is given. Returns
+    the number of tables written.
+    """
+    table_count = 0
+    resolver = TableResolver(numbering)
+    for index, table, blocks_map in resolver.feed(blocks):
+        values_csv_path = output_dir / (stem + f"__table_{index}__values.csv")
+        scores_csv_path = output_dir / (stem + f"__table_{index}__scores.csv")
+        with span("write_table_csv") as table_span:
+            rows: Iterable[Tuple[List[str], List[str]]] = iter_table_rows(table, blocks_map)
+            # Only the Parquet file needs every row at once.
+            if parquet:
+                rows = list(rows)
+            scores = ConfidenceCollector()
+            with (
+                open(values_csv_path, "w") as values_sink,
+                open(scores_csv_path, "w") as scores_sink,
+            ):
+                row_count = write_rows_csv(scores.observe(rows), values_sink, scores_sink)
+            if parquet:
+                write_table_parquet(rows, output_dir / (stem + f"__table_{index}.parquet"))
+            save_confidence_matrix(scores.matrix(), output_dir, stem, index)
+            table_span.add(rows=row_count, bytes=values_csv_path.stat().st_size)
+        table_count += 1
+    resolver.finish()
+
+    if table_count <= 0:
+        logger.warning("No tables found in the document.")
+    return table_count
+
+
+def generate_table_csv(
+    table_result: BlockTypeDef, blocks_map: Dict[str, BlockTypeDef]
+) -> Tuple[str, str]:
+    """Generate the table csv from the table result."""
+    values_sink = io.StringIO()
+    scores_sink = io.StringIO()
+    write_table_csv(table_result, blocks_map, values_sink, scores_sink)
+    return values_sink.getvalue(), scores_sink.getvalue()
+
+
+def write_table_csv(
+    table_result: BlockTypeDef,
+    blocks_map: Dict[str, BlockTypeDef],
+    values_sink: TextIO,
+    scores_sink: TextIO,
+) -> int:
+    """Write the values and scores csv of a table to two file-like sinks.
+
+    Rows are written as soon as they are resolved, so memory use is bounded by the widest
+    row and the cost is linear in the number of cells. Every value is quoted and the
+    scores row of a table row holds one confidence score per cell. Returns the number of
+    rows written.
+    """
+    return write_rows_csv(iter_table_rows(table_result, blocks_map), values_sink, scores_sink)
+
+
+def write_rows_csv(
+    rows: Iterable[Tuple[List[str], List[str]]], values_sink: TextIO, scores_sink: TextIO
+) -> int:
+    """Write (texts, scores) rows to a values and a scores csv sink. Returns the row count."""
+    values_writer = csv.writer(values_sink, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    row_count = 0
+    for texts, scores in rows:
+        values_writer.writerow(texts)
+        scores_sink.write(",".join(scores) + "\n")
+        row_count += 1
+    return row_count
+
+
+def iter_table_rows(
+    table_result: BlockTypeDef, blocks_map: Dict[str, BlockTypeDef]
+) -> Iterator[Tuple[List[str], List[str]]]:
+    """Yield the cell texts and confidence scores of a table one row at a time.
+
+    Textract lists the cells of a table in row-major order, so a row is complete as soon
+    as a cell of another row appears.
+    """
+    current_row: Optional[int] = None
+    texts: Dict[int, str] = {}
+    scores: List[str] = []
+    for relationship in table_result["Relationships"]:
+        if relationship["Type"] == "CHILD":
+            for child_id in relationship["Ids"]:
+                cell: BlockTypeDef = blocks_map[child_id]
+                if cell["BlockType"] == "CELL":
+                    row_index: int = cell["RowIndex"]
+                    if row_index != current_row:
+                        if texts:
+                            yield list(texts.values()), scores
+                        current_row = row_index
+                        texts = {}
+                        scores = []
+                    scores.append(str(cell["Confidence"]))
+                    texts[cell["ColumnIndex"]] = get_text(cell, blocks_map)
+    if texts:
+        yield list(texts.values()), scores
+
+
+def get_rows_columns_map(
+    table_result: BlockTypeDef, blocks_map: Dict[str, BlockTypeDef]
+) -> Tuple[Dict[int, Dict[int, str]], List[str]]:
+    """Get the rows and columns map from the table result."""
+    rows: Dict[int, Dict[int, str]] = {}
+    scores: List[str] = []
+    for relationship in table_result["Relationships"]:
+        if relationship["Type"] == "CHILD":
+            for child_id in relationship["Ids"]:
+                cell: BlockTypeDef = blocks_map[child_id]
+                if cell["BlockType"] == "CELL":
+                    row_index: int = cell["RowIndex"]
+                    col_index: int = cell["ColumnIndex"]
+                    if row_index not in rows:
+                        # create new row
+                        rows[row_index] = {}
+
+                    # get confidence score
+                    scores.append(str(cell["Confidence"]))
+
+                    # get the text value
+                    rows[row_index][col_index] = get_text(cell, blocks_map)
+    return rows, scores
+
+
+def get_text(result: BlockTypeDef, blocks_map: Dict[str, BlockTypeDef]) -> str:
+    """Get the text from the result."""
+    text: str = ""
+    if "Relationships" in result:
+        for relationship in result["Relationships"]:
+            if relationship["Type"] == "CHILD":
+                for child_id in relationship["Ids"]:
+                    word: BlockTypeDef = blocks_map[child_id]
+                    if word["BlockType"] == "WORD":
+                        text += format_word(word["Text"])
+                    if word["BlockType"] == "SELECTION_ELEMENT":
+                        if word["SelectionStatus"] == "SELECTED":
+                            text += "X "
+    return text
+
+
+def format_word(word: str) -> str:
+    """Format a word for a cell. Numbers with thousands separators are quoted."""
+    if "," in word and word.replace(",", "").isnumeric():
+        return '"' + word + '"' + " "
+    return word + " "
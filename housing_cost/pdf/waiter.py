@@ -0,0 +1,444 @@
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+import json
+import queue
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Protocol, Set, Tuple
+
+from loguru import logger
+from mypy_boto3_textract.client import TextractClient
+from mypy_boto3_textract.type_defs import (
+    GetDocumentAnalysisRequestTypeDef,
+    GetDocumentAnalysisResponseTypeDef,
+    NotificationChannelTypeDef,
+)
+
+if TYPE_CHECKING:
+    # Only for type checking: the SQS stubs are not a runtime dependency.
+    from mypy_boto3_sqs.client import SQSClient
+
+RUNNING_STATUSES = ("IN_PROGRESS", "PARTIAL_SUCCESS")
+_IDLE_WAIT = 0.1
+# The longest the loop blocks on a completion channel, so it picks up newly registered
+# jobs while waiting for notices.
+_RECEIVE_WAIT = 2.0
+# Notices for jobs not registered (yet) are held this many seconds, and at most this
+# many of them, before they are released to other consumers of the channel. Job IDs
+# resolved here are remembered as long, so late notices for them are acknowledged.
+EARLY_NOTICE_TTL = 60.0
+MAX_EARLY_NOTICES = 1000
+
+
+@dataclass
+class BackoffPolicy:
+    """Exponential backoff with jitter for polling Textract jobs.
+
+    Once Textract reports the page count of a document, the delay never drops below the
+    share `page_fraction` of the expected job duration, so large documents are polled
+    less often while small documents are picked up quickly.
+    """
+
+    initial_delay: float = 1.0
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.2
+    seconds_per_page: float = 1.5
+    page_fraction: float = 0.25
+
+    def next_delay(self, attempt: int, pages: Optional[int] = None) -> float:
+        """Return the number of seconds to wait before the next poll of a job."""
+        delay = self.initial_delay * self.multiplier**attempt
+        if pages:
+            delay = max(delay, pages * self.seconds_per_page * self.page_fraction)
+        delay = min(delay, self.max_delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+@dataclass(frozen=True)
+class CompletionNotice:
+    """A message announcing that a Textract job finished."""
+
+    job_id: str
+    status: str
+    completed_at: float  # Epoch seconds
+    # The handle the channel acknowledges or releases the notice by, e.g. an SQS receipt.
+    receipt: Optional[str] = field(default=None, compare=False)
+
+
+class CompletionChannel(Protocol):
+    """Delivers completion notices for Textract jobs as soon as they finish."""
+
+    def notification_channel(self) -> Optional[NotificationChannelTypeDef]:
+        """The NotificationChannel to pass to `start_document_analysis`, if any."""
+        ...
+
+    def receive(self, timeout: float) -> List[CompletionNotice]:
+        """Block for up to `timeout` seconds and return the notices that arrived."""
+        ...
+
+    def acknowledge(self, notice: CompletionNotice) -> None:
+        """Remove a notice the receiver owns from the channel."""
+        ...
+
+    def release(self, notice: CompletionNotice) -> None:
+        """Hand a notice the receiver does not own back to the other consumers."""
+        ...
+
+
+class InMemoryCompletionChannel:
+    """A local, in-process completion channel. Notices are published by the caller."""
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[CompletionNotice] = queue.Queue()
+
+    def notification_channel(self) -> Optional[NotificationChannelTypeDef]:
+        return None
+
+    def publish(self, job_id: str, status: str, completed_at: Optional[float] = None) -> None:
+        """Announce that a job finished."""
+        if completed_at is None:
+            completed_at = time.time()
+        self._queue.put(CompletionNotice(job_id, status, completed_at))
+
+    def receive(self, timeout: float) -> List[CompletionNotice]:
+        try:
+            notices = [self._queue.get(timeout=max(timeout, 0))]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                notices.append(self._queue.get_nowait())
+            except queue.Empty:
+                return notices
+
+    def acknowledge(self, notice: CompletionNotice) -> None:
+        pass
+
+    def release(self, notice: CompletionNotice) -> None:
+        pass
+
+
+class SQSCompletionChannel:
+    """Read the completion notices Textract publishes to SNS from a subscribed SQS queue.
+
+    Messages are only deleted once acknowledged, so a queue shared with other consumers
+    keeps the notices of their jobs. Released messages are made visible again at once.
+    """
+
+    def __init__(
+        self, sqs_client: "SQSClient", queue_url: str, sns_topic_arn: str, role_arn: str
+    ) -> None:
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.sns_topic_arn = sns_topic_arn
+        self.role_arn = role_arn
+
+    def notification_channel(self) -> Optional[NotificationChannelTypeDef]:
+        return {"SNSTopicArn": self.sns_topic_arn, "RoleArn": self.role_arn}
+
+    def receive(self, timeout: float) -> List[CompletionNotice]:
+        response = self.sqs_client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=10,
+            WaitTimeSeconds=min(20, max(0, int(timeout))),
+        )
+        notices: List[CompletionNotice] = []
+        for message in response.get("Messages", []):
+            body = json.loads(message["Body"])
+            # Messages delivered through SNS wrap the Textract payload in an envelope.
+            if "Message" in body:
+                body = json.loads(body["Message"])
+            notices.append(
+                CompletionNotice(
+                    body["JobId"],
+                    body["Status"],
+                    body["Timestamp"] / 1000,
+                    receipt=message["ReceiptHandle"],
+                )
+            )
+        return notices
+
+    def acknowledge(self, notice: CompletionNotice) -> None:
+        try:
+            self.sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=notice.receipt)
+        except Exception as e:
+            logger.warning(f"Could not delete the notice of job {notice.job_id}: {e}")
+
+    def release(self, notice: CompletionNotice) -> None:
+        try:
+            self.sqs_client.change_message_visibility(
+                QueueUrl=self.queue_url, ReceiptHandle=notice.receipt, VisibilityTimeout=0
+            )
+        except Exception as e:
+            logger.warning(f"Could not release the notice of job {notice.job_id}: {e}")
+
+
+@dataclass
+class JobWaitStats:
+    """How a job's completion was detected.
+
+    When a job is found by polling, the exact completion time is unknown, so
+    `detection_latency` is an upper bound: the time since the previous poll.
+    """
+
+    job_id: str
+    status: str = ""
+    polls: int = 0
+    elapsed: float = 0.0
+    detection_latency: Optional[float] = None
+    detected_by: str = ""
+
+
+@dataclass
+class _OpenJob:
+    future: Future[GetDocumentAnalysisResponseTypeDef]
+    stats: JobWaitStats
+    registered_at: float
+    last_poll_at: float
+    next_poll_at: float
+    pages: Optional[int] = None
+    attempt: int = 0
+
+
+@dataclass
+class TextractJobWaiter:
+    """Wait on every open Textract job from a single loop.
+
+    Workers register the job they started and block on the returned future, while the
+    thread that owns the waiter polls all open jobs with exponential backoff. If a
+    completion channel is given, a job is picked up as soon as its notice arrives and
+    polling only acts as a fallback. Registering a job wakes the loop, so it is polled on
+    time even while the loop sleeps on a long backoff.
+    """
+
+    client: TextractClient
+    policy: BackoffPolicy = field(default_factory=BackoffPolicy)
+    channel: Optional[CompletionChannel] = None
+    stats: List[JobWaitStats] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _OpenJob] = {}
+        self._wakeup = threading.Event()
+        # Notices of unregistered jobs and the IDs of resolved jobs, by arrival time.
+        self._early_notices: Dict[str, Tuple[float, CompletionNotice]] = {}
+        self._finished: Dict[str, float] = {}
+
+    def notification_channel(self) -> Optional[NotificationChannelTypeDef]:
+        """The NotificationChannel jobs waited on here should be started with."""
+        if self.channel is None:
+            return None
+        return self.channel.notification_channel()
+
+    def register(self, job_id: str) -> Future[GetDocumentAnalysisResponseTypeDef]:
+        """Add a job to the wait loop. The future resolves with the final status response."""
+        now = time.monotonic()
+        future: Future[GetDocumentAnalysisResponseTypeDef] = Future()
+        with self._lock:
+            self._jobs[job_id] = _OpenJob(
+                future=future,
+                stats=JobWaitStats(job_id),
+                registered_at=now,
+                last_poll_at=now,
+                next_poll_at=now + self.policy.next_delay(0),
+            )
+            early_notice = self._early_notices.pop(job_id, None)
+        self._wakeup.set()
+        if early_notice is not None:
+            self._handle_notice(early_notice[1])
+        return future
+
+    def wait(self, job_id: str) -> GetDocumentAnalysisResponseTypeDef:
+        """Register a job and run the wait loop until it finishes."""
+        future = self.register(job_id)
+        self.run_until_complete([future])
+        return future.result()
+
+    def run_until_complete(self, futures: Iterable[Future[Any]]) -> None:
+        """Keep waiting on the open jobs until all of the given futures are done.
+
+        The notices still held for unregistered jobs are released afterwards.
+        """
+        pending = set(futures)
+        for future in pending:
+            future.add_done_callback(lambda _: self._wakeup.set())
+        try:
+            self._wait_for(pending)
+        finally:
+            self._expire_notices(everything=True)
+
+    def _wait_for(self, pending: Set[Future[Any]]) -> None:
+        while pending:
+            self._expire_notices()
+            if not self._jobs:
+                # Nothing to poll yet. Wake up often so newly registered jobs are not missed.
+                _, pending = wait(pending, timeout=_IDLE_WAIT)
+                continue
+
+            # Cleared before the delay is computed, so a job registered meanwhile wakes it.
+            self._wakeup.clear()
+            delay = self._seconds_until_next_poll()
+            if self.channel is not None:
+                for notice in self.channel.receive(min(delay, _RECEIVE_WAIT)):
+                    self._handle_notice(notice)
+            else:
+                # Sleep until a poll is due, a job is registered or resolved, or one of the
+                # futures is done.
+                self._wakeup.wait(delay)
+            pending = {future for future in pending if not future.done()}
+            if pending:
+                self.poll_due()
+
+    def poll_due(self) -> None:
+        """Check the status of every job whose next poll is due."""
+        now = time.monotonic()
+        with self._lock:
+            due = [(job_id, job) for job_id, job in self._jobs.items() if job.next_poll_at <= now]
+
+        for job_id, job in due:
+            try:
+                get_job_request: GetDocumentAnalysisRequestTypeDef = {"JobId": job_id}
+                get_job_response = self.client.get_document_analysis(**get_job_request)
+            except Exception as e:
+                if self._close(job_id) is not None:
+                    job.future.set_exception(e)
+                continue
+
+            polled_at = time.monotonic()
+            job.stats.polls += 1
+            job_status = get_job_response["JobStatus"]
+            if "StatusMessage" in get_job_response:
+                logger.info(
+                    f"Job {job_id} status: {job_status} - {get_job_response['StatusMessage']}"
+                )
+            else:
+                logger.info(f"Job {job_id} status: {job_status}")
+
+            # Check if document metadata and pages are available
+            if (
+                "DocumentMetadata" in get_job_response
+                and "Pages" in get_job_response["DocumentMetadata"]
+            ):
+                current_pages_processed = get_job_response["DocumentMetadata"]["Pages"]
+                if current_pages_processed != job.pages:
+                    job.pages = current_pages_processed
+                    logger.info(f"Job {job_id} pages processed: {current_pages_processed}")
+
+            if job_status in RUNNING_STATUSES:
+                job.attempt += 1
+                job.last_poll_at = polled_at
+                job.next_poll_at = polled_at + self.policy.next_delay(job.attempt, job.pages)
+                continue
+
+            self._resolve(
+                job_id, get_job_response, detected_by="poll", latency=polled_at - job.last_poll_at
+            )
+
+    def summary(self) -> Dict[str, float]:
+        """Aggregate the detection statistics of every finished job."""
+        latencies = [s.detection_latency for s in self.stats if s.detection_latency is not None]
+        return {
+            "jobs": len(self.stats),
+            "polls": sum(s.polls for s in self.stats),
+            "mean_detection_latency": sum(latencies) / len(latencies) if latencies else 0.0,
+            "max_detection_latency": max(latencies, default=0.0),
+        }
+
+    def _handle_notice(self, notice: CompletionNotice) -> None:
+        with self._lock:
+            job = self._jobs.get(notice.job_id)
+            finished = notice.job_id in self._finished
+            if job is None and not finished:
+                # The job may finish before the worker that started it registers it, or
+                # belong to another consumer of the channel.
+                self._early_notices.pop(notice.job_id, None)
+                self._early_notices[notice.job_id] = (time.monotonic(), notice)
+        if job is None:
+            if finished and self.channel is not None:
+                self.channel.acknowledge(notice)
+            self._expire_notices()
+            return
+        if self.channel is not None:
+            self.channel.acknowledge(notice)
+
+        # The notice carries no blocks, so fetch the final response once.
+        try:
+            get_job_request: GetDocumentAnalysisRequestTypeDef = {"JobId": notice.job_id}
+            get_job_response = self.client.get_document_analysis(**get_job_request)
+        except Exception as e:
+            if self._close(notice.job_id) is not None:
+                job.future.set_exception(e)
+            return
+        job.stats.polls += 1
+
+        if get_job_response["JobStatus"] in RUNNING_STATUSES:
+            logger.warning(f"Job {notice.job_id} is still running despite a completion notice.")
+            return
+
+        self._resolve(
+            notice.job_id,
+            get_job_response,
+            detected_by="notification",
+            latency=max(0.0, time.time() - notice.completed_at),
+        )
+
+    def _resolve(
+        self,
+        job_id: str,
+        get_job_response: GetDocumentAnalysisResponseTypeDef,
+        detected_by: str,
+        latency: float,
+    ) -> None:
+        job = self._close(job_id)
+        if job is None:
+            return
+        with self._lock:
+            self._finished[job_id] = time.monotonic()
+        job.stats.status = get_job_response["JobStatus"]
+        job.stats.elapsed = time.monotonic() - job.registered_at
+        job.stats.detection_latency = latency
+        job.stats.detected_by = detected_by
+        self.stats.append(job.stats)
+        bound = "<=" if detected_by == "poll" else "="
+        logger.info(
+            f"Job {job_id} {job.stats.status} after {job.stats.elapsed:.1f}s and "
+            f"{job.stats.polls} polls; detection latency {bound} {latency:.2f}s ({detected_by})"
+        )
+        job.future.set_result(get_job_response)
+        self._wakeup.set()
+
+    def _seconds_until_next_poll(self) -> float:
+        with self._lock:
+            if not self._jobs:
+                return 0.0
+            next_poll_at = min(job.next_poll_at for job in self._jobs.values())
+        return max(0.0, next_poll_at - time.monotonic())
+
+    def _close(self, job_id: str) -> Optional[_OpenJob]:
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def _expire_notices(self, everything: bool = False) -> None:
+        """Release the early notices past EARLY_NOTICE_TTL or over MAX_EARLY_NOTICES.
+
+        With `everything`, every early notice is released.
+        """
+        expired: List[CompletionNotice] = []
+        cutoff = time.monotonic() - EARLY_NOTICE_TTL
+        with self._lock:
+            # Both maps are in arrival order, so the oldest entries come first.
+            for job_id, (arrived_at, notice) in list(self._early_notices.items()):
+                within = len(self._early_notices) <= MAX_EARLY_NOTICES
+                if not everything and arrived_at > cutoff and within:
+                    break
+                del self._early_notices[job_id]
+                expired.append(notice)
+            for job_id, finished_at in list(self._finished.items()):
+                if finished_at > cutoff:
+                    break
+                del self._finished[job_id]
+        if self.channel is not None:
+            for notice in expired:
+                self.channel.release(notice)
@@ -0,0 +1,230 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+import hashlib
+import importlib
+import json
+import os
+from pathlib import Path
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from housing_cost.files import file_sha256
+from housing_cost.profiling import Profiler, Span, get_profiler, set_profiler
+
+
+@dataclass
+class Stage:
+    """A step of a pipeline.
+
+    Attributes:
+        name: Unique name of the stage.
+        func: The function that builds the outputs, as "module:function". It is called
+            in a worker process as `func(inputs, outputs, **params)`.
+        inputs: Files the stage reads.
+        outputs: Files the stage writes.
+        params: Keyword arguments passed to the function. They must be JSON serializable.
+    """
+
+    name: str
+    func: str
+    inputs: List[Path]
+    outputs: List[Path]
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    def params_hash(self) -> str:
+        payload = json.dumps({"func": self.func, "params": self.params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class StageResult:
+    name: str
+    status: str  # "skipped", "built" or "failed"
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class FileHashes:
+    """SHA-256 of files, only recomputed when a file's size or modification time change."""
+
+    def __init__(self, known: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.known: Dict[str, Dict[str, Any]] = known or {}
+
+    def get(self, path: Path) -> Optional[str]:
+        """The hash of a file, or None if it does not exist."""
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        entry = self.known.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        sha256 = file_sha256(path)
+        self.known[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        return sha256
+
+
+class Pipeline:
+    """A dependency graph of stages with hash-based incremental builds.
+
+    A stage depends on every stage that writes one of its inputs. The hashes of the
+    inputs, the parameters and the outputs of the last successful build of every stage
+    are kept in a state file. A stage is rebuilt only if any of them changed, or if one
+    of its outputs is missing; otherwise it is skipped. Stages whose dependencies are
+    done run in parallel worker processes.
+    """
+
+    def __init__(self, stages: List[Stage], state_path: Path) -> None:
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Stage names must be unique.")
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        producers = {str(output): stage.name for stage in stages for output in stage.outputs}
+        self.dependencies: Dict[str, Set[str]] = {
+            stage.name: {producers[str(i)] for i in stage.inputs if str(i) in producers}
+            for stage in stages
+        }
+        self._check_acyclic()
+
+    def run(
+        self, max_workers: Optional[int] = None, force: bool = False
+    ) -> Dict[str, StageResult]:
+        """Bring every stage up to date. Returns the result of each stage."""
+        state = self._load_state()
+        hashes = FileHashes(state.get("files"))
+        stage_state: Dict[str, Dict[str, Any]] = state.get("stages", {})
+
+        profiler = get_profiler()
+        results: Dict[str, StageResult] = {}
+        pending = dict(self.dependencies)
+        running: Dict[Future, str] = {}
+        executor: Optional[ProcessPoolExecutor] = None
+        try:
+            while pending or running:
+                ready = [n for n, deps in pending.items() if deps <= results.keys()]
+                while ready:
+                    name = ready.pop(0)
+                    del pending[name]
+                    stage = self.stages[name]
+                    failed = [d for d in self.dependencies[name] if results[d].status == "failed"]
+                    if failed:
+                        error = f"dependency {failed[0]} failed"
+                        results[name] = StageResult(name, "failed", error=error)
+                        logger.error(f"Stage {name} not run: {error}")
+                    elif not force and self._is_current(stage, stage_state.get(name), hashes):
+                        results[name] = StageResult(name, "skipped")
+                        logger.info(f"Stage {name} is up to date.")
+                    else:
+                        if executor is None:
+                            executor = ProcessPoolExecutor(
+                                max_workers=max_workers or os.cpu_count()
+                            )
+                        logger.info(f"Building stage {name}...")
+                        future = executor.submit(
+                            _run_stage, stage, profiler.enabled, profiler.cprofile_dir
+                        )
+                        running[future] = name
+                    if not ready:
+                        # Skipped and failed stages can make others ready.
+                        ready = [n for n, deps in pending.items() if deps <= results.keys()]
+
+                if not running:
+                    if pending:
+                        # Unreachable while the graph is acyclic.
+                        raise RuntimeError(f"Stages cannot be scheduled: {sorted(pending)}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    try:
+                        seconds, spans = future.result()
+                    except Exception as e:
+                        results[name] = StageResult(name, "failed", error=str(e))
+                        stage_state.pop(name, None)
+                        logger.error(f"Stage {name} failed: {e}")
+                        continue
+                    profiler.extend(spans)
+                    results[name] = StageResult(name, "built", seconds)
+                    stage_state[name] = self._fingerprint(stage, hashes)
+                    logger.success(f"Built stage {name} in {seconds:.2f}s.")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            self._save_state({"files": hashes.known, "stages": stage_state})
+        return results
+
+    def _is_current(
+        self, stage: Stage, previous: Optional[Dict[str, Any]], hashes: FileHashes
+    ) -> bool:
+        if previous is None:
+            return False
+        return previous == self._fingerprint(stage, hashes) and all(
+            output.exists() for output in stage.outputs
+        )
+
+    def _fingerprint(self, stage: Stage, hashes: FileHashes) -> Dict[str, Any]:
+        return {
+            "params": stage.params_hash(),
+            "inputs": {str(path): hashes.get(path) for path in stage.inputs},
+            "outputs": {str(path): hashes.get(path) for path in stage.outputs},
+        }
+
+    def _check_acyclic(self) -> None:
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"The stages have a dependency cycle through {name}.")
+            visiting.add(name)
+            for dependency in self.dependencies[name]:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _load_state(self) -> Dict[str, Any]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except ValueError:
+            logger.warning(f"Ignoring unreadable pipeline state {self.state_path}")
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+
+def _run_stage(
+    stage: Stage, profile: bool = False, cprofile_dir: Optional[Path] = None
+) -> Tuple[float, List[Span]]:
+    """Import and run the function of a stage. Runs in a worker process.
+
+    Returns the run time and, when profiling, the spans recorded in the worker.
+    """
+    start = time.perf_counter()
+    profiler = Profiler(enabled=profile, cprofile_dir=cprofile_dir)
+    set_profiler(profiler)
+    module_name, func_name = stage.func.split(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    for output in stage.outputs:
+        output.parent.mkdir(parents=True, exist_ok=True)
+    input_bytes = sum(path.stat().st_size for path in stage.inputs if path.exists())
+    with profiler.stage(stage.name, bytes=input_bytes):
+        func(stage.inputs, stage.outputs, **stage.params)
+    return time.perf_counter() - start, profiler.spans
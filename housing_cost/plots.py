@@ -4,7 +4,7 @@ from loguru import logger
 from tqdm import tqdm
 import typer
 
-from housing_cost.config import FIGURES_DIR, PROCESSED_DATA_DIR
+from housing_cost.config import FIGURES_DIR, PROCESSED_DATA_DIR, configure_logging
 
 app = typer.Typer()
 
@@ -16,6 +16,7 @@ def main(
     output_path: Path = FIGURES_DIR / "plot.png",
     # -----------------------------------------
 ):
+    configure_logging()
     # ---- REPLACE THIS WITH YOUR OWN CODE ----
     logger.info("Generating plot from data...")
     for i in tqdm(range(10), total=10):
@@ -1,11 +1,48 @@
-from .process_construction_cost import process_construction_cost_2024
-from .process_cost_breakdown import process_cost_breakdown
-from .process_cost_history import process_cost_history
-from .process_median_income import process_median_income
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .process_construction_cost import process_construction_cost_2024
+    from .process_cost_breakdown import cost_breakdown_totals, process_cost_breakdown
+    from .process_cost_history import process_cost_histories, process_cost_history
+    from .process_median_income import (
+        IncomeProjection,
+        process_median_income,
+        project_median_income,
+        rate_grid,
+    )
+
+# The submodule of every exported name, imported on first access: the processors pull in
+# pandas and numpy, which a command should only load when it uses them.
+_EXPORTS = {
+    "process_construction_cost_2024": "process_construction_cost",
+    "process_cost_breakdown": "process_cost_breakdown",
+    "cost_breakdown_totals": "process_cost_breakdown",
+    "process_cost_histories": "process_cost_history",
+    "process_cost_history": "process_cost_history",
+    "process_median_income": "process_median_income",
+    "project_median_income": "process_median_income",
+    "rate_grid": "process_median_income",
+    "IncomeProjection": "process_median_income",
+}
 
 __all__ = [
     "process_construction_cost_2024",
     "process_cost_history",
+    "process_cost_histories",
     "process_median_income",
     "process_cost_breakdown",
+    "cost_breakdown_totals",
+    "project_median_income",
+    "rate_grid",
+    "IncomeProjection",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -4,12 +4,20 @@ from typing import Tuple
 
 import pandas as pd
 
+from housing_cost.compact import compact_frame
+from housing_cost.parsing import parse_numbers, warn_rejected
+from housing_cost.profiling import profiled
 
-def process_construction_cost_2024(filepath: Path) -> Tuple[pd.DataFrame, pd.DataFrame]:
+
+@profiled
+def process_construction_cost_2024(
+    filepath: Path, compact: bool = False
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Process the construction cost 2024 data.
 
     Args:
         filepath: The path to the construction cost 2024 data.
+        compact: Return categorical labels and 32-bit numbers, see `compact_frame`.
 
     Returns:
         A tuple of two DataFrames:
@@ -42,20 +50,15 @@ def process_construction_cost_2024(filepath: Path) -> Tuple[pd.DataFrame, pd.Dat
             return match.group(1).strip()
         return name.strip()
 
-    def clean_cost(value: str) -> int:
-        """Clean the cost of the item."""
-        return int(value.replace("$", "").replace(",", "").replace(" ", ""))
-
-    def clean_percent(value: str) -> float:
-        """Clean the percent of the item."""
-        return float(value.replace("%", "").replace(" ", ""))
-
     df["is_total"] = df["name"].apply(is_total)
     df["subcategory"] = df["name"].apply(clean_name)
     df["category"] = df["subcategory"].where(df["is_total"], None)
     df["category"] = df["category"].ffill()
-    df["cost"] = df["cost"].apply(clean_cost)
-    df["percent"] = df["percent"].apply(clean_percent)
+    cost = parse_numbers(df["cost"])
+    percent = parse_numbers(df["percent"])
+    warn_rejected(pd.concat([cost.rejected_cells(), percent.rejected_cells()]), filepath)
+    df["cost"] = cost.values.round().astype("Int64")
+    df["percent"] = percent.values
     df = df[["category", "subcategory", "cost", "percent", "is_total"]]
 
     totals = df[df["is_total"]]
@@ -65,4 +68,6 @@ def process_construction_cost_2024(filepath: Path) -> Tuple[pd.DataFrame, pd.Dat
     subtotals = df[~df["is_total"]]
     subtotals = subtotals.set_index(["category", "subcategory"])
 
+    if compact:
+        return compact_frame(totals), compact_frame(subtotals)
     return totals, subtotals
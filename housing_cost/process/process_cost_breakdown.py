@@ -1,12 +1,15 @@
 # %%
+from pathlib import Path
 import re
 
-import cpi  # type: ignore
 import pandas as pd
 
+from housing_cost.compact import compact_frame
 from housing_cost.config import INTERIM_DATA_DIR
+from housing_cost.deflator import Deflator
+from housing_cost.parsing import parse_numbers, warn_rejected
+from housing_cost.profiling import profiled
 
-cpi.update()
 # %%
 COST = "cost"
 YEAR = "year"
@@ -21,19 +24,16 @@ SQR_FEET = "sqr_feet"
 LOT_SIZE = "lot_size"
 
 
-def process_cost_breakdown() -> pd.DataFrame:
-    """Process the cost breakdown data for the 2024 NABH Construction Cost Survey."""
-    part_1_path = INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_7__values.csv"
-    part_2_path = INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_8__values.csv"
+def cost_breakdown_totals(deflator: Deflator | None = None) -> pd.DataFrame:
+    """The total construction cost, house size and lot size of every cost breakdown year.
 
-    df1 = pd.read_csv(part_1_path)
-    df2 = pd.read_csv(part_2_path)
-
-    df1 = pd.melt(df1, id_vars=[df1.columns[0]], var_name=YEAR, value_name=PERCENT)
-    df2 = pd.melt(df2, id_vars=[df2.columns[0]], var_name=YEAR, value_name=PERCENT)
-    df = pd.concat([df1, df2])
-    df.columns = pd.Index([COST, YEAR, PERCENT])
+    Args:
+        deflator: The CPI snapshot to adjust with. Defaults to the latest snapshot.
 
+    Returns:
+        One row per year, with the total cost in nominal and adjusted dollars, the CPI,
+        and the house and lot size in square feet.
+    """
     # I hard coded these values because the PDF parser did not extract them correctly.
     # They are formatted vertically which appears to confuse the parser.
     df_total = pd.DataFrame(
@@ -94,9 +94,48 @@ def process_cost_breakdown() -> pd.DataFrame:
     ).T.reset_index()
     df_total.columns = pd.Index([YEAR, USD, SQR_FEET, LOT_SIZE])
 
-    df_total[CPI] = df_total[YEAR].apply(lambda x: cpi.get(x))
+    deflator = deflator or Deflator.load()
+    df_total[CPI] = deflator.cpi(df_total[YEAR])
     last_year = df_total[YEAR].max()
-    df_total[USD_ADJUSTED] = df_total[USD] * (cpi.get(last_year) / df_total[CPI])
+    df_total[USD_ADJUSTED] = deflator.adjust(df_total[USD], df_total[YEAR], last_year)
+    return df_total
+
+
+@profiled
+def process_cost_breakdown(
+    part_1_path: Path | None = None,
+    part_2_path: Path | None = None,
+    deflator: Deflator | None = None,
+    compact: bool = False,
+) -> pd.DataFrame:
+    """Process the cost breakdown data of the NABH Construction Cost Survey.
+
+    Every row holds the totals of its year from `cost_breakdown_totals`. Compact frames
+    leave them out, as they are the same for every category of a year; join them back
+    with `df.join(cost_breakdown_totals().set_index("year"), on="year")`.
+
+    Args:
+        part_1_path: The values CSV of the first part of the cost breakdown table.
+            Defaults to the 2024 edition.
+        part_2_path: The values CSV of the second part. Defaults to the 2024 edition.
+        deflator: The CPI snapshot to adjust with. Defaults to the latest snapshot.
+        compact: Return categorical labels, 32-bit numbers and no totals, see
+            `compact_frame`.
+    """
+    if part_1_path is None:
+        part_1_path = INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_7__values.csv"
+    if part_2_path is None:
+        part_2_path = INTERIM_DATA_DIR / "NABH Construction Cost - 2024__table_8__values.csv"
+
+    df1 = pd.read_csv(part_1_path)
+    df2 = pd.read_csv(part_2_path)
+
+    df1 = pd.melt(df1, id_vars=[df1.columns[0]], var_name=YEAR, value_name=PERCENT)
+    df2 = pd.melt(df2, id_vars=[df2.columns[0]], var_name=YEAR, value_name=PERCENT)
+    df = pd.concat([df1, df2])
+    df.columns = pd.Index([COST, YEAR, PERCENT])
+
+    df_total = cost_breakdown_totals(deflator)
 
     def is_total(name: str) -> bool:
         """Return true if the name is a category."""
@@ -122,16 +161,6 @@ def process_cost_breakdown() -> pd.DataFrame:
             return match.group(1).strip()
         return name.strip()
 
-    def clean_percent(percent: str) -> float | None:
-        """Return the percent of the category."""
-        if isinstance(percent, float):
-            return percent
-        if isinstance(percent, str):
-            match = re.match(r"(\d+\.?\d*)%", percent)
-            if match:
-                return float(match.group(1))
-        return None
-
     labels = df[COST].value_counts().to_frame().reset_index()
     labels[IS_TOTAL] = labels[COST].apply(is_total)
     labels[SUBCATEGORY] = labels[COST].apply(clean_name)
@@ -143,7 +172,12 @@ def process_cost_breakdown() -> pd.DataFrame:
     df = df.join(labels).reset_index(drop=True)
     df = df.drop(columns=["count"])
     df[YEAR] = df[YEAR].astype("Int32")
-    df[PERCENT] = df[PERCENT].apply(clean_percent)
+    percent = parse_numbers(df[PERCENT])
+    warn_rejected(percent.rejected_cells(), f"{part_1_path} and {part_2_path}")
+    df[PERCENT] = percent.values.to_numpy()
+    if compact:
+        df = df[df[YEAR].isin(df_total[YEAR])]
+        return compact_frame(df.set_index([CATEGORY, SUBCATEGORY, YEAR]))
     df = df.merge(df_total, on=YEAR)
     df.set_index([CATEGORY, SUBCATEGORY, YEAR], inplace=True)
     return df
@@ -1,61 +1,165 @@
 from pathlib import Path
-import re
 
-import cpi  # type: ignore
+import numpy as np
 import pandas as pd
 
+from housing_cost.compact import compact_frame
+from housing_cost.deflator import Deflator
+from housing_cost.parsing import parse_numbers, warn_rejected
+from housing_cost.profiling import profiled
 
-def process_cost_history(path: Path, target_year: int = 2024) -> tuple[pd.DataFrame, pd.DataFrame]:
+TOTAL = "Total Sales Price ($)"
+PERCENT_TOTAL = "percent_total"
+EDITION = "edition"
+
+
+def _read_history(path: Path) -> pd.DataFrame:
+    """Read a cost history table into long format, one row per cell: category, year, text."""
+    df = pd.read_csv(path)
+    names = df.iloc[:, 0].astype(str).str.strip()
+    names = names.str.replace(r"^\d+\.\s*", "", regex=True).str.strip()
+    values = df.iloc[:, 1:]
+    return pd.DataFrame(
+        {
+            "category": np.repeat(names.to_numpy(), values.shape[1]),
+            "year": np.tile(values.columns.astype(int).to_numpy(), len(values)),
+            "text": values.to_numpy(dtype=object).ravel(),
+        }
+    )
+
+
+@profiled
+def process_cost_histories(
+    paths: list[Path],
+    target_year: int = 2024,
+    deflator: Deflator | None = None,
+    editions: list[int] | None = None,
+    compact: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Process any number of cost history tables, e.g. the parts of several editions.
+
+    The cells of every table are parsed in one pass and aligned into one matrix of
+    (edition, year) rows by category columns. Each category's share of the total sales
+    price is turned into dollars with a single broadcast over that matrix. The rows come
+    out table by table, in the order of `paths`, as if every table was processed alone.
+
+    Args:
+        paths: The values CSVs of the cost history tables.
+        target_year: The year to adjust the dollar values to.
+        deflator: The CPI snapshot to adjust with. Defaults to the latest snapshot.
+        editions: The survey edition of every table. If given, the outputs have an
+            edition column first.
+        compact: Return categorical labels and 32-bit numbers, see `compact_frame`.
+
+    Returns:
+        The percent of each category, with the total sales price and the sum of the
+        percents as categories, and the dollar value of each category, nominal and
+        adjusted for inflation.
+    """
+    tables = [_read_history(path) for path in paths]
+    cells = pd.concat(tables, ignore_index=True)
+    cells[EDITION] = np.repeat(editions or [0] * len(paths), [len(t) for t in tables])
+    parsed = parse_numbers(cells["text"])
+    warn_rejected(parsed.rejected_cells(), ", ".join(str(path) for path in paths))
+
+    # One row per (edition, year), one column per category.
+    row_codes, rows = pd.MultiIndex.from_frame(cells[[EDITION, "year"]]).factorize(sort=True)
+    category_codes, categories = pd.factorize(cells["category"])
+    shape = (len(rows), len(categories))
+    percent = np.full(shape, np.nan)
+    percent[row_codes, category_codes] = parsed.values.to_numpy()
+    present = np.zeros(shape, dtype=bool)
+    present[row_codes, category_codes] = True
+    # The table every (edition, year) row comes from.
+    row_table = np.empty(len(rows), dtype=np.int64)
+    row_table[row_codes] = np.repeat(np.arange(len(tables)), [len(t) for t in tables])
+
+    # Categories by name, so the percents are summed in a fixed order.
+    order = np.argsort(np.asarray(categories), kind="stable")
+    categories, percent, present = categories[order], percent[:, order], present[:, order]
+
+    is_total = np.asarray(categories == TOTAL)
+    price = percent[:, is_total].sum(axis=1) if is_total.any() else np.full(len(rows), np.nan)
+    percent_total = np.nansum(percent[:, ~is_total], axis=1)
+    usd = np.round(percent[:, ~is_total] / percent_total[:, np.newaxis] * price[:, np.newaxis])
+
+    # Per table, percents by category name, then the sum of the percents.
+    df = _long(rows, categories, percent, present, "percent")
+    totals = pd.DataFrame(
+        {EDITION: rows.get_level_values(0), "year": rows.get_level_values(1)}
+    ).assign(category=PERCENT_TOTAL, percent=percent_total)
+    df = pd.concat([df, totals], ignore_index=True)
+    row_positions = np.concatenate([_cells(present)[0], np.arange(len(rows))])
+    df = df.take(np.argsort(row_table[row_positions], kind="stable")).reset_index(drop=True)
+
+    # Per table, dollars by the mean value of the category in the table, highest first.
+    usd_present = present[:, ~is_total]
+    held = usd_present & ~np.isnan(usd)
+    sums = np.zeros((len(tables), usd.shape[1]))
+    counts = np.zeros((len(tables), usd.shape[1]))
+    np.add.at(sums, row_table, np.where(held, usd, 0))
+    np.add.at(counts, row_table, held)
+    with np.errstate(invalid="ignore"):
+        means = sums / counts
+    rank = np.argsort(np.argsort(-means, axis=1, kind="stable"), axis=1)
+    dfc = _long(rows, categories[~is_total], usd, usd_present, "usd")
+    row_positions, category_positions = _cells(usd_present)
+    table = row_table[row_positions]
+    order = np.lexsort((row_positions, rank[table, category_positions], table))
+    dfc = dfc.take(order).reset_index(drop=True)
+    deflator = deflator or Deflator.load()
+    dfc["usd_adjusted"] = deflator.adjust(dfc["usd"], dfc["year"], target_year)
+    dfc["usd"] = dfc["usd"].astype("Int64")
+
+    if editions is None:
+        df, dfc = df.drop(columns=EDITION), dfc.drop(columns=EDITION)
+    if compact:
+        return compact_frame(df), compact_frame(dfc)
+    return df, dfc
+
+
+def _long(
+    rows: pd.MultiIndex,
+    categories: pd.Index,
+    values: np.ndarray,
+    present: np.ndarray,
+    name: str,
+) -> pd.DataFrame:
+    """The cells of an (edition, year) x category matrix held by a table, by category."""
+    row_positions, category_positions = _cells(present)
+    return pd.DataFrame(
+        {
+            EDITION: rows.get_level_values(0)[row_positions],
+            "year": rows.get_level_values(1)[row_positions],
+            "category": categories.to_numpy()[category_positions],
+            name: values[row_positions, category_positions],
+        }
+    )
+
+
+def _cells(present: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The row and column positions of the held cells of a matrix, column by column."""
+    category_positions, row_positions = np.nonzero(present.T)
+    return row_positions, category_positions
+
+
+def process_cost_history(
+    path: Path,
+    target_year: int = 2024,
+    deflator: Deflator | None = None,
+    compact: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """Process the cost history data from a CSV file.
 
     Args:
         path (Path): The path to the CSV file containing the cost history data.
         target_year (int): The year to adjust the cost history to.
+        deflator (Deflator | None): The CPI snapshot to adjust with. Defaults to the
+            latest snapshot.
+        compact (bool): Return categorical labels and 32-bit numbers.
 
     Returns:
         tuple[pd.DataFrame, pd.DataFrame]: A tuple containing the processed cost history
         data and the dollar value of each category.
     """
-
-    def clean_name(name: str) -> str:
-        """"""
-        name = name.strip()
-        match = re.match(r"^\d+\.\s*(.*)$", name)
-        if match:
-            name = match.group(1).strip()
-        return name
-
-    def clean_values(value: str) -> float | None:
-        """"""
-        value = re.sub(r'["\s\$,%]', "", value)
-        if value == "":
-            return None
-        return float(value)
-
-    df = pd.read_csv(path)
-    df.columns = pd.Index(["category", *df.columns[1:]])
-    df["category"] = df["category"].apply(clean_name)
-    df = df.melt(id_vars=["category"], var_name="year", value_name="value")
-    df = df.pivot(columns="category", index="year", values="value")
-    df = df.map(clean_values)  # type: ignore
-    df["percent_total"] = df[df.columns[:-1]].sum(axis=1)
-
-    # Dollar value of each category
-    dfc = df.copy()
-    for col in dfc.columns[:-2]:
-        dfc[col] = (dfc[col] / dfc["percent_total"]) * dfc["Total Sales Price ($)"]
-    dfc["total"] = dfc[dfc.columns[:-2]].sum(axis=1)
-    dfc = dfc.round(0).astype(int)
-    dfc["difference"] = dfc["total"] - dfc["Total Sales Price ($)"]
-
-    dfc = dfc.drop(columns=["difference", "percent_total", "total", "Total Sales Price ($)"])
-    dfc = dfc[dfc.mean().sort_values(ascending=False).index]
-    df = df.reset_index().melt(id_vars=["year"], var_name="category", value_name="percent")
-    dfc = dfc.reset_index().melt(id_vars=["year"], var_name="category", value_name="value")
-    years = {int(y): cpi.get(int(y)) for y in df["year"].unique()}
-    max_cpi = cpi.get(target_year)
-    dfc["cpi"] = dfc["year"].apply(lambda x: years[int(x)])
-    dfc["usd_adjusted"] = dfc["value"] * (max_cpi / dfc["cpi"])
-    dfc = dfc[["year", "category", "value", "usd_adjusted"]]
-    dfc.columns = pd.Index(["year", "category", "usd", "usd_adjusted"])
-    return df, dfc
+    return process_cost_histories([path], target_year, deflator, compact=compact)
@@ -1,12 +1,110 @@
+from dataclasses import dataclass
 from pathlib import Path
-import re
-from typing import Any, Tuple
 
+import numpy as np
+import numpy.typing as npt
 import pandas as pd
 
+from housing_cost.compact import compact_frame
+from housing_cost.config import SPREADSHEET_CACHE_DIR
+from housing_cost.parsing import parse_numbers, warn_rejected
+from housing_cost.profiling import profiled
+from housing_cost.spreadsheet import read_spreadsheet
 
+# The measures of a projection: current dollars, and dollars of the base year.
+MEASURES = ["nominal", "real"]
+
+
+@dataclass
+class IncomeProjection:
+    """Median income projected under many scenarios of income growth and inflation.
+
+    Attributes:
+        values: A scenario x year x measure cube of float64 incomes, with the measures in
+            the order of MEASURES.
+        income_growth_rates: The yearly income growth rate of every scenario.
+        inflation_rates: The yearly inflation rate of every scenario.
+        years: The projected years.
+    """
+
+    values: np.ndarray
+    income_growth_rates: np.ndarray
+    inflation_rates: np.ndarray
+    years: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        """The cube in long format, one row per scenario and year."""
+        scenarios, years = self.values.shape[:2]
+        return pd.DataFrame(
+            {
+                "scenario": np.repeat(np.arange(scenarios), years),
+                "income_growth_rate": np.repeat(self.income_growth_rates, years),
+                "inflation_rate": np.repeat(self.inflation_rates, years),
+                "year": np.tile(self.years, scenarios),
+                **{m: self.values[:, :, i].ravel() for i, m in enumerate(MEASURES)},
+            }
+        )
+
+
+def rate_grid(
+    income_growth_rates: npt.ArrayLike, inflation_rates: npt.ArrayLike
+) -> tuple[np.ndarray, np.ndarray]:
+    """Every combination of the given income growth and inflation rates, as scenarios."""
+    growth, inflation = np.meshgrid(
+        np.asarray(income_growth_rates, dtype=float),
+        np.asarray(inflation_rates, dtype=float),
+        indexing="ij",
+    )
+    return growth.ravel(), inflation.ravel()
+
+
+def project_median_income(
+    base_income: float,
+    base_year: int,
+    income_growth_rates: npt.ArrayLike,
+    inflation_rates: npt.ArrayLike,
+    horizons: npt.ArrayLike,
+) -> IncomeProjection:
+    """Project the median income of every scenario over every horizon in one operation.
+
+    The rates are yearly factors, e.g. 1.04 for 4% growth, and are broadcast against each
+    other into one scenario per element. Use `rate_grid` to sweep every combination of
+    two ranges. The income compounds at the growth rate and the real income is deflated
+    by the compounded inflation rate, so incomes are a broadcast of the scenarios
+    against the horizons rather than a loop over either.
+
+    Args:
+        base_income: The median income of the base year, in current dollars.
+        base_year: The last year with a known median income.
+        income_growth_rates: The yearly income growth rate of every scenario.
+        inflation_rates: The yearly inflation rate of every scenario.
+        horizons: The number of years after the base year to project.
+
+    Returns:
+        The projected nominal and real (base year dollars) incomes.
+    """
+    growth, inflation = np.broadcast_arrays(
+        np.asarray(income_growth_rates, dtype=float), np.asarray(inflation_rates, dtype=float)
+    )
+    growth, inflation = growth.ravel(), inflation.ravel()
+    horizons = np.asarray(horizons, dtype=np.int64).ravel()
+
+    values = np.empty((len(growth), len(horizons), len(MEASURES)))
+    nominal, real = values[:, :, 0], values[:, :, 1]
+    np.power(growth[:, np.newaxis], horizons, out=nominal)
+    nominal *= base_income
+    np.power(inflation[:, np.newaxis], horizons, out=real)
+    np.divide(nominal, real, out=real)
+    return IncomeProjection(values, growth, inflation, base_year + horizons)
+
+
+@profiled
 def process_median_income(
-    filepath: Path, inflation_rate: float, income_growth_rate: float
+    filepath: Path,
+    inflation_rate: float,
+    income_growth_rate: float,
+    cache_dir: Path = SPREADSHEET_CACHE_DIR,
+    compact: bool = False,
 ) -> pd.DataFrame:
     """Process the median income data. Projects the next year's median income.
 
@@ -14,49 +112,38 @@ def process_median_income(
         filepath: The path to the median income data.
         inflation_rate: The inflation rate.
         income_growth_rate: The income growth rate.
+        cache_dir: Where the parsed spreadsheet is cached, see `read_spreadsheet`.
+        compact: Return 32-bit numbers, see `compact_frame`.
 
     Returns:
         A DataFrame containing the processed median income data.
     """
 
-    def parse_year(value: Any) -> Tuple[int, int | None]:
-        """Parse the year and optional footnote from a string."""
-        if isinstance(value, int):
-            return value, None
-        match = re.match(r"^(\d{4})(.*)$", value)
-        if match:
-            year = int(match.group(1).strip())
-            footnote = (
-                int(match.group(2).strip().replace("(", "").replace(")", ""))
-                if match.group(2)
-                else None
-            )
-            return year, footnote
-        if isinstance(value, str):
-            return int(value.strip()), None
-        raise ValueError(f"Unexpected value: {value}")
-
     # Limit rows to all households.
-    df = pd.read_excel(filepath, skiprows=7, header=[0, 1], nrows=46)
+    df = read_spreadsheet(filepath, cache_dir, skiprows=7, header=[0, 1], nrows=46)
     # NOTE: Households are in thousands.
     df.columns = pd.Index(
         ["year", "households", "median_current", "median_2023", "mean_current", "mean_2023"]
     )
-    result = df["year"].apply(parse_year)
-    df["year"], df["footnote"] = zip(*result)
+    # Years may carry a footnote reference, e.g. "2013 (38)".
+    year = parse_numbers(df["year"])
+    warn_rejected(year.rejected_cells(), filepath)
+    df["year"], df["footnote"] = year.values, year.footnotes
     df = df.astype({x: "Int64" for x in df.columns})
 
     last_year = df["year"].max()
     last_median_income = df.loc[df["year"] == last_year]["median_current"].values[0]
-    projected_median_income = last_median_income * income_growth_rate
-    projected_median_income_normalized = projected_median_income / inflation_rate
+    projection = project_median_income(
+        last_median_income, last_year, income_growth_rate, inflation_rate, [1]
+    )
+    nominal, real = projection.values[0, 0]
 
     projected = pd.DataFrame(
         [
             {
                 "year": last_year + 1,
-                "median_current": int(projected_median_income),
-                "median_2023": int(projected_median_income_normalized),
+                "median_current": int(nominal),
+                "median_2023": int(real),
             }
         ]
     )
@@ -64,4 +151,6 @@ def process_median_income(
     df = pd.concat([df, projected])
     df.sort_values(by="year", ascending=False, inplace=True)
     df = df.set_index("year")
+    if compact:
+        return compact_frame(df)
     return df
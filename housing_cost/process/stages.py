@@ -0,0 +1,150 @@
+from pathlib import Path
+
+import pandas as pd
+
+from housing_cost.affordability import build_affordability_cube
+from housing_cost.config import LAYOUT_EDITIONS, SPREADSHEET_CACHE_DIR
+from housing_cost.deflator import Deflator
+from housing_cost.process.process_construction_cost import process_construction_cost_2024
+from housing_cost.process.process_cost_breakdown import process_cost_breakdown
+from housing_cost.process.process_cost_history import process_cost_histories
+from housing_cost.process.process_median_income import process_median_income
+
+EDITION = "edition"
+
+
+def _with_edition(df: pd.DataFrame, edition: int | None) -> pd.DataFrame:
+    """Prepend the survey edition to the index, so editions can be stacked.
+
+    An unnamed index, e.g. the positions of a melted frame, is replaced by the edition.
+    """
+    if edition is None:
+        return df
+    if df.index.names == [None]:
+        return df.set_axis(pd.Index([edition] * len(df), name=EDITION))
+    return pd.concat({edition: df}, names=[EDITION])
+
+
+def _check_layout(processor: str, edition: int | None) -> None:
+    """Raise if the processor is not written for the table layout of the edition.
+
+    Raises:
+        ValueError: If the edition is not in the processor's LAYOUT_EDITIONS.
+    """
+    editions = LAYOUT_EDITIONS[processor]
+    if edition is not None and edition not in editions:
+        raise ValueError(
+            f"The {processor} processor only handles the tables of the {editions} editions, "
+            f"not {edition}."
+        )
+
+
+def construction_cost(inputs: list[Path], outputs: list[Path], edition: int | None = None) -> None:
+    """Build the construction cost totals and subtotals from the cost detail table.
+
+    Args:
+        inputs: The values CSV of the cost detail table.
+        outputs: The totals and subtotals CSVs.
+        edition: The survey edition the table is from, added as the first index level.
+    """
+    _check_layout("construction_cost", edition)
+    totals, subtotals = process_construction_cost_2024(inputs[0])
+    _with_edition(totals, edition).to_csv(outputs[0])
+    _with_edition(subtotals, edition).to_csv(outputs[1])
+
+
+def cost_history(
+    inputs: list[Path],
+    outputs: list[Path],
+    target_year: int = 2024,
+    edition: int | None = None,
+    cpi_snapshot: str | None = None,
+) -> None:
+    """Build the cost history from its table parts.
+
+    Args:
+        inputs: The values CSVs of every part of the cost history table.
+        outputs: The percent and USD cost history CSVs.
+        target_year: The year to adjust the dollar values to.
+        edition: The survey edition the tables are from, added as the first index level.
+        cpi_snapshot: The version of the CPI snapshot to adjust with; the latest if None.
+    """
+    df, dfc = process_cost_histories(inputs, target_year, Deflator.load(cpi_snapshot))
+    _with_edition(df, edition).to_csv(outputs[0])
+    _with_edition(dfc, edition).to_csv(outputs[1])
+
+
+def median_income(
+    inputs: list[Path],
+    outputs: list[Path],
+    inflation_rate: float,
+    income_growth_rate: float,
+    cache_dir: str | None = None,
+) -> None:
+    """Build the median income projection from the H-9 table.
+
+    Args:
+        inputs: The H-9 spreadsheet.
+        outputs: The median income CSV.
+        inflation_rate: The yearly inflation rate.
+        income_growth_rate: The yearly income growth rate.
+        cache_dir: Where the parsed spreadsheet is cached; SPREADSHEET_CACHE_DIR if None.
+    """
+    df = process_median_income(
+        inputs[0],
+        inflation_rate,
+        income_growth_rate,
+        Path(cache_dir) if cache_dir else SPREADSHEET_CACHE_DIR,
+    )
+    df.to_csv(outputs[0])
+
+
+def cost_breakdown(
+    inputs: list[Path],
+    outputs: list[Path],
+    edition: int | None = None,
+    cpi_snapshot: str | None = None,
+) -> None:
+    """Build the cost breakdown.
+
+    Args:
+        inputs: The values CSVs of both parts of the cost breakdown table.
+        outputs: The cost breakdown CSV.
+        edition: The survey edition the tables are from, added as the first index level.
+        cpi_snapshot: The version of the CPI snapshot to adjust with; the latest if None.
+    """
+    _check_layout("cost_breakdown", edition)
+    df = process_cost_breakdown(inputs[0], inputs[1], Deflator.load(cpi_snapshot))
+    _with_edition(df, edition).to_csv(outputs[0])
+
+
+def affordability(
+    inputs: list[Path],
+    outputs: list[Path],
+    target_year: int = 2024,
+    cpi_snapshot: str | None = None,
+) -> None:
+    """Materialize the affordability cube of the latest survey edition.
+
+    Args:
+        inputs: The cost breakdown, dollar cost history and median income CSVs.
+        outputs: The affordability cube.
+        target_year: The year to adjust the dollar values to.
+        cpi_snapshot: The version of the CPI snapshot to adjust with; the latest if None.
+    """
+    cost_breakdown, cost_history, median_income = (pd.read_csv(path) for path in inputs)
+    cube = build_affordability_cube(
+        cost_breakdown, cost_history, median_income, Deflator.load(cpi_snapshot), target_year
+    )
+    cube.save(outputs[0])
+
+
+def combine_editions(inputs: list[Path], outputs: list[Path]) -> None:
+    """Stack the outputs of a processor for several survey editions into one file.
+
+    Args:
+        inputs: The CSVs of every edition, written with an edition column.
+        outputs: The combined CSV.
+    """
+    df = pd.concat([pd.read_csv(path) for path in inputs], ignore_index=True)
+    df.to_csv(outputs[0], index=False)
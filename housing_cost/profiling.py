@@ -0,0 +1,241 @@
+from collections import defaultdict
+from contextlib import contextmanager
+import cProfile
+from dataclasses import asdict, dataclass, field
+import functools
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def peak_rss_mb() -> Optional[float]:
+    """The peak resident set size of this process so far, in MiB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+@dataclass
+class Span:
+    """A timed step of a command.
+
+    Attributes:
+        name: What ran, e.g. "upload" or "process_cost_history".
+        category: "command", "stage" or "step".
+        pid: The process it ran in.
+        tid: The thread it ran in.
+        start: When it started, as seconds since the epoch.
+        wall_s: Wall time in seconds.
+        cpu_s: CPU time of the whole process in seconds, so spans running concurrently in
+            threads of the same process include each other's CPU time.
+        peak_rss_mb: The peak resident set size of the process when it ended, in MiB.
+        counters: Amounts processed, e.g. rows and bytes.
+    """
+
+    name: str
+    category: str
+    pid: int
+    tid: int
+    start: float = 0.0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: Optional[float] = None
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, **counters: int) -> None:
+        """Add to the counters of the span, e.g. `span.add(rows=10, bytes=1024)`."""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + int(value)
+
+
+class Profiler:
+    """Records the wall time, CPU time, peak memory and counters of named spans.
+
+    A disabled profiler records nothing, so instrumented code costs next to nothing
+    unless profiling was asked for. With a cProfile directory, every stage span is also
+    run under cProfile and dumped to `<cprofile_dir>/<stage>.prof`. cProfile only sees
+    the thread and process the stage runs in.
+    """
+
+    def __init__(self, enabled: bool = True, cprofile_dir: Optional[Path] = None) -> None:
+        self.enabled = enabled
+        self.cprofile_dir = cprofile_dir
+        self.origin = time.time()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str = "step", **counters: int) -> Iterator[Span]:
+        """Time the body of a `with` block. Counters can be added to the yielded span."""
+        span = Span(name, category, os.getpid(), threading.get_ident())
+        span.add(**counters)
+        if not self.enabled:
+            yield span
+            return
+        span.start = time.time()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        finally:
+            span.wall_s = time.perf_counter() - wall
+            span.cpu_s = time.process_time() - cpu
+            span.peak_rss_mb = peak_rss_mb()
+            with self._lock:
+                self.spans.append(span)
+
+    @contextmanager
+    def stage(self, name: str, **counters: int) -> Iterator[Span]:
+        """A span of the "stage" category, run under cProfile if a directory was given."""
+        with self.span(name, "stage", **counters) as span:
+            if not self.enabled or self.cprofile_dir is None:
+                yield span
+                return
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield span
+            finally:
+                profile.disable()
+                self.cprofile_dir.mkdir(parents=True, exist_ok=True)
+                profile.dump_stats(self.cprofile_dir / f"{name}.prof")
+
+    def extend(self, spans: List[Span]) -> None:
+        """Add spans recorded elsewhere, e.g. in a worker process."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def summary(self) -> "pd.DataFrame":
+        """The count, total times, peak memory and counters of the spans of every name."""
+        import pandas as pd
+
+        totals: Dict[str, Dict[str, Any]] = defaultdict(
+            lambda: {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None}
+        )
+        for span in self.spans:
+            total = totals[span.name]
+            total["category"] = span.category
+            total["count"] += 1
+            total["wall_s"] += span.wall_s
+            total["cpu_s"] += span.cpu_s
+            if span.peak_rss_mb is not None:
+                total["peak_rss_mb"] = max(total["peak_rss_mb"] or 0.0, span.peak_rss_mb)
+            for key, value in span.counters.items():
+                total[key] = total.get(key, 0) + value
+        df = pd.DataFrame.from_dict(totals, orient="index")
+        df.index.name = "name"
+        return df.sort_values("wall_s", ascending=False) if len(df) else df
+
+    def report(self) -> Dict[str, Any]:
+        """The spans and their per-name totals, ready to be written as JSON."""
+        summary = self.summary().reset_index()
+        return {
+            "started": self.origin,
+            "summary": json.loads(summary.to_json(orient="records")),
+            "spans": [asdict(span) for span in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+    def trace_events(self) -> Dict[str, Any]:
+        """The spans as complete events of the Chrome trace event format.
+
+        Open the file in chrome://tracing or https://ui.perfetto.dev.
+        """
+        events = [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - self.origin) * 1e6,
+                "dur": span.wall_s * 1e6,
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": {"cpu_s": span.cpu_s, "peak_rss_mb": span.peak_rss_mb, **span.counters},
+            }
+            for span in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, directory: Path, name: str) -> List[Path]:
+        """Write `<name>.json` with the report and `<name>.trace.json` with the trace."""
+        directory.mkdir(parents=True, exist_ok=True)
+        report_path = directory / f"{name}.json"
+        trace_path = directory / f"{name}.trace.json"
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        with open(trace_path, "w") as f:
+            json.dump(self.trace_events(), f)
+        return [report_path, trace_path]
+
+
+_profiler = Profiler(enabled=False)
+
+
+def get_profiler() -> Profiler:
+    """The profiler spans are recorded with. Disabled unless one was set."""
+    return _profiler
+
+
+def set_profiler(profiler: Profiler) -> None:
+    global _profiler
+    _profiler = profiler
+
+
+def span(name: str, category: str = "step", **counters: int):
+    """Time the body of a `with` block with the current profiler."""
+    return _profiler.span(name, category, **counters)
+
+
+def stage(name: str, **counters: int):
+    """Time a stage with the current profiler."""
+    return _profiler.stage(name, **counters)
+
+
+def _path_arguments(args: Iterable[Any]) -> List[Path]:
+    """The Path arguments, including those in lists, tuples and sets of paths.
+
+    Other iterables, e.g. generators, are not looked into, as that would consume them.
+    """
+    paths: List[Path] = []
+    for arg in args:
+        if isinstance(arg, Path):
+            paths.append(arg)
+        elif isinstance(arg, (list, tuple, set, frozenset)):
+            paths.extend(item for item in arg if isinstance(item, Path))
+    return paths
+
+
+def profiled(func: F) -> F:
+    """Record a span for every call of a function.
+
+    The span counts the bytes of the files passed as Path arguments, alone or in lists,
+    tuples and sets, and the rows of the frames or arrays the function returns.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _profiler.enabled:
+            return func(*args, **kwargs)
+        paths = _path_arguments((*args, *kwargs.values()))
+        with span(func.__name__) as s:
+            s.add(bytes=sum(path.stat().st_size for path in paths if path.exists()))
+            result = func(*args, **kwargs)
+            frames = result if isinstance(result, tuple) else (result,)
+            s.add(rows=sum(len(frame) for frame in frames if hasattr(frame, "shape")))
+        return result
+
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,85 @@
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from housing_cost.config import SPREADSHEET_CACHE_DIR
+from housing_cost.files import file_sha256
+
+# Bump when the layout of the sidecars changes, so older ones are not read.
+SIDECAR_VERSION = 1
+_COLUMNS_KEY = b"housing_cost.columns"
+
+
+def excel_engine() -> Optional[str]:
+    """The calamine engine if python-calamine is installed, else pandas' default."""
+    if importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return None
+
+
+def sidecar_key(path: Path, engine: Optional[str] = None, **read_kwargs: Any) -> str:
+    """The cache key of a spreadsheet region.
+
+    It covers the file contents, the reader parameters and the engine, as engines may
+    type cells differently.
+    """
+    params = json.dumps(
+        {"version": SIDECAR_VERSION, "engine": engine, "read": read_kwargs},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(f"{file_sha256(path)}|{params}".encode()).hexdigest()
+
+
+def read_spreadsheet(
+    path: Path, cache_dir: Path = SPREADSHEET_CACHE_DIR, **read_kwargs: Any
+) -> pd.DataFrame:
+    """Read a region of a spreadsheet through a cached Parquet sidecar.
+
+    The first read of a file and region (the `pd.read_excel` keyword arguments, e.g.
+    skiprows, header and nrows) parses the spreadsheet and writes the frame to
+    `<cache_dir>/<key>.parquet`. Later reads are served from the sidecar. Every read
+    returns the frame as loaded from the sidecar, so the first read and later ones give
+    the same types: columns mixing numbers and text are stored as text.
+    """
+    engine = excel_engine()
+    sidecar = cache_dir / f"{sidecar_key(path, engine, **read_kwargs)}.parquet"
+    if not sidecar.exists():
+        df = pd.read_excel(path, engine=engine, **read_kwargs)
+        _write_sidecar(df, sidecar)
+    return _read_sidecar(sidecar)
+
+
+def _write_sidecar(df: pd.DataFrame, path: Path) -> None:
+    """Write a frame with positional column names, keeping its labels in the metadata."""
+    labels = [list(label) if isinstance(label, tuple) else label for label in df.columns]
+    columns = {}
+    for i, name in enumerate(df.columns):
+        column = df[name]
+        if column.dtype == object and pd.api.types.infer_dtype(column) != "string":
+            column = column.astype("string")
+        columns[str(i)] = column.reset_index(drop=True)
+    table = pa.Table.from_pandas(pd.DataFrame(columns), preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), _COLUMNS_KEY: json.dumps(labels).encode()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read_sidecar(path: Path) -> pd.DataFrame:
+    table = pq.read_table(path)
+    labels = json.loads(table.schema.metadata[_COLUMNS_KEY])
+    df = table.to_pandas()
+    if labels and all(isinstance(label, list) for label in labels):
+        df.columns = pd.MultiIndex.from_tuples([tuple(label) for label in labels])
+    else:
+        df.columns = pd.Index(labels)
+    return df
@@ -0,0 +1,235 @@
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+import random
+from typing import List
+
+from housing_cost.config import EDITIONS
+
+# The main categories of the cost detail and cost breakdown tables.
+CATEGORIES = [
+    "I. Site Work",
+    "II. Foundations",
+    "III. Framing",
+    "IV. Exterior Finishes",
+    "V. Major Systems Rough-ins",
+    "VI. Interior Finishes",
+    "VII. Final Steps",
+    "VIII. Other",
+]
+
+# The cost breakdown processor only keeps the survey years it has totals for.
+BREAKDOWN_YEARS = [1998, 2002, 2004, 2007, 2009, 2011, 2013, 2015, 2017, 2019, 2022, 2024]
+
+# The first year with CPI data, which the cost history processor adjusts with.
+FIRST_CPI_YEAR = 1913
+
+H9_FILENAME = "Table H-9 - All Households Income.xlsx"
+
+
+@dataclass
+class SurveyShape:
+    """The size of a synthetic survey.
+
+    Attributes:
+        regions: Regions or metros; every one repeats the line items of the cost tables.
+        items: Line items per category.
+        years: Survey years of the cost history and median income tables. The cost
+            breakdown has at most one column per year in BREAKDOWN_YEARS.
+        seed: Seed of the random values and formatting.
+    """
+
+    regions: int = 1
+    items: int = 5
+    years: int = 14
+    seed: int = 0
+
+
+def _letters(index: int) -> str:
+    """Item letters as in the survey: A to Z, then AA, AB..."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _metro(region: int, shape: SurveyShape) -> str:
+    return "" if shape.regions == 1 else f" - Metro {region + 1}"
+
+
+def _category_name(category: int, region: int, shape: SurveyShape) -> str:
+    last = _letters(shape.items - 1)
+    return f"{CATEGORIES[category]}{_metro(region, shape)} (sum of A to {last})"
+
+
+def _item_name(category: int, index: int, region: int, shape: SurveyShape) -> str:
+    """Item names are unique, as the cost breakdown processor labels rows by name."""
+    return f"{_letters(index)}. Item {category + 1}.{index + 1}{_metro(region, shape)}"
+
+
+def _usd(value: int, rng: random.Random) -> str:
+    """A dollar amount as the PDF parser writes it, with or without a space after the $."""
+    return rng.choice(["${:,}", "$ {:,}", "{:,}"]).format(value)
+
+
+def _percent(value: float, rng: random.Random) -> str:
+    return f"{value:.{rng.choice([1, 1, 2])}f}%"
+
+
+def _pad(text: str, rng: random.Random) -> str:
+    """Trailing whitespace, as the parser leaves after the last word of a cell."""
+    return text + " " * rng.choice([0, 0, 1, 2])
+
+
+def _write_rows(path: Path, rows: List[List[str]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator="\n").writerows(rows)
+
+
+def write_construction_cost(path: Path, shape: SurveyShape) -> None:
+    """The cost detail table read by `process_construction_cost_2024`.
+
+    Every region lists the categories, each followed by its line items; a total closes
+    the table. Columns: name, cost in USD and share of the total.
+    """
+    rng = random.Random(shape.seed)
+    rows = [["", "Average Cost", "Share of Construction Cost"]]
+    for region in range(shape.regions):
+        for category in range(len(CATEGORIES)):
+            costs = [rng.randrange(500, 25_000) for _ in range(shape.items)]
+            rows.append(
+                [
+                    _pad(_category_name(category, region, shape), rng),
+                    _usd(sum(costs), rng),
+                    _pad(_percent(rng.uniform(1, 30), rng), rng),
+                ]
+            )
+            for index, cost in enumerate(costs):
+                rows.append(
+                    [
+                        _pad(_item_name(category, index, region, shape), rng),
+                        _usd(cost, rng),
+                        _pad(_percent(rng.uniform(0, 5), rng), rng),
+                    ]
+                )
+    rows.append(["Total", _usd(rng.randrange(300_000, 600_000), rng), "100.0%"])
+    _write_rows(path, rows)
+
+
+def write_cost_history(paths: List[Path], shape: SurveyShape, last_year: int) -> None:
+    """The cost history table read by `process_cost_history`, split across `paths`.
+
+    The years up to `last_year` are divided between the parts, and every part lists the
+    share of every cost per year, with the total sales price last.
+    """
+    rng = random.Random(shape.seed)
+    first_year = max(FIRST_CPI_YEAR, last_year - shape.years + 1)
+    years = list(range(first_year, last_year + 1))
+    costs = [
+        f"{i + 1}. Cost {i + 1:04d}{_metro(region, shape)}"
+        for region in range(shape.regions)
+        for i in range(shape.items)
+    ]
+    part_size = -(-len(years) // len(paths))
+    for part, path in enumerate(paths):
+        part_years = years[part * part_size : (part + 1) * part_size]
+        rows = [["", *(str(year) for year in part_years)]]
+        for cost in costs:
+            rows.append(
+                [_pad(cost, rng), *(_percent(rng.uniform(0, 60), rng) for _ in part_years)]
+            )
+        rows.append(
+            [
+                "Total Sales Price ($)",
+                *(_usd(rng.randrange(150_000, 700_000), rng) for _ in part_years),
+            ]
+        )
+        _write_rows(path, rows)
+
+
+def write_cost_breakdown(paths: List[Path], shape: SurveyShape) -> None:
+    """The cost breakdown table read by `process_cost_breakdown`, split across `paths`.
+
+    The categories and their line items are divided between the parts; every part has
+    a column per survey year.
+    """
+    rng = random.Random(shape.seed)
+    years = BREAKDOWN_YEARS[-min(shape.years, len(BREAKDOWN_YEARS)) :]
+    names = []
+    for region in range(shape.regions):
+        for category in range(len(CATEGORIES)):
+            names.append(_category_name(category, region, shape))
+            names += [_item_name(category, i, region, shape) for i in range(shape.items)]
+    names.append("Total")
+    part_size = -(-len(names) // len(paths))
+    for part, path in enumerate(paths):
+        rows = [["", *(str(year) for year in years)]]
+        for name in names[part * part_size : (part + 1) * part_size]:
+            rows.append([_pad(name, rng), *(_percent(rng.uniform(0, 20), rng) for _ in years)])
+        _write_rows(path, rows)
+
+
+def write_median_income(path: Path, shape: SurveyShape, last_year: int) -> None:
+    """An H-9 shaped spreadsheet read by `process_median_income`.
+
+    Seven title rows and a two row header precede one row per year, latest first. Some
+    years carry a footnote, e.g. "2013 (38)".
+    """
+    import pandas as pd
+
+    rng = random.Random(shape.seed)
+    header = [
+        ["Year", "Number (thousands)", "Median income", None, "Mean income", None],
+        [None, None, "Current dollars", "2023 dollars", "Current dollars", "2023 dollars"],
+    ]
+    data = []
+    for i in range(shape.years):
+        year = last_year - i
+        median = rng.randrange(30_000, 90_000)
+        mean = median + rng.randrange(10_000, 30_000)
+        data.append(
+            [
+                f"{year} ({rng.randrange(30, 40)})" if rng.random() < 0.1 else year,
+                rng.randrange(60_000, 130_000),
+                median,
+                int(median * 1.3),
+                mean,
+                int(mean * 1.3),
+            ]
+        )
+    title = [["Table H-9. Synthetic households by median and mean income"]] + [[None]] * 6
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(title + header + data).to_excel(path, header=False, index=False)
+
+
+def write_survey(output_dir: Path, shape: SurveyShape, edition: int = 2024) -> List[Path]:
+    """Write a synthetic survey edition as the parse and download commands would.
+
+    The value tables land in `<output_dir>/interim` under the names of the edition's
+    tables in EDITIONS, and the H-9 spreadsheet in `<output_dir>/raw`. Returns the
+    paths written.
+    """
+    tables = EDITIONS[edition]
+    if not tables:
+        raise ValueError(f"The table numbers of the {edition} edition are not known.")
+
+    def table_paths(processor: str) -> List[Path]:
+        stem = f"NABH Construction Cost - {edition}"
+        return [
+            output_dir / "interim" / f"{stem}__table_{number}__values.csv"
+            for number in tables[processor]
+        ]
+
+    construction_cost = table_paths("construction_cost")
+    cost_history = table_paths("cost_history")
+    cost_breakdown = table_paths("cost_breakdown")
+    median_income = output_dir / "raw" / H9_FILENAME
+
+    write_construction_cost(construction_cost[0], shape)
+    write_cost_history(cost_history, shape, edition)
+    write_cost_breakdown(cost_breakdown, shape)
+    write_median_income(median_income, shape, edition)
+    return [*construction_cost, *cost_history, *cost_breakdown, median_income]
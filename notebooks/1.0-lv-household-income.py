@@ -1,10 +1,15 @@
 # %%
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
 from housing_cost.config import RAW_DATA_DIR
-from housing_cost.process.process_median_income import process_median_income
+from housing_cost.process.process_median_income import (
+    process_median_income,
+    project_median_income,
+    rate_grid,
+)
 
 pd.set_option("display.max_columns", None)
 pd.set_option("display.width", None)
@@ -33,3 +38,16 @@ ax.axvline(2020, color="gray", linestyle="-", alpha=0.25)
 ax.axvline(last_year, color="black", linestyle="-.", alpha=0.5)
 ax.set_title(f"Median Income (1998 - {last_year})")
 plt.show()
+
+# %%
+# Project the latest median income over 30 years for every combination of 0% to 8%
+# income growth and 1% to 6% inflation.
+last_year = df.index.max() - 1
+growth, inflation = rate_grid(np.linspace(1.0, 1.08, 81), np.linspace(1.01, 1.06, 51))
+projection = project_median_income(
+    df.loc[last_year, "median_current"], last_year, growth, inflation, np.arange(1, 31)
+)
+projections = projection.to_frame()
+projections[projections["year"] == last_year + 30].pivot(
+    index="income_growth_rate", columns="inflation_rate", values="real"
+)
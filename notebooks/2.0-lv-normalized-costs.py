@@ -2,18 +2,16 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 
-from housing_cost.config import COST_HISTORY_USD, MEDIAN_INCOME
+from housing_cost.affordability import AffordabilityCube
 
 pd.set_option("display.width", None)
 pd.set_option("display.max_columns", None)
 pd.set_option("display.expand_frame_repr", None)
 
-df = pd.read_csv(COST_HISTORY_USD)
-df.set_index("year", inplace=True)
-df_income = pd.read_csv(MEDIAN_INCOME)
-df_income.set_index("year", inplace=True)
-
-df_norm = df.copy().div(df_income["median_current"].reindex(df.index), axis=0)
+# Built by the affordability stage of `python housing_cost/dataset.py process`.
+cube = AffordabilityCube.load()
+df = cube.category_totals("usd", "cost_history").dropna(how="all")
+df_norm = cube.category_totals("income_multiple", "cost_history").dropna(how="all")
 df_norm.plot.line()
 plt.show()
 
@@ -71,3 +69,14 @@ ax = df_all["Overhead and General Expenses"].dropna().plot.line()
 ax.set_title("Overhead and General Expenses")
 plt.show()
 # %%
+# Construction cost per square foot of house, and site work per square foot of lot.
+df_sqft = cube.category_totals("usd_per_sqft", "cost_breakdown").dropna(how="all")
+ax = df_sqft.plot.line()
+ax.set_title("Construction Cost per Square Foot")
+plt.legend(bbox_to_anchor=(1.05, 1), loc="upper left")
+plt.show()
+
+ax = cube.category_totals("usd_per_lot_sqft", "cost_breakdown")["Site Work"].dropna().plot.line()
+ax.set_title("Site Work per Square Foot of Lot")
+plt.show()
+# %%
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from housing_cost.affordability import MEASURES, SOURCES, AffordabilityCube
+
+YEARS = [2000, 2001]
+CATEGORIES = ["Site Work", "Finished Lot", "Framing"]
+SUBCATEGORIES = ["Site Work", "Grading", "Finished Lot"]
+
+
+@pytest.fixture
+def cube() -> AffordabilityCube:
+    values = np.arange(2 * 3 * 3 * len(MEASURES), dtype=float).reshape(2, 3, 3, -1)
+    # Framing has no total of its own.
+    sources = [SOURCES[0], SOURCES[1], SOURCES[0]]
+    return AffordabilityCube(values, YEARS, CATEGORIES, SUBCATEGORIES, sources)
+
+
+def test_query(cube: AffordabilityCube):
+    assert cube.query(2001, "Site Work", "Grading", "usd") == cube.values[1, 0, 1, 0]
+
+    by_year = cube.query(category="Site Work", measure="usd")
+    assert by_year.shape == (2, 3)
+    np.testing.assert_array_equal(by_year, cube.values[:, 0, :, 0])
+
+    picked = cube.query(
+        year=[2001, 2000], category="Finished Lot", measure=["usd", "usd_adjusted"]
+    )
+    np.testing.assert_array_equal(picked, cube.values[[1, 0], 1][:, :, [0, 1]])
+
+    with pytest.raises(KeyError, match="year"):
+        cube.query(year=1999)
+
+
+def test_category_totals(cube: AffordabilityCube):
+    totals = cube.category_totals("income_multiple")
+
+    assert totals.index.tolist() == YEARS
+    assert totals.columns.tolist() == ["Site Work", "Finished Lot"]
+    np.testing.assert_array_equal(totals["Site Work"], cube.values[:, 0, 0, 2])
+    np.testing.assert_array_equal(totals["Finished Lot"], cube.values[:, 1, 2, 2])
+
+    history = cube.category_totals("usd", source="cost_history")
+    assert history.columns.tolist() == ["Finished Lot"]
+
+
+def test_save_and_load(cube: AffordabilityCube, tmp_path: Path):
+    path = tmp_path / "cube.npz"
+    cube.save(path)
+    loaded = AffordabilityCube.load(path)
+
+    np.testing.assert_array_equal(loaded.values, cube.values)
+    assert loaded.query(2000, "Site Work", "Grading", "usd") == cube.values[0, 0, 1, 0]
+    assert (loaded.years, loaded.categories, loaded.sources) == (
+        cube.years,
+        cube.categories,
+        cube.sources,
+    )
@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from housing_cost.benchmark import (
+    CLI_MODULES,
+    IMPORT_BUDGET_MS,
+    app,
+    benchmark_cases,
+    time_import,
+)
+
+runner = CliRunner()
+
+
+def test_cli_modules_import_no_heavy_modules():
+    for module in CLI_MODULES:
+        assert time_import(module, repeats=1).heavy == [], module
+
+
+def test_imports_check():
+    # Import times swing with the load of the machine, so the test only catches imports
+    # far over the budget; `imports` with the default budget is the precise check.
+    result = runner.invoke(app, ["imports", "--budget-ms", str(2 * IMPORT_BUDGET_MS)])
+    assert result.exit_code == 0, result.output
+
+
+def test_run_fails_without_baseline(tmp_path: Path):
+    result = runner.invoke(app, ["run", "--quick", "--baseline", str(tmp_path / "none.json")])
+    assert result.exit_code == 1
+
+
+def test_quick_suite_against_its_baseline(tmp_path: Path):
+    baseline = tmp_path / "baseline.json"
+    result = runner.invoke(
+        app, ["run", "--quick", "--repeats", "1", "--baseline", str(baseline), "--save-baseline"]
+    )
+    assert result.exit_code == 0, result.output
+    saved = json.loads(baseline.read_text())["results"]
+    assert len(saved) == len(benchmark_cases(quick=True))
+
+    # Only the gate is checked here, so a slower rerun on a busy machine still passes.
+    args = ["run", "--quick", "--match", "query", "--baseline", str(baseline)]
+    result = runner.invoke(app, [*args, "--tolerance", "0.99"])
+    assert result.exit_code == 0, result.output
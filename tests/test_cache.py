@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from housing_cost.pdf.cache import TextractCache
+
+BLOCKS = [{"Id": "1", "BlockType": "PAGE"}, {"Id": "2", "BlockType": "LINE", "Text": "$1,200"}]
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> TextractCache:
+    return TextractCache(tmp_path / "cache")
+
+
+def test_key_depends_on_content_features_and_pages(tmp_path: Path):
+    pdf = tmp_path / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.7 a")
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(b"%PDF-1.7 a")
+    key = TextractCache.key(pdf, ["TABLES", "FORMS"])
+
+    assert TextractCache.key(copy, ["FORMS", "TABLES"]) == key
+    assert TextractCache.key(pdf, ["TABLES"]) != key
+    assert TextractCache.key(pdf, ["TABLES", "FORMS"], pages=[1, 2]) != key
+    pdf.write_bytes(b"%PDF-1.7 b")
+    assert TextractCache.key(pdf, ["TABLES", "FORMS"]) != key
+
+
+def test_hit_and_miss(cache: TextractCache):
+    assert cache.get("key") is None
+    assert not cache.contains("key")
+
+    cache.put("key", BLOCKS)
+
+    assert cache.contains("key")
+    assert cache.get("key") == BLOCKS
+    assert list(cache.iter_blocks("key")) == BLOCKS
+
+
+def test_failed_write_stores_nothing(cache: TextractCache):
+    with pytest.raises(RuntimeError):
+        with cache.writer("key") as write:
+            write(BLOCKS)
+            raise RuntimeError
+
+    assert cache.get("key") is None
+    assert list(cache.directory.iterdir()) == []
+
+
+def test_corrupt_entry_is_discarded(cache: TextractCache):
+    cache.put("key", BLOCKS)
+    cache.entries()[0].path.write_bytes(b"not gzip")
+
+    assert cache.get("key") is None
+    assert not cache.contains("key")
+
+
+def test_prune_evicts_least_recently_used(cache: TextractCache):
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, BLOCKS)
+        os.utime(cache.entries()[-1].path, (i, i))
+    assert [entry.key for entry in cache.entries()] == ["a", "b", "c"]
+
+    cache.get("a")
+    size = cache.entries()[0].size
+    evicted = cache.prune(max_bytes=2 * size)
+
+    assert [entry.key for entry in evicted] == ["b"]
+    assert [entry.key for entry in cache.entries()] == ["c", "a"]
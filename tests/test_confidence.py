@@ -0,0 +1,24 @@
+import numpy as np
+
+from housing_cost.pdf.confidence import ConfidenceCollector, confidence_matrix
+
+ROWS = [
+    (["a", "b", "c"], ["99.5", "80", "70.25"]),
+    (["d"], ["50"]),
+    (["e", "f"], ["", ""]),
+]
+
+
+def test_collector_streams_rows():
+    collector = ConfidenceCollector()
+    seen = []
+    for row in collector.observe(iter(ROWS)):
+        seen.append(row)
+        assert len(collector.matrix()) == len(seen)
+
+    assert seen == ROWS
+    expected = np.array(
+        [[99.5, 80, 70.25], [50, np.nan, np.nan], [np.nan, np.nan, np.nan]], dtype=np.float32
+    )
+    np.testing.assert_array_equal(collector.matrix(), expected)
+    np.testing.assert_array_equal(confidence_matrix(ROWS), expected)
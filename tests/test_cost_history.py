@@ -0,0 +1,80 @@
+from pathlib import Path
+import re
+
+import numpy as np
+import pandas as pd
+
+from housing_cost.deflator import FIRST_YEAR, Deflator
+from housing_cost.parsing import parse_frame
+from housing_cost.process.process_cost_history import process_cost_histories
+
+TABLES = {
+    2022: [
+        ["", "2015", "2019", "2022"],
+        ["1. Finished Lot", "18.6%", "21.0%", "18.2%"],
+        ["2. Construction Cost", "61.8%", "56.0%", "60.8%"],
+        ["3. Financing Cost", "1.7%", "2.0%", "1.8%"],
+        ["4. Overhead & General Expenses", "4.3%", "5.1%", "5.1%"],
+        ["Total Sales Price ($)", "$399,532", "$427,892", "$ 485,128"],
+    ],
+    2024: [
+        ["", "2019", "2022", "2024"],
+        ["1. Finished Lot", "21.0%", "18.2%", "13.7%"],
+        ["2. Construction Cost", "56.0%", "60.8%", "64.4%"],
+        ["3. Marketing Cost", "1.3%", "0.9%", "1.2%"],
+        ["Total Sales Price ($)", "$427,892", "$485,128", "$665,298"],
+    ],
+}
+
+
+def deflator() -> Deflator:
+    annual = np.linspace(10.0, 320.0, 2024 - FIRST_YEAR + 1)
+    return Deflator(annual[np.newaxis], np.repeat(annual, 12)[np.newaxis], ["cpi_u"])
+
+
+def process_one_table(path: Path, deflator: Deflator) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """process_cost_history as it was before tables were processed together."""
+
+    def clean_name(name: str) -> str:
+        name = name.strip()
+        match = re.match(r"^\d+\.\s*(.*)$", name)
+        if match:
+            name = match.group(1).strip()
+        return name
+
+    df = pd.read_csv(path)
+    df.columns = pd.Index(["category", *df.columns[1:]])
+    df["category"] = df["category"].apply(clean_name)
+    df = df.melt(id_vars=["category"], var_name="year", value_name="value")
+    df = df.pivot(columns="category", index="year", values="value")
+    df, _ = parse_frame(df)
+    df["percent_total"] = df[df.columns[:-1]].sum(axis=1)
+
+    dfc = df.copy()
+    for col in dfc.columns[:-2]:
+        dfc[col] = (dfc[col] / dfc["percent_total"]) * dfc["Total Sales Price ($)"]
+    dfc = dfc.round(0).astype(int)
+    dfc = dfc.drop(columns=["percent_total", "Total Sales Price ($)"])
+    dfc = dfc[dfc.mean().sort_values(ascending=False).index]
+    df = df.reset_index().melt(id_vars=["year"], var_name="category", value_name="percent")
+    dfc = dfc.reset_index().melt(id_vars=["year"], var_name="category", value_name="usd")
+    dfc["usd_adjusted"] = deflator.adjust(dfc["usd"], dfc["year"], 2024)
+    return df, dfc
+
+
+def test_tables_processed_together_match_one_by_one(tmp_path: Path):
+    paths = []
+    for edition, rows in TABLES.items():
+        paths.append(tmp_path / f"{edition}.csv")
+        pd.DataFrame(rows[1:], columns=rows[0]).to_csv(paths[-1], index=False)
+
+    df, dfc = process_cost_histories(paths, 2024, deflator(), editions=list(TABLES))
+
+    expected = [process_one_table(path, deflator()) for path in paths]
+    for result, frames in [(df, [e[0] for e in expected]), (dfc, [e[1] for e in expected])]:
+        frames = [frame.assign(edition=e) for frame, e in zip(frames, TABLES)]
+        frame = pd.concat(frames, ignore_index=True)
+        frame = frame.astype({"year": np.int64})[result.columns]
+        pd.testing.assert_frame_equal(
+            result.astype({"year": np.int64}), frame, check_dtype=False, check_exact=False
+        )
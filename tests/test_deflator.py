@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from typer.testing import CliRunner
+
+from housing_cost import dataset
+from housing_cost.deflator import FIRST_YEAR, Deflator
+
+runner = CliRunner()
+
+
+def write_snapshot(directory: Path, version: str, annual: np.ndarray) -> None:
+    """A snapshot of one variant in the layout written by `write_cpi_snapshot`."""
+    path = directory / version
+    path.mkdir(parents=True)
+    np.save(path / "annual.npy", annual[np.newaxis])
+    np.save(path / "monthly.npy", np.repeat(annual, 12)[np.newaxis])
+    meta = {"version": version, "first_year": FIRST_YEAR, "variants": {"cpi_u": "CUUR0000SA0"}}
+    (path / "meta.json").write_text(json.dumps(meta))
+
+
+@pytest.fixture
+def deflator(tmp_path: Path) -> Deflator:
+    # The CPI doubles in the second year and is unknown in the third.
+    write_snapshot(tmp_path, "v1", np.array([100.0, 200.0, np.nan]))
+    return Deflator.load(directory=tmp_path)
+
+
+def test_adjust(deflator: Deflator):
+    years = np.array([FIRST_YEAR, FIRST_YEAR + 1])
+    adjusted = deflator.adjust([10, 10], years, target_year=FIRST_YEAR + 1)
+    np.testing.assert_allclose(adjusted, [20, 10])
+
+    adjusted = deflator.adjust(10, FIRST_YEAR + 1, FIRST_YEAR, months=[6], target_month=1)
+    np.testing.assert_allclose(adjusted, [5])
+
+
+def test_adjust_rejects_unknown_periods(deflator: Deflator):
+    for year in [FIRST_YEAR - 1, FIRST_YEAR + 2, FIRST_YEAR + 3]:
+        with pytest.raises(ValueError, match=str(year)):
+            deflator.adjust([10], [year], FIRST_YEAR)
+    with pytest.raises(ValueError, match="variant"):
+        deflator.adjust([10], [FIRST_YEAR], FIRST_YEAR, variant="core")
+
+
+def test_load_missing_snapshot(tmp_path: Path):
+    with pytest.raises(FileNotFoundError, match="snapshot-cpi"):
+        Deflator.load(directory=tmp_path)
+    write_snapshot(tmp_path, "v1", np.array([100.0]))
+    with pytest.raises(FileNotFoundError, match="v2"):
+        Deflator.load("v2", directory=tmp_path)
+
+
+def test_process_needs_a_snapshot(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(dataset, "CPI_SNAPSHOT_DIR", tmp_path)
+    result = runner.invoke(dataset.app, ["process", "--data-dir", str(tmp_path)])
+    assert result.exit_code == 1
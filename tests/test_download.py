@@ -0,0 +1,125 @@
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import threading
+from typing import Dict, List
+
+import pytest
+
+from housing_cost.download import PART_SUFFIX, DownloadManifest, download_files
+
+BODY = bytes(range(256)) * 400
+ETAG = '"v1"'
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Serves `server.body` with an ETag, conditional requests and byte ranges."""
+
+    def do_GET(self) -> None:
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body, etag = server.body, server.etag
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        status, start = 200, 0
+        byte_range = self.headers.get("Range")
+        if byte_range and self.headers.get("If-Range") == etag:
+            status, start = 206, int(byte_range.removeprefix("bytes=").rstrip("-"))
+        payload = body[start:]
+        if server.gzip:
+            payload = gzip.compress(payload)
+        length = len(payload) + server.missing_bytes
+
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(length))
+        if server.gzip:
+            self.send_header("Content-Encoding", "gzip")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    httpd.body, httpd.etag, httpd.gzip, httpd.missing_bytes = BODY, ETAG, False, 0
+    httpd.requests: List[Dict[str, str]] = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def download(server, tmp_path: Path):
+    url = f"http://127.0.0.1:{server.server_address[1]}/survey.pdf"
+    manifest = tmp_path / "manifest.json"
+    (result,) = download_files({"survey.pdf": url}, tmp_path, manifest, max_workers=1)
+    return result
+
+
+def test_download_then_unchanged(server, tmp_path: Path):
+    assert download(server, tmp_path).status == "downloaded"
+    assert (tmp_path / "survey.pdf").read_bytes() == BODY
+
+    assert download(server, tmp_path).status == "unchanged"
+    assert server.requests[-1]["If-None-Match"] == ETAG
+
+
+def test_gzip_encoded_response(server, tmp_path: Path):
+    server.gzip = True
+    assert download(server, tmp_path).status == "downloaded"
+    assert (tmp_path / "survey.pdf").read_bytes() == BODY
+
+
+def test_truncated_response_fails(server, tmp_path: Path):
+    server.missing_bytes = 10
+    assert download(server, tmp_path).status == "failed"
+    assert not (tmp_path / "survey.pdf").exists()
+
+
+def write_part(tmp_path: Path, server, size: int, etag: str) -> None:
+    url = f"http://127.0.0.1:{server.server_address[1]}/survey.pdf"
+    (tmp_path / ("survey.pdf" + PART_SUFFIX)).write_bytes(BODY[:size])
+    info = {"url": url, "etag": etag, "last_modified": None}
+    (tmp_path / ("survey.pdf" + PART_SUFFIX + ".json")).write_text(json.dumps(info))
+
+
+def test_resume_with_if_range(server, tmp_path: Path):
+    write_part(tmp_path, server, 1000, ETAG)
+
+    result = download(server, tmp_path)
+    assert result.status == "resumed"
+    assert result.bytes_received == len(BODY) - 1000
+    assert server.requests[-1]["Range"] == "bytes=1000-"
+    assert server.requests[-1]["If-Range"] == ETAG
+    assert (tmp_path / "survey.pdf").read_bytes() == BODY
+    assert not (tmp_path / ("survey.pdf" + PART_SUFFIX)).exists()
+
+
+def test_part_of_another_version_is_downloaded_again(server, tmp_path: Path):
+    write_part(tmp_path, server, 1000, '"v0"')
+
+    assert download(server, tmp_path).status == "downloaded"
+    assert (tmp_path / "survey.pdf").read_bytes() == BODY
+
+
+def test_checksum_mismatch_is_downloaded_again(server, tmp_path: Path):
+    download(server, tmp_path)
+    path = tmp_path / "survey.pdf"
+    path.write_bytes(bytes(len(BODY)))  # Same size, other contents and mtime.
+
+    assert download(server, tmp_path).status == "downloaded"
+    assert "If-None-Match" not in server.requests[-1]
+    assert path.read_bytes() == BODY
+    entry = DownloadManifest(tmp_path / "manifest.json").get("survey.pdf")
+    assert entry is not None and entry.size == len(BODY)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from housing_cost.parsing import parse_frame, parse_numbers
+
+CELLS = {
+    '"$1,234.50"': (1234.5, "usd"),
+    "(12.5%)": (-12.5, "percent"),
+    "($ 1,000)": (-1000.0, "usd"),
+    "$(7)": (-7.0, "usd"),
+    "-3": (-3.0, "number"),
+    ".5": (0.5, "number"),
+    "12,345\n": (12345.0, "number"),
+    "2013 (38)": (2013.0, "number"),
+    "45% (2)": (45.0, "percent"),
+}
+
+
+def test_numbers():
+    parsed = parse_numbers(pd.Series(list(CELLS), index=range(10, 10 + len(CELLS))))
+
+    values, units = zip(*CELLS.values())
+    np.testing.assert_array_equal(parsed.values.to_numpy(), values)
+    assert parsed.units.tolist() == list(units)
+    assert parsed.footnotes.tolist() == [pd.NA] * 7 + [38, 2]
+    assert list(parsed.values.index) == list(parsed.text.index)
+    assert not parsed.rejected.any()
+
+
+def test_blank_and_rejected_cells():
+    text = pd.Series(["", " ", None, np.nan, "n/a", "$", "1.2.3", "()", "12 (a)"])
+    parsed = parse_numbers(text)
+
+    assert parsed.values.isna().all()
+    assert parsed.units.isna().all()
+    assert parsed.footnotes.isna().all()
+    assert parsed.rejected_cells().tolist() == ["n/a", "$", "1.2.3", "()", "12 (a)"]
+
+
+def test_mixed_column():
+    parsed = parse_numbers(pd.Series([1, 2.5, "$3"], dtype=object))
+
+    np.testing.assert_array_equal(parsed.values.to_numpy(), [1, 2.5, 3])
+    assert parsed.units.tolist() == ["number", "number", "usd"]
+
+
+def test_parse_frame():
+    df = pd.DataFrame({"a": ["$1", "x"], "b": ["", "(2%)"]}, index=[5, 6])
+    values, rejected = parse_frame(df)
+
+    expected = pd.DataFrame({"a": [1.0, np.nan], "b": [np.nan, -2.0]}, index=[5, 6])
+    pd.testing.assert_frame_equal(values, expected)
+    assert rejected.to_dict("records") == [{"row": 6, "column": "a", "text": "x"}]
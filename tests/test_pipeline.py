@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from housing_cost.pipeline import Pipeline, Stage
+
+
+def append(inputs: List[Path], outputs: List[Path], suffix: str) -> None:
+    """Write the first input with a suffix. Runs in a worker forked from the test."""
+    text = inputs[0].read_text()
+    if text.startswith("fail"):
+        raise ValueError(text)
+    outputs[0].write_text(text + suffix)
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> Dict[str, Path]:
+    paths = {name: tmp_path / f"{name}.txt" for name in ["raw", "interim", "processed"]}
+    paths["raw"].write_text("a")
+    return paths
+
+
+def pipeline(files: Dict[str, Path], suffix: str = "c") -> Pipeline:
+    stages = [
+        # Listed out of order; the graph comes from the files.
+        Stage(
+            "second",
+            f"{__name__}:append",
+            [files["interim"]],
+            [files["processed"]],
+            {"suffix": suffix},
+        ),
+        Stage("first", f"{__name__}:append", [files["raw"]], [files["interim"]], {"suffix": "b"}),
+    ]
+    return Pipeline(stages, files["raw"].parent / "state.json")
+
+
+def statuses(files: Dict[str, Path], suffix: str = "c") -> Dict[str, str]:
+    results = pipeline(files, suffix).run(max_workers=1)
+    return {name: result.status for name, result in sorted(results.items())}
+
+
+def test_unchanged_stages_are_skipped(files: Dict[str, Path]):
+    assert statuses(files) == {"first": "built", "second": "built"}
+    assert files["processed"].read_text() == "abc"
+
+    assert statuses(files) == {"first": "skipped", "second": "skipped"}
+
+
+def test_changes_rebuild_the_stages_they_affect(files: Dict[str, Path]):
+    statuses(files)
+
+    assert statuses(files, suffix="d") == {"first": "skipped", "second": "built"}
+    assert files["processed"].read_text() == "abd"
+
+    files["processed"].unlink()
+    assert statuses(files, suffix="d") == {"first": "skipped", "second": "built"}
+
+    files["raw"].write_text("x")
+    assert statuses(files, suffix="d") == {"first": "built", "second": "built"}
+    assert files["processed"].read_text() == "xbd"
+
+    # Stages are rebuilt on changed contents, not modification times.
+    files["raw"].write_text("x")
+    assert statuses(files, suffix="d") == {"first": "skipped", "second": "skipped"}
+
+
+def test_failures_stop_dependent_stages(files: Dict[str, Path]):
+    files["raw"].write_text("fail")
+    results = pipeline(files).run(max_workers=1)
+
+    assert results["first"].status == "failed"
+    assert results["second"].status == "failed"
+    assert results["second"].error == "dependency first failed"
+    assert statuses(files) == {"first": "failed", "second": "failed"}
+
+
+def test_cycles_are_rejected(tmp_path: Path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    stages = [Stage("one", "m:f", [a], [b]), Stage("two", "m:f", [b], [a])]
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline(stages, tmp_path / "state.json")
@@ -0,0 +1,32 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from housing_cost.profiling import Profiler, get_profiler, profiled, set_profiler
+
+
+@pytest.fixture
+def profiler():
+    previous = get_profiler()
+    profiler = Profiler()
+    set_profiler(profiler)
+    yield profiler
+    set_profiler(previous)
+
+
+@profiled
+def read_files(paths: List[Path], extra: Path) -> None:
+    pass
+
+
+def test_bytes_of_path_lists(profiler, tmp_path: Path):
+    paths = []
+    for i, size in enumerate([10, 20, 30]):
+        paths.append(tmp_path / f"{i}.csv")
+        paths[-1].write_bytes(bytes(size))
+
+    read_files(paths[:2], extra=paths[2])
+    read_files(tuple(paths[:2]), extra=tmp_path / "missing.csv")
+
+    assert [span.counters["bytes"] for span in profiler.spans] == [60, 30]
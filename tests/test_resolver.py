@@ -0,0 +1,47 @@
+from typing import List, Sequence
+
+from housing_cost.pdf.resolver import TableResolver
+
+
+def block(block_id: str, block_type: str, page: int, children: Sequence[str] = ()) -> dict:
+    result = {"Id": block_id, "BlockType": block_type, "Page": page}
+    if children:
+        result["Relationships"] = [{"Type": "CHILD", "Ids": list(children)}]
+    return result
+
+
+def table(page: int) -> List[dict]:
+    """A one-cell table, with the cell and word arriving after the table block."""
+    return [
+        block(f"t{page}", "TABLE", page, [f"c{page}"]),
+        block(f"c{page}", "CELL", page, [f"w{page}"]),
+        block(f"l{page}", "LINE", page, [f"w{page}"]),
+        block(f"w{page}", "WORD", page),
+    ]
+
+
+def test_tables_are_emitted_and_evicted_as_they_complete():
+    resolver = TableResolver()
+    blocks = table(1) + [block("x1", "WORD", 1)] + table(2)
+    emitted = []
+    for index, resolved, table_map in resolver.feed(iter(blocks)):
+        emitted.append((index, resolved["Id"], sorted(table_map)))
+        # The blocks of an emitted table move out of the resolver.
+        assert not set(table_map) & set(resolver.blocks_map)
+
+    assert emitted == [(1, "t1", ["c1", "w1"]), (2, "t2", ["c2", "w2"])]
+    # The stray word of the first page is dropped once the second page starts.
+    assert resolver.blocks_map == {}
+
+
+def test_incomplete_table_keeps_its_blocks():
+    resolver = TableResolver()
+    blocks = [block("t1", "TABLE", 1, ["c1"]), block("c1", "CELL", 1, ["w1"])]
+    blocks.append(block("w2", "WORD", 2))
+
+    assert list(resolver.feed(iter(blocks))) == []
+    assert sorted(resolver.blocks_map) == ["c1", "t1", "w2"]
+
+    [(index, _, table_map)] = resolver.feed(iter([block("w1", "WORD", 1)]))
+    assert index == 1
+    assert sorted(table_map) == ["c1", "w1"]
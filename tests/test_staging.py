@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import boto3
+from moto import mock_aws
+import pytest
+
+from housing_cost.pdf.staging import SHA256_METADATA_KEY, StagingBucket
+
+BUCKET = "staging-test"
+REGION = "us-west-2"
+
+
+@pytest.fixture
+def s3_client():
+    with mock_aws():
+        yield boto3.client("s3", region_name=REGION)
+
+
+@pytest.fixture
+def pdf(tmp_path: Path) -> Path:
+    path = tmp_path / "survey.pdf"
+    path.write_bytes(b"%PDF-1.4 survey")
+    return path
+
+
+def object_names(s3_client) -> list[str]:
+    return [o["Key"] for o in s3_client.list_objects_v2(Bucket=BUCKET).get("Contents", [])]
+
+
+def test_persistent_bucket_skips_identical_uploads(s3_client, pdf: Path):
+    staging = StagingBucket(s3_client, BUCKET, REGION, persistent=True)
+    staging.prepare()
+
+    assert staging.upload(pdf, "survey.pdf")
+    head = s3_client.head_object(Bucket=BUCKET, Key="survey.pdf")
+    assert SHA256_METADATA_KEY in head["Metadata"]
+    assert not staging.upload(pdf, "survey.pdf")
+
+    pdf.write_bytes(b"%PDF-1.4 revised")
+    assert staging.upload(pdf, "survey.pdf")
+
+
+def test_persistent_bucket_matches_etag_without_metadata(s3_client, pdf: Path):
+    staging = StagingBucket(s3_client, BUCKET, REGION, persistent=True)
+    staging.prepare()
+    # Uploaded by another tool, without the checksum metadata.
+    s3_client.put_object(Bucket=BUCKET, Key="survey.pdf", Body=pdf.read_bytes())
+
+    assert not staging.upload(pdf, "survey.pdf")
+
+    s3_client.put_object(Bucket=BUCKET, Key="other.pdf", Body=b"%PDF-1.4 other!")
+    assert staging.upload(pdf, "other.pdf")
+
+
+def test_persistent_bucket_has_lifecycle_rule_and_is_kept(s3_client, pdf: Path):
+    staging = StagingBucket(
+        s3_client, BUCKET, REGION, persistent=True, prefix="runs/", expiration_days=3
+    )
+    staging.prepare()
+    rules = s3_client.get_bucket_lifecycle_configuration(Bucket=BUCKET)["Rules"]
+    assert len(rules) == 1
+    assert rules[0]["Filter"]["Prefix"] == "runs/"
+    assert rules[0]["Expiration"]["Days"] == 3
+
+    name = staging.object_name(pdf)
+    staging.upload(pdf, name)
+    staging.release(name)
+    staging.close()
+    assert object_names(s3_client) == ["runs/survey.pdf"]
+
+    # A later run reuses the bucket and the uploaded file.
+    staging.prepare()
+    assert not staging.upload(pdf, name)
+
+
+def test_temporary_bucket_is_deleted_on_exit(s3_client, pdf: Path):
+    staging = StagingBucket(s3_client, BUCKET, REGION)
+    staging.prepare()
+
+    assert staging.upload(pdf, "survey.pdf")
+    assert staging.upload(pdf, "survey.pdf")  # Temporary buckets never skip uploads.
+    staging.release("survey.pdf")
+    assert object_names(s3_client) == []
+    staging.close()
+
+    buckets = [b["Name"] for b in s3_client.list_buckets()["Buckets"]]
+    assert BUCKET not in buckets
@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from typing import Dict, List
+
+import boto3
+from moto import mock_aws
+import pytest
+
+from housing_cost.pdf import waiter as waiter_module
+from housing_cost.pdf.waiter import (
+    BackoffPolicy,
+    CompletionNotice,
+    SQSCompletionChannel,
+    TextractJobWaiter,
+)
+
+REGION = "us-west-2"
+
+
+class FakeTextract:
+    """Reports the status set in `statuses`, SUCCEEDED for unknown jobs."""
+
+    def __init__(self) -> None:
+        self.statuses: Dict[str, str] = {}
+        self.polls: List[str] = []
+
+    def get_document_analysis(self, JobId: str) -> dict:
+        self.polls.append(JobId)
+        return {"JobStatus": self.statuses.get(JobId, "SUCCEEDED"), "Blocks": []}
+
+
+class ListChannel:
+    """Delivers the given notices once and records what happened to them."""
+
+    def __init__(self, notices: List[CompletionNotice]) -> None:
+        self.notices = notices
+        self.acknowledged: List[str] = []
+        self.released: List[str] = []
+
+    def notification_channel(self):
+        return None
+
+    def receive(self, timeout: float) -> List[CompletionNotice]:
+        notices, self.notices = self.notices, []
+        if not notices:
+            time.sleep(min(timeout, 0.01))
+        return notices
+
+    def acknowledge(self, notice: CompletionNotice) -> None:
+        self.acknowledged.append(notice.job_id)
+
+    def release(self, notice: CompletionNotice) -> None:
+        self.released.append(notice.job_id)
+
+
+def notice(job_id: str) -> CompletionNotice:
+    return CompletionNotice(job_id, "SUCCEEDED", time.time(), receipt=job_id)
+
+
+def test_register_wakes_the_loop():
+    client = FakeTextract()
+    client.statuses["slow"] = "IN_PROGRESS"
+    # The second poll of the slow job is the max delay away.
+    policy = BackoffPolicy(initial_delay=0.05, max_delay=2.0, multiplier=100, jitter=0)
+    waiter = TextractJobWaiter(client, policy)  # type: ignore[arg-type]
+    slow = waiter.register("slow")
+    loop = threading.Thread(target=waiter.run_until_complete, args=([slow],), daemon=True)
+    loop.start()
+    while client.polls.count("slow") < 1:
+        time.sleep(0.01)
+
+    fast = waiter.register("fast")
+    assert fast.result(timeout=1.0)["JobStatus"] == "SUCCEEDED"
+    assert not slow.done()
+
+    client.statuses["slow"] = "SUCCEEDED"
+    loop.join(timeout=5)
+    assert slow.done()
+
+
+def test_notices_of_other_jobs_are_released(monkeypatch):
+    monkeypatch.setattr(waiter_module, "MAX_EARLY_NOTICES", 2)
+    channel = ListChannel([notice(f"other-{i}") for i in range(4)] + [notice("mine")])
+    waiter = TextractJobWaiter(FakeTextract(), BackoffPolicy(initial_delay=60), channel)  # type: ignore[arg-type]
+    waiter.wait("mine")
+
+    assert channel.acknowledged == ["mine"]
+    # Two over the cap while the loop runs, the rest once it is done.
+    assert channel.released == ["other-0", "other-1", "other-2", "other-3"]
+
+
+def test_early_notice_is_claimed_by_register():
+    channel = ListChannel([notice("early")])
+    waiter = TextractJobWaiter(FakeTextract(), BackoffPolicy(initial_delay=60), channel)  # type: ignore[arg-type]
+    other = waiter.register("other")
+    loop = threading.Thread(target=waiter.run_until_complete, args=([other],), daemon=True)
+    loop.start()
+    while channel.notices:
+        time.sleep(0.01)
+
+    assert waiter.register("early").result(timeout=1.0)["JobStatus"] == "SUCCEEDED"
+    channel.notices.append(notice("other"))
+    loop.join(timeout=5)
+
+    assert other.done()
+    assert channel.acknowledged == ["early", "other"]
+    assert channel.released == []
+
+
+@pytest.fixture
+def sqs_client():
+    with mock_aws():
+        yield boto3.client("sqs", region_name=REGION)
+
+
+def send_notice(sqs_client, queue_url: str, job_id: str) -> None:
+    payload = {"JobId": job_id, "Status": "SUCCEEDED", "Timestamp": time.time() * 1000}
+    body = {"Type": "Notification", "Message": json.dumps(payload)}
+    sqs_client.send_message(QueueUrl=queue_url, MessageBody=json.dumps(body))
+
+
+def test_sqs_channel_keeps_other_consumers_notices(sqs_client):
+    queue_url = sqs_client.create_queue(QueueName="textract")["QueueUrl"]
+    send_notice(sqs_client, queue_url, "theirs")
+    send_notice(sqs_client, queue_url, "mine")
+    channel = SQSCompletionChannel(sqs_client, queue_url, "arn:topic", "arn:role")
+    waiter = TextractJobWaiter(FakeTextract(), BackoffPolicy(initial_delay=60), channel)  # type: ignore[arg-type]
+
+    result = waiter.wait("mine")
+
+    assert result["JobStatus"] == "SUCCEEDED"
+    assert waiter.stats[0].detected_by == "notification"
+    messages = sqs_client.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10)
+    bodies = [json.loads(json.loads(m["Body"])["Message"]) for m in messages["Messages"]]
+    assert [body["JobId"] for body in bodies] == ["theirs"]